@@ -0,0 +1,33 @@
+"""
+Access control for operator-only endpoints.
+
+Admin endpoints are disabled (404) unless `SESSION_CONTEXT_ADMIN_TOKEN` is set,
+and then require the same value in the `X-Admin-Token` header.
+"""
+
+import os
+import secrets
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+ADMIN_TOKEN: Optional[str] = os.getenv("SESSION_CONTEXT_ADMIN_TOKEN") or None
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+def admin_token_valid(supplied: str) -> bool:
+    """Whether `supplied` is the configured admin token (always False while admin endpoints are disabled)."""
+    if ADMIN_TOKEN is None:
+        return False
+    return secrets.compare_digest(supplied.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+async def require_admin(request: Request) -> None:
+    """FastAPI dependency that rejects requests without the admin token."""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_token_valid(request.headers.get(ADMIN_TOKEN_HEADER, "")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+__all__ = ["ADMIN_TOKEN", "ADMIN_TOKEN_HEADER", "admin_token_valid", "require_admin"]
@@ -7,10 +7,14 @@ from .agent import (
     AGENT_INSTRUCTION,
     AGENT_NAME,
     OPENAI_MODEL,
+    SMALL_MODEL,
     adk_app,
+    create_root_agent,
     root_agent,
     runner,
     session_service,
+    small_root_agent,
+    small_runner,
 )
 
 __all__ = [
@@ -18,9 +22,13 @@ __all__ = [
     "AGENT_INSTRUCTION",
     "AGENT_NAME",
     "OPENAI_MODEL",
+    "SMALL_MODEL",
     "adk_app",
+    "create_root_agent",
     "root_agent",
     "runner",
     "session_service",
+    "small_root_agent",
+    "small_runner",
 ]
 
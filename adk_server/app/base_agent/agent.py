@@ -6,18 +6,21 @@ from __future__ import annotations
 
 import logging
 import os
+from typing import Optional
 
 from dotenv import load_dotenv
 from google.adk import Runner
 from google.adk.agents import LlmAgent
 from google.adk.apps.app import App as AdkApp
-from google.adk.models.lite_llm import LiteLlm
 from google.adk.sessions import InMemorySessionService
 from google.adk.tools.agent_tool import AgentTool
 
-from ..summarizer import create_summarizer_agent
+from ..summarizer import create_summarizer_agent, summary_cache
 from ..matcher import create_matcher_agent
+from ..models import create_model
 from ..schemas import SessionMatchOutput
+from ..tracing import tracer
+from ..usage import prompt_usage
 
 logger = logging.getLogger("session-context-adk")
 
@@ -50,7 +53,9 @@ When you receive a tab grouping request containing:
 Follow this exact sequence:
 
 ### Step 1: Summarize the New Tab
-Call `summarizer_agent` with the new tab's information:
+If the request contains a `CACHED SUMMARY` block, that is the summarizer's earlier output for this exact tab: skip this step and use it as the summary in Step 2.
+
+Otherwise call `summarizer_agent` with the new tab's information:
 - Pass the tab's URL, title, and any extracted content
 - The summarizer will return a detailed analysis including:
   * Main topic/activity
@@ -61,16 +66,17 @@ Call `summarizer_agent` with the new tab's information:
 
 ### Step 2: Match Against Existing Sessions
 Call `matcher_agent` with:
-- The summary generated in Step 1
-- The list of existing sessions (including session IDs, labels, and tab lists)
+- The list of existing sessions (including session handles such as `S1`, labels, and tab lists), copied verbatim and in the given order
 - Context about what other tabs are currently open
+- The summary generated in Step 1, after the session list
+- The `KEEP LABEL` line, if present
 
 The matcher will analyze thematic relationships and return a decision.
 
 ### Step 3: Return the Structured Decision
 Forward the matcher's decision as your final response using the exact structured output schema:
 - `action`: One of "merge", "create_new", or "no_action"
-- `sessionId`: The session ID (for merge or no_action decisions)
+- `sessionId`: The session handle, e.g. `S2` (for merge or no_action decisions)
 - `updatedLabel`: The refreshed label for merged sessions
 - `label`: Duplicate of updatedLabel/suggestedLabel for compatibility
 - `suggestedLabel`: The proposed label for new sessions
@@ -81,7 +87,7 @@ Forward the matcher's decision as your final response using the exact structured
 ### MERGE Decision:
 The matcher determined this tab belongs with an existing session. Ensure the response includes:
 - `action`: "merge"
-- `sessionId`: Which session to merge into
+- `sessionId`: Handle of the session to merge into
 - `updatedLabel`: A refreshed label that encompasses both the existing session and the new tab
 - `label`: Same as updatedLabel
 - `reason`: Why this merge makes sense
@@ -96,7 +102,7 @@ The matcher determined this tab needs a new session. Ensure the response include
 ### NO_ACTION Decision:
 The matcher determined no processing is needed (usually because the URL is a duplicate). Ensure the response includes:
 - `action`: "no_action"
-- `sessionId`: The session that already contains this tab
+- `sessionId`: Handle of the session that already contains this tab
 - `updatedLabel`: The existing session's label
 - `label`: Same as updatedLabel
 - `reason`: Why no action is required (e.g., "Duplicate URL")
@@ -111,7 +117,7 @@ Your final response MUST conform exactly to the SessionMatchOutput schema. All r
 ## COORDINATION PRINCIPLES
 
 - **Trust your sub-agents**: They are specialized for their tasks. Pass their outputs through without modification.
-- **Maintain the workflow**: Always call summarizer first, then matcher. Never skip steps.
+- **Maintain the workflow**: Always call summarizer first (unless a cached summary is provided), then matcher. Never skip steps.
 - **Preserve structure**: Return the exact structured output the matcher provides.
 - **Fail gracefully**: If a sub-agent fails, return a sensible default (create_new with no label).
 
@@ -120,27 +126,50 @@ You are the orchestrator. Your job is to coordinate the specialized agents and e
 AGENT_DESCRIPTION = "Coordinates tab summarization and session matching for browser context management."
 APP_NAME = os.getenv("SESSION_CONTEXT_APP_NAME", "app")
 
-# Create sub-agents
-summarizer = create_summarizer_agent(api_key=OPENAI_API_KEY)
-matcher = create_matcher_agent(api_key=OPENAI_API_KEY)
-
-logger.info("Created summarizer and matcher sub-agents")
-
-root_agent = LlmAgent(
-    name=AGENT_NAME,
-    model=LiteLlm(model=OPENAI_MODEL, api_key=OPENAI_API_KEY),
-    description=AGENT_DESCRIPTION,
-    instruction=AGENT_INSTRUCTION,
-    tools=[
-        AgentTool(agent=summarizer),
-        AgentTool(agent=matcher),
-    ],
-    output_schema=SessionMatchOutput,
-)
+SMALL_MODEL = os.getenv("SESSION_CONTEXT_SMALL_MODEL", "openai/gpt-4o-mini")
+
+
+def create_root_agent(model: str, matcher_model: Optional[str] = None) -> LlmAgent:
+    """
+    Create the coordinator agent together with its summarizer and matcher tools.
+
+    Args:
+        model (str): Model identifier for the coordinator.
+        matcher_model (str, optional): Model identifier for the matcher. Defaults to env var.
+
+    Returns:
+        LlmAgent: The configured coordinator agent
+    """
+    summarizer = create_summarizer_agent(api_key=OPENAI_API_KEY)
+    matcher = create_matcher_agent(api_key=OPENAI_API_KEY, model=matcher_model)
+
+    logger.info("Created summarizer and matcher sub-agents")
+
+    return LlmAgent(
+        name=AGENT_NAME,
+        model=create_model(model, OPENAI_API_KEY, agent_name=AGENT_NAME),
+        description=AGENT_DESCRIPTION,
+        instruction=AGENT_INSTRUCTION,
+        tools=[
+            AgentTool(agent=summarizer),
+            AgentTool(agent=matcher),
+        ],
+        output_schema=SessionMatchOutput,
+        before_tool_callback=[tracer.before_tool_callback, summary_cache.before_tool_callback],
+        after_tool_callback=[summary_cache.after_tool_callback, tracer.after_tool_callback],
+        before_model_callback=tracer.before_model_callback,
+        after_model_callback=[prompt_usage.after_model_callback, tracer.after_model_callback],
+    )
+
+
+root_agent = create_root_agent(OPENAI_MODEL)
+# Cheaper coordinator/matcher pair used for grouping requests the router deems easy.
+small_root_agent = create_root_agent(SMALL_MODEL, matcher_model=SMALL_MODEL)
 
 session_service = InMemorySessionService()
 adk_app = AdkApp(name=APP_NAME, root_agent=root_agent)
 runner = Runner(app=adk_app, session_service=session_service)
+small_runner = Runner(app=AdkApp(name=APP_NAME, root_agent=small_root_agent), session_service=session_service)
 
 __all__ = [
     "APP_NAME",
@@ -148,8 +177,12 @@ __all__ = [
     "AGENT_INSTRUCTION",
     "AGENT_NAME",
     "OPENAI_MODEL",
+    "SMALL_MODEL",
     "adk_app",
+    "create_root_agent",
     "root_agent",
     "runner",
     "session_service",
+    "small_root_agent",
+    "small_runner",
 ]
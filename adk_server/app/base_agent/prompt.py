@@ -0,0 +1,241 @@
+"""
+Prompt construction for the coordinator agent.
+
+Grouping messages are laid out so that provider-side prompt caching can reuse
+as much of them as possible: a fixed preamble, then the existing sessions in a
+deterministic order (oldest first, so new sessions append at the end), then the
+currently open tabs, and only then the per-request new tab data.
+
+The default compact format lists each session as one header line with a short
+handle (`S1`, `S2`, ...) and its tabs as `title | host/path` rows (see
+`app.compact`). When the message would exceed the token budget, fewer tabs per
+session and shorter fields are shown; every session keeps its header line.
+`SESSION_CONTEXT_PROMPT_FORMAT=verbose` restores the original layout.
+
+In the compact format the model never sees session UUIDs: it answers with the
+handle, and `resolve_session` maps the handle back to the real session.
+"""
+
+import re
+from collections import Counter
+from typing import Collection, List, Optional, Tuple
+
+from ..compact import PROMPT_FORMAT, PROMPT_TOKEN_BUDGET, clip, estimate_tokens, shared_host, tab_row
+from ..schemas import ExistingSession, GroupingRequest
+
+# (tabs per session, title characters, path characters), tried in order until the message fits.
+COMPACT_LEVELS: List[Tuple[int, int, int]] = [(3, 80, 60), (2, 60, 40), (1, 48, 32), (1, 32, 24)]
+
+
+def order_sessions(sessions: List[ExistingSession]) -> List[ExistingSession]:
+    """Sort sessions oldest first (then by ID) so the listing only grows at its tail."""
+    return sorted(sessions, key=lambda session: (session.startTs is None, session.startTs or 0, session.id))
+
+
+def session_handle(index: int) -> str:
+    return f"S{index + 1}"
+
+
+HANDLE_PATTERN = re.compile(r"^\s*(?:s|session)?\s*#?\s*(\d+)\s*$", re.IGNORECASE)
+
+# How `sessionId` values returned by the model were resolved: handle, id, unresolved.
+handle_resolutions: Counter = Counter()
+
+
+def resolve_session(value: Optional[str], sessions: List[ExistingSession]) -> Optional[ExistingSession]:
+    """
+    Map a model-returned `sessionId` back to one of the request's sessions.
+
+    Accepts a real session ID (the verbose format shows them) or a handle such as
+    `S3`, `s3`, `Session 3` or `3`, numbered as in the prompt.
+
+    Args:
+        value (str, optional): The `sessionId` from the model's decision.
+        sessions (list): The request's `existingSessions`, in any order.
+
+    Returns:
+        ExistingSession, optional: The session, or None when the value names none of them.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    for session in sessions:
+        if session.id == value:
+            handle_resolutions["id"] += 1
+            return session
+    match = HANDLE_PATTERN.match(value)
+    if match:
+        ordered = order_sessions(sessions)
+        position = int(match.group(1)) - 1
+        if 0 <= position < len(ordered):
+            handle_resolutions["handle"] += 1
+            return ordered[position]
+    handle_resolutions["unresolved"] += 1
+    return None
+
+
+def build_grouping_message(
+    request: GroupingRequest,
+    cached_summary: Optional[str] = None,
+    stable_label_ids: Collection[str] = (),
+    compact: bool = PROMPT_FORMAT != "verbose",
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    site: Optional[str] = None,
+    framed: bool = True,
+) -> str:
+    """
+    Format a grouping request as the coordinator's user message.
+
+    Args:
+        request (GroupingRequest): The incoming grouping request.
+        cached_summary (str, optional): Earlier summarizer output for the new tab.
+        stable_label_ids (collection): Sessions that keep their label when merged into.
+        compact (bool): Use the compact tabular layout instead of the verbose one.
+        token_budget (int): Approximate token limit for the compact layout.
+        site (str, optional): What the new tab's site is, from the domain knowledge table.
+        framed (bool): Wrap the request in its opening and closing instruction lines; batched
+            grouping requests are listed unframed under a handle of their own.
+
+    Returns:
+        str: The message text, stable prefix first and volatile data last.
+    """
+    if not compact:
+        body = build_verbose_grouping_message(request, cached_summary, stable_label_ids, site)
+    else:
+        body = ""
+        for level in COMPACT_LEVELS:
+            body = build_compact_grouping_message(request, cached_summary, stable_label_ids, *level, site=site)
+            if estimate_tokens(body) <= token_budget:
+                break
+    return frame_grouping_message(body) if framed else body
+
+
+def frame_grouping_message(body: str) -> str:
+    """Wrap an unframed grouping message in the coordinator's opening and closing lines."""
+    return "\n".join(["Process this tab grouping request:", "", body, "", "Provide your grouping decision."])
+
+
+def build_compact_grouping_message(
+    request: GroupingRequest,
+    cached_summary: Optional[str],
+    stable_label_ids: Collection[str],
+    tabs_per_session: int,
+    title_chars: int,
+    path_chars: int,
+    site: Optional[str] = None,
+) -> str:
+    lines: List[str] = []
+
+    sessions = order_sessions(request.existingSessions)
+    if sessions:
+        lines.append('EXISTING SESSIONS (handle "label" @shared-site, then one tab per line: title | site/path):')
+        for idx, session in enumerate(sessions):
+            shown = session.tabList[:tabs_per_session]
+            host = shared_host(session.tabList)
+            header = session_handle(idx)
+            if session.label:
+                header += f' "{clip(session.label, 50)}"'
+            if host:
+                header += f" @{host}"
+            lines.append(header)
+            lines.extend(f"  {tab_row(tab, host, title_chars, path_chars)}" for tab in shown)
+    else:
+        lines.append("No existing sessions.")
+
+    if request.currentTabs:
+        lines.append("")
+        lines.append(f"CURRENT OPEN TABS ({len(request.currentTabs)}):")
+        lines.extend(f"  {tab_row(tab, None, title_chars, path_chars)}" for tab in request.currentTabs[:5])
+
+    lines.append("")
+    lines.append("NEW TAB:")
+    # The new tab keeps its full URL: the summarizer reads it.
+    lines.append(f"URL: {request.newTab.url}")
+    if site:
+        lines.append(f"Site: {site}")
+    title = (request.newTab.title or "").strip()
+    if title and title != "Untitled":
+        lines.append(f"Title: {clip(title, 150)}")
+    content = request.newTab.content
+    if content:
+        if content.h1 and content.h1.strip() != title:
+            lines.append(f"Heading: {clip(content.h1, 120)}")
+        if content.h2:
+            lines.append(f"Sections: {'; '.join(clip(heading, 40) for heading in content.h2[:3])}")
+        if content.metaDescription:
+            lines.append(f"Description: {clip(content.metaDescription, 150)}")
+
+    if cached_summary:
+        lines.append("")
+        lines.append("CACHED SUMMARY:")
+        lines.append(cached_summary)
+
+    keep_label = [session_handle(idx) for idx, session in enumerate(sessions) if session.id in stable_label_ids]
+    if keep_label:
+        lines.append("")
+        lines.append(f"KEEP LABEL: {', '.join(keep_label)}")
+
+    return "\n".join(lines)
+
+
+def build_verbose_grouping_message(
+    request: GroupingRequest,
+    cached_summary: Optional[str] = None,
+    stable_label_ids: Collection[str] = (),
+    site: Optional[str] = None,
+) -> str:
+    lines: List[str] = []
+
+    sessions = order_sessions(request.existingSessions)
+    if sessions:
+        lines.append("EXISTING SESSIONS:")
+        for idx, session in enumerate(sessions):
+            lines.append("")
+            lines.append(f"Session {idx + 1} (ID: {session.id}, Label: {session.label or 'Unnamed'}):")
+            for tab in session.tabList[:3]:
+                lines.append(f"  - {tab.title or 'Untitled'} — {tab.url}")
+    else:
+        lines.append("No existing sessions.")
+
+    if request.currentTabs:
+        lines.append("")
+        lines.append(f"CURRENT OPEN TABS ({len(request.currentTabs)}):")
+        for tab in request.currentTabs[:5]:
+            lines.append(f"- {tab.title or 'Untitled'} — {tab.url}")
+
+    lines.append("")
+    lines.append("NEW TAB:")
+    lines.append(f"- URL: {request.newTab.url}")
+    lines.append(f"- Title: {request.newTab.title or 'Untitled'}")
+    if site:
+        lines.append(f"- Site: {site}")
+    content = request.newTab.content
+    if content:
+        if content.h1:
+            lines.append(f"- Main Heading: {content.h1}")
+        if content.h2:
+            lines.append(f"- Sections: {', '.join(content.h2[:3])}")
+        if content.metaDescription:
+            lines.append(f"- Description: {content.metaDescription[:150]}")
+
+    if cached_summary:
+        lines.append("")
+        lines.append("CACHED SUMMARY:")
+        lines.append(cached_summary)
+
+    keep_label = [f"Session {idx + 1}" for idx, session in enumerate(sessions) if session.id in stable_label_ids]
+    if keep_label:
+        lines.append("")
+        lines.append(f"KEEP LABEL: {', '.join(keep_label)}")
+
+    return "\n".join(lines)
+
+
+__all__ = [
+    "build_grouping_message",
+    "frame_grouping_message",
+    "handle_resolutions",
+    "order_sessions",
+    "resolve_session",
+    "session_handle",
+]
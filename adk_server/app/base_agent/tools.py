@@ -16,7 +16,11 @@ logger = logging.getLogger(__name__)
 load_dotenv(override=False)
 
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
-SERPER_API_URL = "https://google.serper.dev/search"
+# Overridable so load tests can point searches at `scripts.stub_openai`.
+SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")
+
+# Reuse the Serper connection (and its TLS session) across searches.
+serper_session = requests.Session()
 
 
 def web_search(query: str, num_results: Optional[int] = 5) -> Dict[str, Any]:
@@ -45,7 +49,7 @@ def web_search(query: str, num_results: Optional[int] = 5) -> Dict[str, Any]:
     payload = {"q": query, "num": num_results}
 
     try:
-        response = requests.post(SERPER_API_URL, headers=headers, json=payload, timeout=10)
+        response = serper_session.post(SERPER_API_URL, headers=headers, json=payload, timeout=10)
         response.raise_for_status()
         search_results = response.json()
 
@@ -0,0 +1,216 @@
+"""
+Adaptive micro-batching of concurrent requests.
+
+Requests submitted within a short window are dispatched together in one call.
+The window follows the arrival rate: it is the time `max_size` requests are
+expected to take to arrive, from a moving average of the gaps between
+submissions, capped at `max_wait_seconds`. While fewer than half a request is
+expected to join within the cap (requests arrive more than twice the cap
+apart), nothing waits at all, so batching only costs latency when there is
+load to amortize. A batch is dispatched early once it holds `max_size`
+requests or adding the next one would exceed `max_weight`.
+
+`submit` returns None for a request that ended up alone in its window, that
+the dispatcher returned no result for, or whose batch failed; the caller then
+handles that request on its own. One bad request therefore never fails the
+others it was batched with.
+
+Items are only batched with items submitted under the same key (for example
+the same user), and each key's window follows that key's own arrival rate.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Batching starts once requests arrive less than this many max-waits apart.
+SPARSE_GAP_FACTOR = 2.0
+
+
+@dataclass
+class _Batch(Generic[T, R]):
+    items: List[T] = field(default_factory=list)
+    futures: List["asyncio.Future[Optional[R]]"] = field(default_factory=list)
+    submitted_at: List[float] = field(default_factory=list)
+    weight: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+@dataclass
+class _Lane(Generic[T, R]):
+    """Open batch and arrival statistics of one batching key."""
+
+    pending: Optional[_Batch[T, R]] = None
+    last_arrival: Optional[float] = None
+    gap: Optional[float] = None
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects concurrently submitted items into batches for one dispatch call.
+
+    Args:
+        dispatch (callable): Handles a batch; returns one result per item, None where it has none.
+        max_size (int): Items per batch.
+        max_wait_seconds (float): Longest time an item waits for others to join its batch.
+        weigh (callable, optional): Approximate size of an item (e.g. prompt tokens).
+        max_weight (int, optional): Total weight per batch.
+        smoothing (float): Weight of the newest inter-arrival gap in its moving average.
+        clock (callable, optional): Time source. Defaults to `time.perf_counter`.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[T]], Awaitable[Sequence[Optional[R]]]],
+        max_size: int,
+        max_wait_seconds: float,
+        weigh: Optional[Callable[[T], int]] = None,
+        max_weight: Optional[int] = None,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.dispatch = dispatch
+        self.max_size = max(1, max_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self.max_weight = max_weight
+        self.smoothing = smoothing
+        self._weigh: Callable[[T], int] = weigh or (lambda _: 1)
+        self._clock = clock
+        self._lanes: Dict[str, _Lane[T, R]] = {}
+        self._next_sweep = 0.0
+        self.sizes: Counter = Counter()
+        self.submitted = 0
+        self.alone = 0
+        self.fallbacks = 0
+        self.failed_batches = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+
+    def window(self, key: str = "") -> float:
+        """How long a new batch for `key` stays open; 0 while its traffic is too sparse to batch."""
+        lane = self._lanes.get(key)
+        if lane is None or lane.gap is None or lane.gap >= SPARSE_GAP_FACTOR * self.max_wait_seconds:
+            return 0.0
+        return min(self.max_wait_seconds, lane.gap * (self.max_size - 1))
+
+    def _observe_arrival(self, key: str, now: float) -> _Lane[T, R]:
+        # Arrivals further apart than this count as "sparse", not as hours of average gap.
+        horizon = 2 * SPARSE_GAP_FACTOR * self.max_wait_seconds
+        if now >= self._next_sweep:
+            # Idle keys hold nothing a fresh lane would not relearn within a few arrivals.
+            self._next_sweep = now + horizon
+            idle = [
+                name
+                for name, lane in self._lanes.items()
+                if lane.pending is None and now - (lane.last_arrival or 0.0) > horizon
+            ]
+            for name in idle:
+                del self._lanes[name]
+        lane = self._lanes.setdefault(key, _Lane())
+        if lane.last_arrival is not None:
+            gap = min(now - lane.last_arrival, horizon)
+            lane.gap = gap if lane.gap is None else (1 - self.smoothing) * lane.gap + self.smoothing * gap
+        lane.last_arrival = now
+        return lane
+
+    async def submit(self, item: T, key: str = "") -> Optional[R]:
+        """
+        Wait for `item`'s share of a batch result; None means the caller should handle it alone.
+
+        Args:
+            item: The request to batch.
+            key (str): Only items submitted under the same key share a batch.
+        """
+        now = self._clock()
+        lane = self._observe_arrival(key, now)
+        self.submitted += 1
+        if self.max_size <= 1:
+            self.alone += 1
+            return None
+        weight = max(0, int(self._weigh(item)))
+        batch = lane.pending
+        if batch is not None and self.max_weight is not None and batch.weight + weight > self.max_weight:
+            self._flush(lane, batch)
+            batch = None
+        if batch is None:
+            window = self.window(key)
+            if window <= 0:
+                self.alone += 1
+                return None
+            batch = lane.pending = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(window, self._flush, lane, batch)
+        future: "asyncio.Future[Optional[R]]" = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        batch.submitted_at.append(now)
+        batch.weight += weight
+        if len(batch.items) >= self.max_size:
+            self._flush(lane, batch)
+        return await future
+
+    def _flush(self, lane: _Lane[T, R], batch: _Batch[T, R]) -> None:
+        if lane.pending is batch:
+            lane.pending = None
+        if batch.timer is not None:
+            batch.timer.cancel()
+        now = self._clock()
+        # Callers that went away while waiting are left out.
+        live = [index for index, future in enumerate(batch.futures) if not future.done()]
+        if not live:
+            return
+        self.waited += len(live)
+        self.wait_seconds += sum(now - batch.submitted_at[index] for index in live)
+        if len(live) == 1:
+            self.alone += 1
+            batch.futures[live[0]].set_result(None)
+            return
+        self.sizes[len(live)] += 1
+        run = self._run([batch.items[index] for index in live], [batch.futures[index] for index in live])
+        # The batch serves several requests, so it runs outside any one caller's trace and recording.
+        task = contextvars.Context().run(asyncio.create_task, run)
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def _run(self, items: List[T], futures: List["asyncio.Future[Optional[R]]"]) -> None:
+        try:
+            results: Sequence[Optional[R]] = await self.dispatch(items)
+        except Exception as exc:
+            self.failed_batches += 1
+            logger.warning("Batch of %s failed; handling its items one by one: %s", len(items), exc)
+            results = []
+        for index, future in enumerate(futures):
+            result = results[index] if index < len(results) else None
+            if result is None:
+                self.fallbacks += 1
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batched = sum(size * count for size, count in self.sizes.items())
+        return {
+            "max_size": self.max_size,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "keys": len(self._lanes),
+            "open_batches": sum(1 for lane in self._lanes.values() if lane.pending is not None),
+            "submitted": self.submitted,
+            "alone": self.alone,
+            "batches": sum(self.sizes.values()),
+            "batched": batched,
+            "mean_batch_size": round(batched / sum(self.sizes.values()), 2) if self.sizes else 0.0,
+            "sizes": {str(size): count for size, count in sorted(self.sizes.items())},
+            "fallbacks": self.fallbacks,
+            "failed_batches": self.failed_batches,
+            "waited": self.waited,
+            "mean_wait_ms": round(self.wait_seconds * 1000 / self.waited, 1) if self.waited else 0.0,
+        }
+
+
+__all__ = ["MicroBatcher"]
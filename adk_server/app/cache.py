@@ -0,0 +1,320 @@
+"""
+Small in-process caches shared by the FastAPI surface and the agents.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl_seconds`.
+
+    Args:
+        max_entries (int): Maximum number of entries before the least recently used is evicted.
+        ttl_seconds (float): Entry lifetime; `0` disables expiry.
+        clock (callable, optional): Time source. Defaults to `time.time` so that
+            timestamps survive being persisted and reloaded.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str, record: bool = True) -> Optional[V]:
+        """Return the cached value, or None when missing or expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: V, stored_at: Optional[float] = None) -> None:
+        """Insert or refresh an entry, evicting the least recently used one when full."""
+        with self._lock:
+            self._entries[key] = (stored_at if stored_at is not None else self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def restore(self, key: str, value: V, stored_at: float) -> bool:
+        """Insert a persisted entry unless it has expired or `key` was stored since; True when inserted."""
+        if self._expired(stored_at, self._clock()):
+            return False
+        with self._lock:
+            if key in self._entries:
+                return False
+        self.set(key, value, stored_at=stored_at)
+        return True
+
+    def pop(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def items(self) -> Iterator[Tuple[str, float, V]]:
+        """Yield `(key, stored_at, value)` for every live entry, oldest first."""
+        now = self._clock()
+        with self._lock:
+            snapshot = list(self._entries.items())
+        for key, (stored_at, value) in snapshot:
+            if not self._expired(stored_at, now):
+                yield key, stored_at, value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class _Partition(Generic[V]):
+    """Entries and counters of one `PartitionedCache` partition."""
+
+    def __init__(self) -> None:
+        # key -> (stored_at, value, weight), least recently used first.
+        self.entries: "OrderedDict[str, Tuple[float, V, int]]" = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "weight": self.weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class PartitionedCache(Generic[V]):
+    """
+    LRU/TTL cache split into per-user partitions with quotas and fair eviction.
+
+    A partition over its own quota evicts its own least recently used entries,
+    so one heavy user cannot push out anyone else's. When the cache as a whole
+    is full, the victim is the oldest entry of whichever partition currently
+    holds the most weight. Empty partitions are dropped.
+
+    Args:
+        max_entries (int): Entries across all partitions.
+        ttl_seconds (float): Entry lifetime; `0` disables expiry.
+        partition_max_entries (int): Entries per partition.
+        weigh (callable, optional): Approximate size of a value (e.g. bytes); defaults to 1 per entry.
+        max_weight (int, optional): Total weight across all partitions.
+        partition_max_weight (int, optional): Weight per partition.
+        clock (callable, optional): Time source. Defaults to `time.time`.
+        on_evict (callable, optional): Called as `on_evict(partition, key, value)` for every
+            entry evicted to make room, with the cache's lock held.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        partition_max_entries: int,
+        weigh: Optional[Callable[[V], int]] = None,
+        max_weight: Optional[int] = None,
+        partition_max_weight: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+        on_evict: Optional[Callable[[str, str, V], None]] = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self.partition_max_entries = max(1, min(partition_max_entries, self.max_entries))
+        self.max_weight = max_weight
+        self.partition_max_weight = partition_max_weight
+        self._weigh: Callable[[V], int] = weigh or (lambda _: 1)
+        self._clock = clock
+        self._partitions: Dict[str, _Partition[V]] = {}
+        self._entries = 0
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.quota_evictions = 0
+        self.expirations = 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+
+    def _remove(self, name: str, key: str) -> Optional[Tuple[float, V, int]]:
+        partition = self._partitions.get(name)
+        entry = partition.entries.pop(key, None) if partition is not None else None
+        if entry is not None:
+            partition.weight -= entry[2]  # type: ignore[union-attr]
+            self._entries -= 1
+            self._weight -= entry[2]
+            if not partition.entries:  # type: ignore[union-attr]
+                del self._partitions[name]
+        return entry
+
+    def _evict_oldest(self, name: str) -> None:
+        partition = self._partitions[name]
+        partition.evictions += 1
+        key = next(iter(partition.entries))
+        entry = self._remove(name, key)
+        if self._on_evict is not None and entry is not None:
+            self._on_evict(name, key, entry[1])
+
+    def get(self, partition: str, key: str, record: bool = True) -> Optional[V]:
+        """Return the cached value, or None when missing or expired."""
+        now = self._clock()
+        with self._lock:
+            part = self._partitions.get(partition)
+            entry = part.entries.get(key) if part is not None else None
+            if entry is not None and self._expired(entry[0], now):
+                self._remove(partition, key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if record:
+                    self.misses += 1
+                    if partition in self._partitions:
+                        self._partitions[partition].misses += 1
+                return None
+            part.entries.move_to_end(key)  # type: ignore[union-attr]
+            if record:
+                self.hits += 1
+                part.hits += 1  # type: ignore[union-attr]
+            return entry[1]
+
+    def set(self, partition: str, key: str, value: V, stored_at: Optional[float] = None) -> None:
+        """Insert or refresh an entry, then enforce the partition quota and the global limits."""
+        weight = max(0, int(self._weigh(value)))
+        with self._lock:
+            self._remove(partition, key)
+            part = self._partitions.setdefault(partition, _Partition())
+            part.entries[key] = (stored_at if stored_at is not None else self._clock(), value, weight)
+            part.weight += weight
+            self._entries += 1
+            self._weight += weight
+
+            while len(part.entries) > 1 and (
+                len(part.entries) > self.partition_max_entries
+                or (self.partition_max_weight is not None and part.weight > self.partition_max_weight)
+            ):
+                self.quota_evictions += 1
+                self._evict_oldest(partition)
+
+            while self._entries > self.max_entries or (self.max_weight is not None and self._weight > self.max_weight):
+                # Fair share: take from whoever holds the most.
+                victim = max(self._partitions, key=lambda name: (self._partitions[name].weight, len(self._partitions[name].entries)))
+                self.evictions += 1
+                self._evict_oldest(victim)
+
+    def restore(self, partition: str, key: str, value: V, stored_at: float) -> bool:
+        """Insert a persisted entry unless it has expired or `key` was stored since; True when inserted."""
+        if self._expired(stored_at, self._clock()):
+            return False
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is not None and key in part.entries:
+                return False
+        self.set(partition, key, value, stored_at=stored_at)
+        return True
+
+    def pop(self, partition: str, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._remove(partition, key)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._entries = 0
+            self._weight = 0
+
+    def items(self) -> Iterator[Tuple[str, str, float, V]]:
+        """Yield `(partition, key, stored_at, value)` for every live entry, oldest first per partition."""
+        now = self._clock()
+        with self._lock:
+            snapshot = [
+                (name, key, stored_at, value)
+                for name, partition in self._partitions.items()
+                for key, (stored_at, value, _) in partition.entries.items()
+            ]
+        for name, key, stored_at, value in snapshot:
+            if not self._expired(stored_at, now):
+                yield name, key, stored_at, value
+
+    def partitions(self) -> List[str]:
+        with self._lock:
+            return list(self._partitions)
+
+    def partition_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: partition.stats() for name, partition in self._partitions.items()}
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "partitions": len(self._partitions),
+            "partition_max_entries": self.partition_max_entries,
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+            "partition_max_weight": self.partition_max_weight,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "quota_evictions": self.quota_evictions,
+            "expirations": self.expirations,
+        }
+
+
+__all__ = ["PartitionedCache", "TTLCache"]
@@ -0,0 +1,226 @@
+"""
+Circuit breaker around model-backed agent runs.
+
+The breaker watches a sliding window of recent agent runs and opens when the
+error rate or the share of slow runs crosses its threshold. While it is open,
+callers skip the provider entirely (see `app.heuristic` for the degraded
+grouping path) and a background task probes the provider with a tiny request,
+closing the breaker again once a probe succeeds quickly enough.
+
+A run that was cancelled (the client went away, or the server is shutting
+down) says nothing about the provider and is not recorded.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+BREAKER_ENABLED = os.getenv("SESSION_CONTEXT_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+BREAKER_ERROR_RATE = float(os.getenv("SESSION_CONTEXT_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_CALL_MS = float(os.getenv("SESSION_CONTEXT_BREAKER_SLOW_CALL_MS", "20000"))
+BREAKER_SLOW_RATE = float(os.getenv("SESSION_CONTEXT_BREAKER_SLOW_RATE", "0.8"))
+BREAKER_WINDOW = int(os.getenv("SESSION_CONTEXT_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("SESSION_CONTEXT_BREAKER_MIN_CALLS", "5"))
+BREAKER_CALL_TIMEOUT = float(os.getenv("SESSION_CONTEXT_BREAKER_CALL_TIMEOUT", "45"))
+BREAKER_PROBE_INTERVAL = float(os.getenv("SESSION_CONTEXT_BREAKER_PROBE_INTERVAL", "15"))
+MAX_PROBE_INTERVAL = 300.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised by `CircuitBreaker.call` instead of calling the provider while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Trips on error rate or latency and recovers through background probes.
+
+    Args:
+        error_rate (float): Failed share of the window at which the breaker opens.
+        slow_call_ms (float): Runs at least this slow count as slow.
+        slow_rate (float): Slow share of the window at which the breaker opens.
+        window (int): Number of most recent runs considered.
+        min_calls (int): Runs required in the window before the breaker can trip.
+        call_timeout (float): Seconds after which a run (or probe) is abandoned.
+        probe_interval (float): Seconds between probes while open; doubles after each failed probe.
+        enabled (bool): When False the breaker never opens.
+    """
+
+    def __init__(
+        self,
+        error_rate: float,
+        slow_call_ms: float,
+        slow_rate: float,
+        window: int,
+        min_calls: int,
+        call_timeout: float,
+        probe_interval: float,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.call_timeout = call_timeout
+        self.probe_interval = probe_interval
+        self.enabled = enabled
+        self._clock = clock
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._probe: Optional[Callable[[], Awaitable[Any]]] = None
+        self._probe_task: Optional["asyncio.Task[None]"] = None
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.last_trip_reason: Optional[str] = None
+        self.trips = 0
+        self.short_circuited = 0
+        self.fallbacks = 0
+        self.probes = 0
+        self.probe_failures = 0
+
+    def set_probe(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        """Register the coroutine used to check whether the provider has recovered."""
+        self._probe = probe
+
+    def allow(self) -> bool:
+        """Return True when a run may go to the provider."""
+        if not self.enabled or self.state == CLOSED:
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record(self, elapsed_ms: float, error: bool = False) -> None:
+        """Record a finished run and trip the breaker if the window is unhealthy."""
+        if not self.enabled or self.state != CLOSED:
+            return
+        self._outcomes.append((error, elapsed_ms >= self.slow_call_ms))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failed = sum(1 for error_flag, _ in self._outcomes if error_flag) / len(self._outcomes)
+        slow = sum(1 for _, slow_flag in self._outcomes if slow_flag) / len(self._outcomes)
+        if failed >= self.error_rate:
+            self.trip(f"error_rate={failed:.2f}")
+        elif slow >= self.slow_rate:
+            self.trip(f"slow_rate={slow:.2f}")
+
+    async def call(self, run: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        Make one provider call under the breaker and record its outcome.
+
+        Args:
+            run (callable): Starts the call; not invoked while the breaker is open.
+            timeout (float, optional): Seconds before the call is abandoned; defaults to `call_timeout`.
+
+        Raises:
+            CircuitOpenError: The breaker is open.
+            asyncio.TimeoutError: The call took longer than `timeout` (recorded as a failure).
+        """
+        if not self.allow():
+            raise CircuitOpenError("Model provider circuit is open")
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(run(), timeout=self.call_timeout if timeout is None else timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.record((time.perf_counter() - started) * 1000, error=True)
+            raise
+        self.record((time.perf_counter() - started) * 1000)
+        return result
+
+    def record_fallback(self) -> None:
+        self.fallbacks += 1
+
+    def trip(self, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = self._clock()
+        self.last_trip_reason = reason
+        self.trips += 1
+        self._outcomes.clear()
+        logger.warning("Circuit breaker opened (%s); serving degraded decisions", reason)
+        self._start_probe()
+
+    def reset(self) -> None:
+        self.state = CLOSED
+        self.opened_at = None
+        self._outcomes.clear()
+        logger.info("Circuit breaker closed; provider is healthy again")
+
+    def _start_probe(self) -> None:
+        if self._probe is None or (self._probe_task is not None and not self._probe_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._probe_task = loop.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        delay = self.probe_interval
+        while self.state != CLOSED:
+            await asyncio.sleep(delay)
+            self.state = HALF_OPEN
+            self.probes += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._probe(), timeout=self.call_timeout)  # type: ignore[misc]
+                healthy = (time.perf_counter() - started) * 1000 < self.slow_call_ms
+            except Exception as exc:
+                logger.info("Circuit breaker probe failed: %s", exc)
+                healthy = False
+            if healthy:
+                self.reset()
+                return
+            self.probe_failures += 1
+            self.state = OPEN
+            delay = min(delay * 2, MAX_PROBE_INTERVAL)
+
+    async def close(self) -> None:
+        """Cancel a pending probe task (called on shutdown)."""
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        window = len(self._outcomes)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "open_for_s": round(self._clock() - self.opened_at, 1) if self.opened_at is not None else 0.0,
+            "last_trip_reason": self.last_trip_reason,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+            "fallbacks": self.fallbacks,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "window_calls": window,
+            "window_error_rate": round(sum(1 for error, _ in self._outcomes if error) / window, 3) if window else 0.0,
+        }
+
+
+circuit_breaker = CircuitBreaker(
+    error_rate=BREAKER_ERROR_RATE,
+    slow_call_ms=BREAKER_SLOW_CALL_MS,
+    slow_rate=BREAKER_SLOW_RATE,
+    window=BREAKER_WINDOW,
+    min_calls=BREAKER_MIN_CALLS,
+    call_timeout=BREAKER_CALL_TIMEOUT,
+    probe_interval=BREAKER_PROBE_INTERVAL,
+    enabled=BREAKER_ENABLED,
+)
+
+__all__ = ["CLOSED", "HALF_OPEN", "OPEN", "CircuitBreaker", "CircuitOpenError", "circuit_breaker"]
@@ -0,0 +1,93 @@
+"""
+Compact, tabular prompt formatting for sessions and tabs.
+
+Most prompt tokens used to go to URL boilerplate (`https://www.`, tracking
+query strings), repeated hosts, and placeholders such as `Untitled`. The
+helpers here print one tab per line as `title | host/path`. The scheme,
+`www.`, query string and fragment are dropped, and a host shared by every
+tab of a session is printed once in the session header instead. Long fields
+are clipped to fit a token budget.
+
+Duplicate detection and ID mapping happen on the server with the full URLs,
+so nothing the model needs is lost by shortening them in the prompt.
+"""
+
+import math
+import os
+from typing import Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from .schemas import SessionTab, TabInfo
+
+PROMPT_FORMAT = os.getenv("SESSION_CONTEXT_PROMPT_FORMAT", "compact")
+PROMPT_TOKEN_BUDGET = int(os.getenv("SESSION_CONTEXT_PROMPT_TOKEN_BUDGET", "2000"))
+
+# Rough characters per token for English text and URLs; only used to enforce the budget.
+CHARS_PER_TOKEN = 4
+
+Tab = Union[TabInfo, SessionTab]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clip(text: Optional[str], limit: int) -> str:
+    """Collapse whitespace and cut to `limit` characters, marking the cut with an ellipsis."""
+    text = " ".join((text or "").split())
+    if len(text) <= limit:
+        return text
+    return text[: max(1, limit - 1)].rstrip() + "…"
+
+
+def split_url(url: Optional[str]) -> Tuple[str, str]:
+    """`(host, path)` without scheme, `www.`, query string or fragment; `/` paths become empty."""
+    if not url:
+        return "", ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return "", url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        # Not a web URL (e.g. `about:blank`, `chrome://newtab`); keep it as written.
+        return "", url.strip()
+    path = parts.path.rstrip("/")
+    return host, path
+
+
+def compact_url(url: Optional[str], path_chars: int = 60) -> str:
+    host, path = split_url(url)
+    return host + clip(path, path_chars)
+
+
+def shared_host(tabs: Sequence[Tab]) -> Optional[str]:
+    """The host every tab is on, if there is exactly one."""
+    hosts = {split_url(tab.url)[0] for tab in tabs}
+    if len(hosts) == 1:
+        host = hosts.pop()
+        return host or None
+    return None
+
+
+def tab_row(tab: Tab, host: Optional[str] = None, title_chars: int = 80, path_chars: int = 60) -> str:
+    """`title | host/path`, with the host left out when the header already names it."""
+    title = (tab.title or "").strip()
+    title = "" if title == "Untitled" else clip(title, title_chars)
+    tab_host, path = split_url(tab.url)
+    location = (clip(path, path_chars) or "/") if host else tab_host + clip(path, path_chars)
+    return f"{title} | {location}" if title else location
+
+
+__all__ = [
+    "PROMPT_FORMAT",
+    "PROMPT_TOKEN_BUDGET",
+    "clip",
+    "compact_url",
+    "estimate_tokens",
+    "shared_host",
+    "split_url",
+    "tab_row",
+]
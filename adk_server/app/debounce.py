@@ -0,0 +1,169 @@
+"""
+Per-tab debouncing of navigation events.
+
+Clicking through several pages in a few seconds produces a burst of events for
+the same tab, and only the last URL matters. Each event waits for a quiet
+window; a newer event for the same tab supersedes it, cancelling its pending
+timer or, if the classification already started, the in-flight agent run.
+Results are kept for polling (`GET /api/tab-events/{id}`) and can be awaited
+directly by push transports such as the WebSocket channel.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from .cache import TTLCache
+from .schemas import GroupingRequest, GroupingResponse, TabEventRequest, TabEventStatus
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_QUIET_MS = float(os.getenv("SESSION_CONTEXT_DEBOUNCE_MS", "800"))
+DEBOUNCE_RESULT_TTL_SECONDS = float(os.getenv("SESSION_CONTEXT_DEBOUNCE_RESULT_TTL", "300"))
+DEBOUNCE_MAX_EVENTS = 10_000
+
+Classifier = Callable[[GroupingRequest, str], Awaitable[GroupingResponse]]
+
+
+@dataclass
+class TabEvent:
+    """One submitted navigation event and, eventually, its outcome."""
+
+    tab_key: str
+    request: TabEventRequest
+    user_id: str
+    event_id: str = field(default_factory=lambda: uuid4().hex)
+    status: str = "pending"
+    superseded_by: Optional["TabEvent"] = None
+    decision: Optional[GroupingResponse] = None
+    detail: Optional[str] = None
+    settled: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def latest(self) -> "TabEvent":
+        """Follow the supersession chain to the newest event for the tab."""
+        event = self
+        while event.superseded_by is not None:
+            event = event.superseded_by
+        return event
+
+    def to_status(self) -> TabEventStatus:
+        return TabEventStatus(
+            eventId=self.event_id,
+            tabId=self.request.tabId,
+            status=self.status,  # type: ignore[arg-type]
+            supersededBy=self.latest().event_id if self.superseded_by is not None else None,
+            decision=self.decision,
+            detail=self.detail,
+        )
+
+
+class TabEventDebouncer:
+    """
+    Classifies only the settled URL of each tab.
+
+    Args:
+        classify (callable): Coroutine producing the grouping decision for a request and user.
+        quiet_seconds (float): How long a tab must stay on one URL before it is classified.
+        result_ttl_seconds (float): How long finished events remain pollable.
+    """
+
+    def __init__(self, classify: Classifier, quiet_seconds: float, result_ttl_seconds: float) -> None:
+        self.classify = classify
+        self.quiet_seconds = quiet_seconds
+        self._events: TTLCache[TabEvent] = TTLCache(max_entries=DEBOUNCE_MAX_EVENTS, ttl_seconds=result_ttl_seconds)
+        self._latest: Dict[str, TabEvent] = {}
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self.received = 0
+        self.runs = 0
+        self.suppressed = 0
+        self.cancelled_runs = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, tab_key: str, request: TabEventRequest, user_id: str) -> TabEvent:
+        """Record an event for `tab_key` of `user_id`, superseding any unsettled earlier one."""
+        self.received += 1
+        event = TabEvent(tab_key=tab_key, request=request, user_id=user_id)
+        self._events.set(event.event_id, event)
+
+        previous = self._latest.get(tab_key)
+        task = self._tasks.pop(tab_key, None)
+        if previous is not None and previous.status in ("pending", "running"):
+            if previous.status == "running":
+                self.cancelled_runs += 1
+            else:
+                self.suppressed += 1
+            previous.status = "superseded"
+            previous.superseded_by = event
+            previous.settled.set()
+        if task is not None and not task.done():
+            task.cancel()
+
+        self._latest[tab_key] = event
+        self._tasks[tab_key] = asyncio.create_task(self._settle(event))
+        return event
+
+    async def _settle(self, event: TabEvent) -> None:
+        await asyncio.sleep(self.quiet_seconds)
+        event.status = "running"
+        self.runs += 1
+        # Runs outlive the request that submitted them, so each gets its own trace.
+        root = tracer.start_trace(event.event_id, "tab_event.classify", **{"tab.id": str(event.request.tabId)})
+        try:
+            event.decision = await self.classify(event.request, event.user_id)
+            event.status = "done"
+            self.completed += 1
+        except asyncio.CancelledError:
+            tracer.end_span(root)
+            raise
+        except HTTPException as exc:
+            event.status, event.detail = "failed", str(exc.detail)
+            self.failed += 1
+        except Exception as exc:
+            logger.exception("Debounced classification failed for tab %s: %s", event.request.tabId, exc)
+            event.status, event.detail = "failed", "Classification failed"
+            self.failed += 1
+        tracer.end_span(root)
+        event.settled.set()
+        if self._latest.get(event.tab_key) is event:
+            del self._latest[event.tab_key]
+            self._tasks.pop(event.tab_key, None)
+
+    def get(self, event_id: str) -> Optional[TabEvent]:
+        return self._events.get(event_id, record=False)
+
+    async def wait(self, event: TabEvent, timeout: float) -> TabEvent:
+        """Wait up to `timeout` seconds for `event` to settle (or be superseded)."""
+        if timeout > 0 and not event.settled.is_set():
+            try:
+                await asyncio.wait_for(event.settled.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return event
+
+    async def close(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "quiet_ms": round(self.quiet_seconds * 1000),
+            "received": self.received,
+            "runs": self.runs,
+            "suppressed": self.suppressed,
+            "cancelled_runs": self.cancelled_runs,
+            "suppressed_total": self.suppressed + self.cancelled_runs,
+            "completed": self.completed,
+            "failed": self.failed,
+            "pending_tabs": len(self._latest),
+        }
+
+
+__all__ = ["TabEvent", "TabEventDebouncer"]
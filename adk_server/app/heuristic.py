@@ -0,0 +1,107 @@
+"""
+Local grouping heuristic used while the model provider is unavailable.
+
+It mirrors the extension's `utils/sessionizer.js` rules: a tab continues the
+most recently active session unless the user was idle longer than the idle
+threshold or the base domain changed. On top of that, a tab joins the
+lexically closest session when its term similarity is high enough.
+Everything else starts a new session labelled from the tab's title.
+"""
+
+import os
+import re
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from .schemas import ExistingSession, GroupingRequest, GroupingResponse, TabInfo
+
+# Matches DEFAULT_IDLE_THRESHOLD_MINUTES in the extension's utils/constants.js.
+HEURISTIC_IDLE_MINUTES = float(os.getenv("SESSION_CONTEXT_HEURISTIC_IDLE_MINUTES", "12"))
+HEURISTIC_MERGE_SIMILARITY = float(os.getenv("SESSION_CONTEXT_HEURISTIC_MERGE_SIMILARITY", "0.3"))
+MAX_LABEL_LENGTH = 50
+
+TITLE_SEPARATORS = re.compile(r"\s+[-|–—·:]\s+")
+
+
+def base_domain(url: Optional[str]) -> Optional[str]:
+    """Last two host labels, as `getBaseDomain` in sessionizer.js."""
+    if not url:
+        return None
+    try:
+        hostname = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not hostname:
+        return None
+    parts = hostname.split(".")
+    return ".".join(parts[-2:]) if len(parts) >= 2 else hostname
+
+
+def last_activity(session: ExistingSession) -> Optional[float]:
+    """Latest known activity time of a session in epoch milliseconds."""
+    candidates = [session.endTs, session.startTs] + [tab.ts for tab in session.tabList]
+    known = [value for value in candidates if value is not None]
+    return max(known) if known else None
+
+
+def suggest_label(tab: TabInfo) -> Optional[str]:
+    """Label a new session from the tab title's leading segment, or its domain."""
+    title = (tab.title or "").strip()
+    if title and title != "Untitled":
+        label = TITLE_SEPARATORS.split(title, maxsplit=1)[0].strip()
+        return label[:MAX_LABEL_LENGTH]
+    return base_domain(tab.url)
+
+
+def heuristic_decision(
+    request: GroupingRequest,
+    similarities: List[float],
+    idle_minutes: float = HEURISTIC_IDLE_MINUTES,
+    merge_similarity: float = HEURISTIC_MERGE_SIMILARITY,
+) -> GroupingResponse:
+    """
+    Decide a grouping without calling the model.
+
+    Args:
+        request (GroupingRequest): The grouping request.
+        similarities (list): Lexical similarity of the new tab to each existing session.
+        idle_minutes (float): Idle gap after which the most recent session is not continued.
+        merge_similarity (float): Minimum similarity for a lexical merge.
+    """
+    new_tab = request.newTab
+    now_ms = new_tab.ts or time.time() * 1000
+    new_domain = base_domain(new_tab.url)
+
+    recent: Optional[ExistingSession] = None
+    recent_ts: Optional[float] = None
+    for session in request.existingSessions:
+        activity = last_activity(session)
+        if activity is not None and (recent_ts is None or activity > recent_ts):
+            recent, recent_ts = session, activity
+
+    if recent is not None and recent.tabList and recent_ts is not None:
+        idle = now_ms - recent_ts > idle_minutes * 60 * 1000
+        if not idle and new_domain and base_domain(recent.tabList[-1].url) == new_domain:
+            return _merge(recent, "heuristic_same_domain")
+
+    if similarities:
+        best_index = max(range(len(similarities)), key=similarities.__getitem__)
+        if similarities[best_index] >= merge_similarity:
+            return _merge(request.existingSessions[best_index], "heuristic_similarity")
+
+    label = suggest_label(new_tab)
+    return GroupingResponse(action="create_new", suggestedLabel=label, label=label, reason="heuristic_new_session")
+
+
+def _merge(session: ExistingSession, reason: str) -> GroupingResponse:
+    return GroupingResponse(
+        action="merge",
+        sessionId=session.id,
+        updatedLabel=session.label,
+        label=session.label,
+        reason=reason,
+    )
+
+
+__all__ = ["base_domain", "heuristic_decision", "last_activity", "suggest_label"]
@@ -0,0 +1,141 @@
+"""
+Process-wide pooled HTTP client shared by every LiteLLM model instance.
+
+LiteLLM builds its provider clients on top of `litellm.aclient_session` when it
+is set, so installing one keep-alive `httpx.AsyncClient` there lets all agents
+(coordinator, summarizer, matcher, labeler) reuse the same provider
+connections and TLS sessions across hops and requests.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import litellm
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("SESSION_CONTEXT_HTTP_POOL_SIZE", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("SESSION_CONTEXT_HTTP_POOL_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SESSION_CONTEXT_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_POOL_TIMEOUT = float(os.getenv("SESSION_CONTEXT_HTTP_TIMEOUT", "600"))
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+HTTP2_ENABLED = os.getenv("SESSION_CONTEXT_HTTP2", "true").lower() in ("1", "true", "yes") and HTTP2_AVAILABLE
+
+# httpcore trace events whose started/complete pair measures connection setup.
+SETUP_EVENTS = {"connection.connect_tcp": "connect", "connection.start_tls": "tls"}
+
+
+class ConnectionStats:
+    """Counts requests against new TCP connections and TLS handshakes via httpcore tracing."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connects = 0
+        self.tls_handshakes = 0
+        self.connect_ms = 0.0
+        self.tls_ms = 0.0
+        self._started: Dict[Tuple[int, str], float] = {}
+        self._lock = threading.Lock()
+
+    async def on_request(self, request: httpx.Request) -> None:
+        """httpx request hook that attaches the trace callback."""
+        with self._lock:
+            self.requests += 1
+        trace_id = id(request)
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            prefix, _, phase = event_name.rpartition(".")
+            kind = SETUP_EVENTS.get(prefix)
+            if kind is None:
+                return
+            if phase == "started":
+                self._started[(trace_id, kind)] = time.perf_counter()
+            elif phase == "complete":
+                started = self._started.pop((trace_id, kind), None)
+                elapsed_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+                with self._lock:
+                    if kind == "connect":
+                        self.connects += 1
+                        self.connect_ms += elapsed_ms
+                    else:
+                        self.tls_handshakes += 1
+                        self.tls_ms += elapsed_ms
+            elif phase == "failed":
+                self._started.pop((trace_id, kind), None)
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.connects,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_rate": round(1 - self.connects / self.requests, 4) if self.requests else 0.0,
+            "connect_ms_total": round(self.connect_ms, 1),
+            "tls_ms_total": round(self.tls_ms, 1),
+        }
+
+
+connection_stats = ConnectionStats()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_POOL_TIMEOUT, connect=10.0),
+            event_hooks={"request": [connection_stats.on_request]},
+        )
+        logger.info(
+            "Created shared HTTP client: http2=%s max_connections=%s max_keepalive=%s",
+            HTTP2_ENABLED,
+            HTTP_POOL_MAX_CONNECTIONS,
+            HTTP_POOL_MAX_KEEPALIVE,
+        )
+    return _client
+
+
+def install_litellm_client() -> None:
+    """Make LiteLLM build its provider clients on the shared pool."""
+    litellm.aclient_session = get_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    stats = connection_stats.stats()
+    stats.update(
+        {
+            "http2": HTTP2_ENABLED,
+            "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+        }
+    )
+    return stats
+
+
+__all__ = [
+    "close_http_client",
+    "connection_stats",
+    "get_http_client",
+    "http_pool_stats",
+    "install_litellm_client",
+]
@@ -0,0 +1,207 @@
+"""
+Idempotency keys for agent-backed endpoints.
+
+A client that times out and retries `/api/group` or `/api/label` used to start
+a second agent run while the first one was still going. Requests may now carry
+an `Idempotency-Key` header. The first request with a given key runs the
+handler as a task of its own, so the run finishes even if that client has
+disconnected. A retry with the same key attaches to the task while it is in
+flight, and gets the stored response once it completes. Replays are marked
+with `Idempotent-Replayed: true`. Admission (the rate limit) is only charged
+when the handler actually runs, so replays and joins are free.
+
+Keys are scoped to the client identity and the endpoint. Reusing a key with a
+different request body is rejected with HTTP 422. Only successful responses
+are stored, so a retry after an error runs again. The same goes for fallback
+answers: a handler that serves one (such as the heuristic decision `/api/group`
+returns while the provider is failing) calls `skip_storing()`, so a retry gets
+a real decision instead of a replay of the fallback. Stored responses live in a
+per-client partition of a size-bounded cache and expire after
+`SESSION_CONTEXT_IDEMPOTENCY_TTL` seconds.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+
+from .cache import PartitionedCache
+from .rate_limit import client_identity
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("SESSION_CONTEXT_IDEMPOTENCY_TTL", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_MAX_BYTES = int(os.getenv("SESSION_CONTEXT_IDEMPOTENCY_MAX_BYTES", str(16 * 1024 * 1024)))
+IDEMPOTENCY_CLIENT_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_IDEMPOTENCY_CLIENT_SIZE", "200"))
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+M = TypeVar("M", bound=BaseModel)
+
+# Each run executes in a task of its own, so this flag is private to one handler call.
+_store_response: contextvars.ContextVar[bool] = contextvars.ContextVar("session_context_idempotency_store", default=True)
+
+
+def fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def skip_storing() -> None:
+    """Keep the response being built out of the replay store; a retry with the same key runs again."""
+    _store_response.set(False)
+
+
+async def _resolved(result: BaseModel) -> BaseModel:
+    return result
+
+
+class IdempotencyStore:
+    """
+    In-flight runs and completed responses, keyed by client, endpoint and idempotency key.
+
+    Args:
+        ttl_seconds (float): How long a completed response can be replayed.
+        max_entries (int): Stored responses across all clients.
+        max_bytes (int): Serialized bytes of stored responses across all clients.
+        client_max_entries (int): Stored responses per client.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int, client_max_entries: int) -> None:
+        # Values are (request fingerprint, response model, serialized size).
+        self._done: PartitionedCache[Tuple[str, BaseModel, int]] = PartitionedCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            partition_max_entries=client_max_entries,
+            weigh=lambda value: value[2],
+            max_weight=max_bytes,
+        )
+        self._in_flight: Dict[Tuple[str, str], Tuple[str, "asyncio.Task[Any]"]] = {}
+        self.executions = 0
+        self.replays = 0
+        self.joins = 0
+        self.conflicts = 0
+        self.not_stored = 0
+
+    async def run(
+        self,
+        http_request: Request,
+        response: Response,
+        endpoint: str,
+        body: M,
+        handler: Callable[[], Awaitable[BaseModel]],
+        admit: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> BaseModel:
+        """
+        Run `handler` once per idempotency key; without the header it simply runs.
+
+        Args:
+            http_request (Request): The incoming request, for the header and client identity.
+            response (Response): Outgoing response, to mark replays.
+            endpoint (str): Endpoint name that scopes the key.
+            body (BaseModel): The validated request body, fingerprinted to detect key reuse.
+            handler (callable): Produces the response.
+            admit (callable, optional): Awaited before `handler` runs, not for replays or joins;
+                raises (e.g. HTTP 429) to refuse the run.
+
+        Returns:
+            BaseModel: The fresh or replayed response.
+        """
+        key = http_request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            if admit is not None:
+                await admit()
+            return await handler()
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        client = client_identity(http_request)
+        scoped = f"{endpoint}:{key}"
+        body_hash = fingerprint(body)
+
+        existing = self._existing(client, scoped, body_hash, response)
+        if existing is None and admit is not None:
+            await admit()
+            # Another request with the key may have started while admission was pending.
+            existing = self._existing(client, scoped, body_hash, response)
+        if existing is not None:
+            return await existing
+
+        self.executions += 1
+        task = asyncio.create_task(self._execute(client, scoped, body_hash, handler))
+        # Retrieve the outcome even if every waiter has gone away.
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[(client, scoped)] = (body_hash, task)
+        # Shielded: a client that disconnects must not cancel the run its retry will attach to.
+        return await asyncio.shield(task)
+
+    def _existing(self, client: str, scoped: str, body_hash: str, response: Response) -> Optional[Awaitable[BaseModel]]:
+        """The stored response or in-flight run for a key, None if the handler has to run."""
+        stored = self._done.get(client, scoped)
+        if stored is not None:
+            self._check(stored[0], body_hash)
+            self.replays += 1
+            response.headers[REPLAYED_HEADER] = "true"
+            return _resolved(stored[1])
+
+        in_flight = self._in_flight.get((client, scoped))
+        if in_flight is not None:
+            self._check(in_flight[0], body_hash)
+            self.joins += 1
+            response.headers[REPLAYED_HEADER] = "true"
+            return asyncio.shield(in_flight[1])
+        return None
+
+    async def _execute(self, client: str, scoped: str, body_hash: str, handler: Callable[[], Awaitable[BaseModel]]) -> BaseModel:
+        _store_response.set(True)
+        try:
+            result = await handler()
+            if _store_response.get():
+                self._done.set(client, scoped, (body_hash, result, len(result.model_dump_json())))
+            else:
+                self.not_stored += 1
+            return result
+        finally:
+            self._in_flight.pop((client, scoped), None)
+
+    def _check(self, expected: str, body_hash: str) -> None:
+        if expected != body_hash:
+            self.conflicts += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+
+    def stats(self) -> Dict[str, Any]:
+        stored = self._done.stats()
+        return {
+            "stored": stored["entries"],
+            "stored_bytes": stored["weight"],
+            "max_bytes": stored["max_weight"],
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "replays": self.replays,
+            "joins": self.joins,
+            "conflicts": self.conflicts,
+            "not_stored": self.not_stored,
+            "evictions": stored["evictions"] + stored["quota_evictions"],
+            "expirations": stored["expirations"],
+        }
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+    max_bytes=IDEMPOTENCY_MAX_BYTES,
+    client_max_entries=IDEMPOTENCY_CLIENT_MAX_ENTRIES,
+)
+
+__all__ = ["IDEMPOTENCY_HEADER", "REPLAYED_HEADER", "IdempotencyStore", "idempotency_store", "skip_storing"]
@@ -0,0 +1,261 @@
+"""
+Per-user inverted index from domains and terms to session IDs.
+
+Each user's index maps three kinds of keys to the sessions that contain them:
+the registrable domain of a tab (`d:python.org`), tokens from its URL path
+(`p:asyncio`) and terms from its title (`t:tutorial`). A fourth key kind holds
+normalized tab URLs (`u:...`) for duplicate checks. Looking up a tab costs
+one dictionary probe per key, independent of the number of sessions.
+
+The extension sends its sessions with every request, so `sync` re-indexes only
+sessions that are new or whose tabs changed since they were last seen, and
+`add_tab` folds a merged tab in incrementally.
+
+Each user's index is capped at `SESSION_CONTEXT_INDEX_USER_SESSIONS` sessions and
+`SESSION_CONTEXT_INDEX_USER_KEYS` distinct keys. Over either quota, that user's
+least recently indexed sessions are dropped; their fingerprints are kept so an
+unchanged session is not re-indexed (and another evicted) on every request.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Union
+from urllib.parse import unquote, urlsplit
+
+from .cache import TTLCache
+from .schemas import ExistingSession, SessionTab, TabInfo
+from .text import tokenize
+from .urls import normalize_url, registrable_domain
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAX_USERS = int(os.getenv("SESSION_CONTEXT_INDEX_MAX_USERS", "1000"))
+INDEX_TTL_SECONDS = float(os.getenv("SESSION_CONTEXT_INDEX_TTL", str(24 * 3600)))
+INDEX_USER_MAX_SESSIONS = int(os.getenv("SESSION_CONTEXT_INDEX_USER_SESSIONS", "500"))
+INDEX_USER_MAX_KEYS = int(os.getenv("SESSION_CONTEXT_INDEX_USER_KEYS", "50000"))
+
+DOMAIN = "d:"
+PATH = "p:"
+TITLE = "t:"
+URL = "u:"
+
+
+def tab_keys(tab: Union[TabInfo, SessionTab]) -> Set[str]:
+    """Index keys for one tab."""
+    keys: Set[str] = set()
+    domain = registrable_domain(tab.url)
+    if domain:
+        keys.add(DOMAIN + domain)
+    try:
+        path = urlsplit(tab.url).path
+    except ValueError:
+        path = ""
+    keys.update(PATH + token for token in tokenize(unquote(path).replace("-", " ").replace("_", " ")))
+    keys.update(TITLE + token for token in tokenize(tab.title))
+    url = normalize_url(tab.url)
+    if url:
+        keys.add(URL + url)
+    return keys
+
+
+def session_fingerprint(session: ExistingSession) -> str:
+    """Cheap change detector: tab count plus the first and last tab URLs."""
+    tabs = session.tabList
+    if not tabs:
+        return "0"
+    digest = hashlib.sha1(f"{tabs[0].url}\n{tabs[-1].url}".encode("utf-8")).hexdigest()[:12]
+    return f"{len(tabs)}:{digest}"
+
+
+@dataclass
+class UserIndex:
+    """Postings and per-session key sets for one user, least recently indexed session first."""
+
+    postings: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+    session_keys: Dict[str, Set[str]] = field(default_factory=dict)
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+    max_sessions: int = INDEX_USER_MAX_SESSIONS
+    max_keys: int = INDEX_USER_MAX_KEYS
+    evictions: int = 0
+
+    def add(self, session_id: str, keys: Iterable[str]) -> None:
+        # Re-inserting moves the session to the most recently indexed end.
+        owned = self.session_keys.pop(session_id, set())
+        self.session_keys[session_id] = owned
+        for key in keys:
+            if key not in owned:
+                owned.add(key)
+                self.postings[key].add(session_id)
+        self._enforce_quota(keep=session_id)
+
+    def _drop_keys(self, session_id: str) -> None:
+        for key in self.session_keys.pop(session_id, ()):
+            sessions = self.postings.get(key)
+            if sessions is not None:
+                sessions.discard(session_id)
+                if not sessions:
+                    del self.postings[key]
+
+    def _enforce_quota(self, keep: str) -> None:
+        while len(self.session_keys) > 1 and (
+            len(self.session_keys) > self.max_sessions or len(self.postings) > self.max_keys
+        ):
+            oldest = next(iter(self.session_keys))
+            if oldest == keep:
+                break
+            # The fingerprint stays: the session is known, just not indexed.
+            self._drop_keys(oldest)
+            self.evictions += 1
+
+    def remove(self, session_id: str) -> None:
+        self._drop_keys(session_id)
+        self.fingerprints.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self.session_keys)
+
+
+class SessionIndex:
+    """
+    Inverted indexes for every active user.
+
+    Args:
+        max_users (int): Users whose index is kept; the least recently used is dropped.
+        ttl_seconds (float): Idle time after which a user's index is dropped.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float) -> None:
+        self._users: TTLCache[UserIndex] = TTLCache(max_entries=max_users, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.reindexed = 0
+        self.lookups = 0
+
+    def _user(self, user_id: str) -> UserIndex:
+        index = self._users.get(user_id, record=False)
+        if index is None:
+            index = UserIndex()
+        # Re-setting refreshes the entry's TTL and LRU position.
+        self._users.set(user_id, index)
+        return index
+
+    def sync(self, user_id: str, sessions: List[ExistingSession]) -> List[ExistingSession]:
+        """
+        Index sessions that are new or changed since they were last seen; drop closed ones.
+
+        Returns:
+            list: The sessions that were (re-)indexed.
+        """
+        changed: List[ExistingSession] = []
+        with self._lock:
+            index = self._user(user_id)
+            live = {session.id for session in sessions}
+            for session_id in (set(index.session_keys) | set(index.fingerprints)) - live:
+                index.remove(session_id)
+            for session in sessions:
+                fingerprint = session_fingerprint(session)
+                if index.fingerprints.get(session.id) == fingerprint:
+                    continue
+                index.remove(session.id)
+                for tab in session.tabList:
+                    index.add(session.id, tab_keys(tab))
+                index.fingerprints[session.id] = fingerprint
+                self.reindexed += 1
+                changed.append(session)
+        return changed
+
+    def add_tab(self, user_id: str, session: ExistingSession, tab: TabInfo) -> None:
+        """Fold a tab merged into `session` into the index."""
+        with self._lock:
+            index = self._user(user_id)
+            index.add(session.id, tab_keys(tab))
+            # The client's next request carries one more tab; expect that fingerprint.
+            tabs = session.tabList
+            first_url = tabs[0].url if tabs else tab.url
+            digest = hashlib.sha1(f"{first_url}\n{tab.url}".encode("utf-8")).hexdigest()[:12]
+            index.fingerprints[session.id] = f"{len(tabs) + 1}:{digest}"
+
+    def remove_session(self, user_id: str, session_id: str) -> None:
+        with self._lock:
+            index = self._users.get(user_id, record=False)
+            if index is not None:
+                index.remove(session_id)
+
+    def candidates(self, user_id: str, tab: TabInfo, kinds: FrozenSet[str] = frozenset((DOMAIN, PATH, TITLE))) -> Counter:
+        """
+        Sessions sharing a domain, path token or title term with `tab`.
+
+        Returns:
+            Counter: Session ID -> number of shared keys.
+        """
+        self.lookups += 1
+        index = self._users.get(user_id, record=False)
+        shared: Counter = Counter()
+        if index is None:
+            return shared
+        for key in tab_keys(tab):
+            if key[:2] in kinds:
+                shared.update(index.postings.get(key, ()))
+        return shared
+
+    def sessions_with_url(self, user_id: str, url: Optional[str]) -> Set[str]:
+        """IDs of sessions that already contain a tab with this (normalized) URL."""
+        self.lookups += 1
+        index = self._users.get(user_id, record=False)
+        normalized = normalize_url(url)
+        if index is None or not normalized:
+            return set()
+        return set(index.postings.get(URL + normalized, ()))
+
+    def snapshot_records(self) -> List[list]:
+        """`[user, stored_at, {session_id: keys}, fingerprints]` for every live user index."""
+        with self._lock:
+            return [
+                [
+                    user_id,
+                    stored_at,
+                    {session_id: sorted(keys) for session_id, keys in index.session_keys.items()},
+                    dict(index.fingerprints),
+                ]
+                for user_id, stored_at, index in self._users.items()
+            ]
+
+    def restore_records(self, records: Iterable[list]) -> int:
+        """Rebuild persisted user indexes, skipping users indexed since; returns how many were added."""
+        restored = 0
+        for user_id, stored_at, session_keys, fingerprints in records:
+            index = UserIndex(fingerprints=fingerprints)
+            for session_id, keys in session_keys.items():
+                index.add(session_id, keys)
+            with self._lock:
+                restored += self._users.restore(user_id, index, stored_at)
+        return restored
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def partition_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Indexed sessions and keys per user."""
+        return {
+            user_id: {"sessions": len(index), "keys": len(index.postings), "evictions": index.evictions}
+            for user_id, _, index in self._users.items()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        users = [index for _, _, index in self._users.items()]
+        return {
+            "users": len(users),
+            "sessions": sum(len(index) for index in users),
+            "keys": sum(len(index.postings) for index in users),
+            "reindexed_sessions": self.reindexed,
+            "quota_evictions": sum(index.evictions for index in users),
+            "lookups": self.lookups,
+        }
+
+
+session_index = SessionIndex(max_users=INDEX_MAX_USERS, ttl_seconds=INDEX_TTL_SECONDS)
+
+__all__ = ["SessionIndex", "session_fingerprint", "session_index", "tab_keys"]
@@ -3,6 +3,8 @@ Labeler agent module - Generates descriptive labels for browsing sessions.
 """
 
 from .agent import create_labeler_agent
+from .drift import TopicProfiles, topic_profiles
+from .extractive import ExtractiveLabeler, extractive_labeler
 
-__all__ = ["create_labeler_agent"]
+__all__ = ["ExtractiveLabeler", "TopicProfiles", "create_labeler_agent", "extractive_labeler", "topic_profiles"]
 
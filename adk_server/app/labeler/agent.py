@@ -7,25 +7,29 @@ import os
 from typing import Optional
 
 from google.adk.agents import LlmAgent
-from google.adk.models.lite_llm import LiteLlm
 
-from .prompt import LABELER_INSTRUCTION
+from ..models import create_model
+from ..tracing import tracer
+from ..usage import prompt_usage
+from .prompt import BATCH_LABELER_INSTRUCTION, LABELER_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 
 
-def create_labeler_agent(api_key: Optional[str] = None, model: Optional[str] = None) -> LlmAgent:
+def create_labeler_agent(api_key: Optional[str] = None, model: Optional[str] = None, batch: bool = False) -> LlmAgent:
     """
     Create the labeler agent that generates session labels.
 
     Args:
         api_key (str, optional): OpenAI API key. Defaults to env var.
         model (str, optional): Model identifier. Defaults to gpt-4o-mini.
+        batch (bool): Label several sessions per message, answering with a JSON object.
 
     Returns:
         LlmAgent: The configured labeler agent
     """
-    logger.info("Creating labeler agent")
+    name = "batch_labeler_agent" if batch else "labeler_agent"
+    logger.info("Creating %s", name)
 
     if not api_key:
         api_key = os.getenv("OPENAI_API_KEY")
@@ -34,12 +38,14 @@ def create_labeler_agent(api_key: Optional[str] = None, model: Optional[str] = N
         model = os.getenv("OPENAI_MODEL", "openai/gpt-4o-mini")
 
     agent = LlmAgent(
-        name="labeler_agent",
-        model=LiteLlm(model=model, api_key=api_key),
+        name=name,
+        model=create_model(model, api_key, agent_name=name),
         description="Generates concise, descriptive labels for browsing sessions based on tab content.",
-        instruction=LABELER_INSTRUCTION,
+        instruction=BATCH_LABELER_INSTRUCTION if batch else LABELER_INSTRUCTION,
+        before_model_callback=tracer.before_model_callback,
+        after_model_callback=[prompt_usage.after_model_callback, tracer.after_model_callback],
     )
 
-    logger.info("Labeler agent created successfully")
+    logger.info("%s created successfully", name)
     return agent
 
@@ -0,0 +1,124 @@
+"""
+Batch labeling - Packs many sessions into as few labeler calls as fit.
+
+Each session becomes a block headed by a short handle (`L1`, `L2`, ...), like
+the `S1` session handles of grouping prompts, so caller IDs never reach the
+model. Blocks are packed in request order into messages of at most
+`SESSION_CONTEXT_LABEL_BATCH_TOKEN_BUDGET` input tokens and
+`SESSION_CONTEXT_LABEL_BATCH_MAX_ITEMS` sessions. The batch labeler answers
+each message with one JSON object mapping handles to labels.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from ..compact import estimate_tokens
+from ..schemas import TabInfo
+from .prompt import build_batch_label_block, clean_label
+
+LABEL_BATCH_TOKEN_BUDGET = int(os.getenv("SESSION_CONTEXT_LABEL_BATCH_TOKEN_BUDGET", "4000"))
+LABEL_BATCH_MAX_ITEMS = int(os.getenv("SESSION_CONTEXT_LABEL_BATCH_MAX_ITEMS", "20"))
+LABEL_BATCH_CONCURRENCY = int(os.getenv("SESSION_CONTEXT_LABEL_BATCH_CONCURRENCY", "4"))
+# Items accepted per request; larger imports should be split by the caller.
+LABEL_BATCH_MAX_REQUEST_ITEMS = int(os.getenv("SESSION_CONTEXT_LABEL_BATCH_MAX_REQUEST_ITEMS", "500"))
+
+REPLY_LINE_PATTERN = re.compile(r"\b(L\d+)\b\s*[\"']?\s*[:=\-–]\s*[\"']?([^\"'\n,}]+)", re.IGNORECASE)
+
+# Batch labeling outcomes: requests, items, calls, extractive, labeled, retried, failed.
+batch_label_counts: Counter = Counter()
+
+
+def batch_handle(index: int) -> str:
+    return f"L{index + 1}"
+
+
+@dataclass
+class LabelChunk:
+    """Sessions sent together in one labeler call, as (item ID, handle, block)."""
+
+    entries: List[Tuple[str, str, str]] = field(default_factory=list)
+    tokens: int = 0
+
+    def handles(self) -> Dict[str, str]:
+        """Handle -> item ID."""
+        return {handle: item_id for item_id, handle, _ in self.entries}
+
+    def blocks(self) -> List[str]:
+        return [block for _, _, block in self.entries]
+
+
+def pack_label_chunks(
+    items: Iterable[Tuple[str, Sequence[TabInfo]]],
+    token_budget: int = LABEL_BATCH_TOKEN_BUDGET,
+    max_items: int = LABEL_BATCH_MAX_ITEMS,
+) -> List[LabelChunk]:
+    """
+    Pack sessions into labeler calls, in order, without exceeding either limit.
+
+    A session whose block alone exceeds the budget still gets a call of its own;
+    blocks are bounded by the tabs shown per session, so this stays small.
+
+    Args:
+        items (iterable): `(item ID, tabs)` pairs.
+        token_budget (int): Approximate input tokens per call for the session blocks.
+        max_items (int): Sessions per call.
+
+    Returns:
+        list: The chunks, each numbering its handles from `L1`.
+    """
+    chunks: List[LabelChunk] = []
+    current = LabelChunk()
+    for item_id, tabs in items:
+        handle = batch_handle(len(current.entries))
+        block = build_batch_label_block(handle, tabs)
+        tokens = estimate_tokens(block)
+        if current.entries and (current.tokens + tokens > token_budget or len(current.entries) >= max(1, max_items)):
+            chunks.append(current)
+            current = LabelChunk()
+            handle = batch_handle(0)
+            block = build_batch_label_block(handle, tabs)
+        current.entries.append((item_id, handle, block))
+        current.tokens += tokens
+    if current.entries:
+        chunks.append(current)
+    return chunks
+
+
+def parse_batch_labels(text: str, handles: Iterable[str]) -> Dict[str, str]:
+    """
+    Read `handle -> label` from the batch labeler's reply.
+
+    Accepts the requested JSON object (also inside code fences or surrounding
+    text) and, failing that, `L1: label` lines. Unknown handles and empty
+    labels are dropped; the caller retries whatever is missing.
+    """
+    wanted = {handle.upper() for handle in handles}
+    pairs: Dict[str, str] = {}
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        try:
+            parsed = json.loads(text[start : end + 1])
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            pairs = {str(key).strip().upper(): str(value) for key, value in parsed.items() if isinstance(value, str)}
+    if not pairs:
+        pairs = {match.group(1).upper(): match.group(2) for match in REPLY_LINE_PATTERN.finditer(text)}
+    labels = {handle: clean_label(label) for handle, label in pairs.items() if handle in wanted}
+    return {handle: label for handle, label in labels.items() if label}
+
+
+__all__ = [
+    "LABEL_BATCH_CONCURRENCY",
+    "LABEL_BATCH_MAX_ITEMS",
+    "LABEL_BATCH_MAX_REQUEST_ITEMS",
+    "LABEL_BATCH_TOKEN_BUDGET",
+    "LabelChunk",
+    "batch_label_counts",
+    "pack_label_chunks",
+    "parse_batch_labels",
+]
@@ -0,0 +1,171 @@
+"""
+Topic drift tracking - Keeps session labels stable while merges stay on topic.
+
+Each session gets a term-weight profile built from its tabs, and a copy of the
+profile as it was when the session's current label was set. A merge only needs
+a fresh label when the profile with the new tab has moved further than
+`SESSION_CONTEXT_LABEL_DRIFT_THRESHOLD` (measured as cosine distance) from that
+copy. Drift accumulates over merges, so a mature session whose topic slowly
+changes is still relabeled even though no single tab moves it much.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from ..cache import PartitionedCache
+from ..schemas import ExistingSession, SessionTab, TabInfo
+from ..text import cosine, tab_terms, term_vector
+
+logger = logging.getLogger(__name__)
+
+LABEL_DRIFT_THRESHOLD = float(os.getenv("SESSION_CONTEXT_LABEL_DRIFT_THRESHOLD", "0.05"))
+TOPIC_PROFILE_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_TOPIC_PROFILE_SIZE", "10000"))
+TOPIC_PROFILE_TTL_SECONDS = float(os.getenv("SESSION_CONTEXT_TOPIC_PROFILE_TTL", str(7 * 24 * 60 * 60)))
+TOPIC_PROFILE_USER_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_TOPIC_PROFILE_USER_SIZE", "500"))
+
+
+@dataclass
+class TopicProfile:
+    """Sum of unit term vectors of a session's tabs."""
+
+    weights: Dict[str, float] = field(default_factory=dict)
+    tab_count: int = 0
+    # The weights as they were when `label` was set; drift is measured from them.
+    labeled_weights: Dict[str, float] = field(default_factory=dict)
+    label: Optional[str] = None
+
+    def add(self, vector: Dict[str, float]) -> None:
+        for term, weight in vector.items():
+            self.weights[term] = self.weights.get(term, 0.0) + weight
+        self.tab_count += 1
+
+    def mark_labeled(self, label: str) -> None:
+        self.labeled_weights = dict(self.weights)
+        self.label = label
+
+
+def tab_vector(tab: Union[TabInfo, SessionTab]) -> Dict[str, float]:
+    content = tab.get_content() if isinstance(tab, SessionTab) else tab.content
+    return term_vector(tab_terms(tab.url, tab.title, content))
+
+
+class TopicProfiles:
+    """
+    Per-session topic profiles, partitioned by user and keyed by session ID.
+
+    Profiles are rebuilt from the request whenever the client's tab count no
+    longer matches what the server has seen, so tabs removed in the extension
+    do not leave stale weights behind; the labeled copy survives the rebuild.
+    A session whose label differs from the one the copy was taken for (a new
+    session, or one the user renamed) gets a fresh copy. Each user keeps at
+    most `user_max_entries` profiles, weighted by their number of terms.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float, user_max_entries: int) -> None:
+        self._profiles: PartitionedCache[TopicProfile] = PartitionedCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            partition_max_entries=user_max_entries,
+            weigh=lambda profile: len(profile.weights) + len(profile.labeled_weights),
+        )
+        self.threshold = threshold
+        self.labels_kept = 0
+        self.labels_requested = 0
+
+    def profile(self, user_id: str, session: ExistingSession) -> TopicProfile:
+        profile = self._profiles.get(user_id, session.id, record=False)
+        if profile is None or profile.tab_count != len(session.tabList):
+            previous = profile
+            profile = TopicProfile()
+            for tab in session.tabList:
+                profile.add(tab_vector(tab))
+            if previous is not None:
+                profile.labeled_weights, profile.label = previous.labeled_weights, previous.label
+            if session.label and profile.label != session.label:
+                profile.mark_labeled(session.label)
+            self._profiles.set(user_id, session.id, profile)
+        elif session.label and profile.label != session.label:
+            profile.mark_labeled(session.label)
+            self._profiles.set(user_id, session.id, profile)
+        return profile
+
+    def drift(self, user_id: str, session: ExistingSession, tab: TabInfo) -> float:
+        """Cosine distance between the profile when the label was set and the profile after adding `tab`."""
+        profile = self.profile(user_id, session)
+        baseline = profile.labeled_weights or profile.weights
+        if not baseline:
+            return 1.0
+        merged = dict(profile.weights)
+        for term, weight in tab_vector(tab).items():
+            merged[term] = merged.get(term, 0.0) + weight
+        return 1.0 - cosine(baseline, merged)
+
+    def similarities(self, user_id: str, sessions: List[ExistingSession], tab: TabInfo) -> List[float]:
+        """Cosine similarity of `tab` to each session's profile, in session order."""
+        vector = tab_vector(tab)
+        return [cosine(self.profile(user_id, session).weights, vector) for session in sessions]
+
+    def is_stable(self, user_id: str, session: ExistingSession, tab: TabInfo) -> bool:
+        """True when merging `tab` into a labeled session should keep its label."""
+        return bool(session.label) and self.drift(user_id, session, tab) <= self.threshold
+
+    def record_merge(
+        self, user_id: str, session: ExistingSession, tab: TabInfo, label_kept: bool, label: Optional[str] = None
+    ) -> None:
+        """Fold a merged tab into the session profile; a newly accepted `label` restarts drift from here."""
+        profile = self.profile(user_id, session)
+        profile.add(tab_vector(tab))
+        if not label_kept and label:
+            profile.mark_labeled(label)
+        # Re-store so the partition's weight accounts for the new terms.
+        self._profiles.set(user_id, session.id, profile)
+        if label_kept:
+            self.labels_kept += 1
+        else:
+            self.labels_requested += 1
+
+    def snapshot_records(self) -> List[list]:
+        """`[user, session_id, stored_at, weights, tab_count, labeled_weights, label]` for every live profile."""
+        return [
+            [user_id, session_id, stored_at, profile.weights, profile.tab_count, profile.labeled_weights, profile.label]
+            for user_id, session_id, stored_at, profile in self._profiles.items()
+        ]
+
+    def restore_records(self, records: Iterable[list]) -> int:
+        """Add persisted profiles for sessions not profiled since; returns how many were added."""
+        restored = 0
+        for user_id, session_id, stored_at, weights, tab_count, *labeled in records:
+            profile = TopicProfile(weights, tab_count, *labeled)
+            restored += self._profiles.restore(user_id, session_id, profile, stored_at)
+        return restored
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def partition_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._profiles.partition_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        merges = self.labels_kept + self.labels_requested
+        return {
+            "profiles": len(self._profiles),
+            "users": len(self._profiles.partitions()),
+            "evictions": self._profiles.evictions,
+            "quota_evictions": self._profiles.quota_evictions,
+            "drift_threshold": self.threshold,
+            "labels_kept": self.labels_kept,
+            "labels_requested": self.labels_requested,
+            "keep_rate": round(self.labels_kept / merges, 4) if merges else 0.0,
+        }
+
+
+topic_profiles = TopicProfiles(
+    max_entries=TOPIC_PROFILE_MAX_ENTRIES,
+    ttl_seconds=TOPIC_PROFILE_TTL_SECONDS,
+    threshold=LABEL_DRIFT_THRESHOLD,
+    user_max_entries=TOPIC_PROFILE_USER_MAX_ENTRIES,
+)
+
+__all__ = ["LABEL_DRIFT_THRESHOLD", "TopicProfile", "TopicProfiles", "topic_profiles"]
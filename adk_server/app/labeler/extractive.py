@@ -0,0 +1,302 @@
+"""
+Extractive session labels - Builds a 4-5 word label from the tabs themselves.
+
+Candidate keyphrases are runs of content words in tab titles, `h1` headings
+and meta descriptions. Each term is weighted by how often it occurs in the
+session (TF) and how rare it is across the background corpus of sessions seen
+so far (IDF), so words shared by every session ("docs", "guide") lose to the
+ones specific to this one. The best phrases are taken greedily until the label
+has four or five words.
+
+Confidence estimates label quality rather than agreement alone. It is the
+share of tabs that mention the label's leading phrase, scaled down for short
+labels, for labels made of terms common across the corpus, and for sessions
+of one or two tabs (where every phrase trivially covers the whole session).
+A single tab still gets a fast label when it yields a full-length label of
+specific terms, since one-tab sessions are the most common case.
+Below `SESSION_CONTEXT_FAST_LABEL_MIN_CONFIDENCE` the labeler agent is used
+instead. Numbers, e-mail addresses and host names are never label words.
+
+The corpus is shared, but each user contributes at most
+`SESSION_CONTEXT_LABEL_CORPUS_USER_SIZE` sessions and a full corpus forgets
+sessions of the heaviest contributor first, so one busy client can neither
+flush the corpus nor dominate its document frequencies.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from ..cache import PartitionedCache
+from ..schemas import SessionTab, TabInfo
+from ..text import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+FAST_LABEL_MIN_CONFIDENCE = float(os.getenv("SESSION_CONTEXT_FAST_LABEL_MIN_CONFIDENCE", "0.6"))
+LABEL_CORPUS_SIZE = int(os.getenv("SESSION_CONTEXT_LABEL_CORPUS_SIZE", "5000"))
+LABEL_CORPUS_USER_SIZE = int(os.getenv("SESSION_CONTEXT_LABEL_CORPUS_USER_SIZE", "250"))
+
+MAX_LABEL_WORDS = 5
+MIN_LABEL_WORDS = 2
+MAX_PHRASE_WORDS = 3
+MAX_LABEL_LENGTH = 50
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#.']*[A-Za-z0-9+#]|[A-Za-z0-9]")
+# `gmail.com`, `docs.python.org`; `Node.js` and `Vue.js` stay words.
+HOST_PATTERN = re.compile(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|org|net|io|dev|co|edu|gov|app|ai|me|info|us|uk|de|fr|jp|ca)$")
+TITLE_SEPARATORS = re.compile(r"\s+[-|–—·:]\s+|\s*[|·]\s*")
+
+# Confidence factors by label word count (fewer words are vaguer) and by session size. A single tab
+# passes the default threshold only with a full 4-5 word label of terms not generic across the corpus.
+LABEL_WORDS_FACTOR = {2: 0.5, 3: 0.75}
+SESSION_SIZE_FACTOR = {1: 0.75, 2: 0.8}
+# Terms in more than this share of corpus sessions are generic; judged once the corpus holds enough sessions.
+COMMON_TERM_SHARE = 0.2
+MIN_CORPUS_SESSIONS = 20
+# Specificity factor while the corpus is too small to judge.
+UNKNOWN_SPECIFICITY = 0.85
+
+# Field weights: a title's leading segment names the page; trailing segments are usually the site.
+LEAD_WEIGHT = 1.0
+TRAILING_WEIGHT = 0.4
+H1_WEIGHT = 0.8
+META_WEIGHT = 0.4
+
+Tab = Union[TabInfo, SessionTab]
+
+
+@dataclass
+class ExtractiveLabel:
+    """A locally extracted label and how much of the session it covers."""
+
+    label: str
+    confidence: float
+    terms: Tuple[str, ...]
+
+
+def _segments(tab: Tab) -> List[Tuple[str, float]]:
+    """Text fields of a tab with their weights."""
+    segments: List[Tuple[str, float]] = []
+    title = (tab.title or "").strip()
+    if title and title != "Untitled":
+        parts = [part for part in TITLE_SEPARATORS.split(title) if part.strip()]
+        for position, part in enumerate(parts):
+            segments.append((part, LEAD_WEIGHT if position == 0 else TRAILING_WEIGHT))
+    content = tab.get_content() if isinstance(tab, SessionTab) else tab.content
+    if content is not None:
+        if content.h1:
+            segments.append((content.h1, H1_WEIGHT))
+        if content.metaDescription:
+            segments.append((content.metaDescription[:300], META_WEIGHT))
+    return segments
+
+
+def _is_label_word(word: str, gap: str, following: str) -> bool:
+    if len(word) < 2 or word in STOPWORDS or any(char.isdigit() for char in word):
+        return False
+    # Either side of an e-mail address.
+    if gap.endswith("@") or following == "@":
+        return False
+    return not HOST_PATTERN.match(word)
+
+
+def _phrases(text: str) -> List[List[str]]:
+    """Runs of content words, split at stopwords, numbers, e-mail addresses, host names and punctuation."""
+    phrases: List[List[str]] = []
+    current: List[str] = []
+    position = 0
+    for match in WORD_PATTERN.finditer(text):
+        gap = text[position:match.start()]
+        position = match.end()
+        word = match.group(0)
+        lowered = word.lower()
+        if current and (any(mark in gap for mark in ",.;:!?()[]\"") or len(current) == MAX_PHRASE_WORDS):
+            phrases.append(current)
+            current = []
+        if not _is_label_word(lowered, gap, text[position : position + 1]):
+            if current:
+                phrases.append(current)
+                current = []
+            continue
+        current.append(word)
+    if current:
+        phrases.append(current)
+    return phrases
+
+
+def _display(word: str) -> str:
+    """Title-case plain lower-case words; keep acronyms and mixed case (`iOS`, `FastAPI`)."""
+    return word[:1].upper() + word[1:] if word.islower() else word
+
+
+class ExtractiveLabeler:
+    """
+    TF-IDF keyphrase labeler with a background corpus of seen sessions.
+
+    Args:
+        corpus_size (int): Sessions remembered for document frequencies; the oldest are forgotten.
+        min_confidence (float): Confidence below which callers should fall back to the agent.
+        user_corpus_size (int): Sessions any one user contributes to the corpus.
+    """
+
+    def __init__(self, corpus_size: int, min_confidence: float, user_corpus_size: int = LABEL_CORPUS_USER_SIZE) -> None:
+        self.min_confidence = min_confidence
+        self.corpus_size = max(1, corpus_size)
+        self._documents: PartitionedCache[Set[str]] = PartitionedCache(
+            max_entries=self.corpus_size,
+            ttl_seconds=0,
+            partition_max_entries=user_corpus_size,
+            on_evict=lambda _user, _key, terms: self._forget(terms),
+        )
+        self._document_frequency: Counter = Counter()
+        self._lock = threading.Lock()
+        self.labels = 0
+        self.confident = 0
+
+    @staticmethod
+    def session_terms(tabs: Sequence[Tab]) -> Set[str]:
+        return {word.lower() for tab in tabs for text, _ in _segments(tab) for phrase in _phrases(text) for word in phrase}
+
+    @staticmethod
+    def corpus_key(tabs: Sequence[Tab]) -> str:
+        return hashlib.sha1("\n".join(sorted(tab.url for tab in tabs)).encode("utf-8")).hexdigest()
+
+    def observe(self, user_id: str, key: str, tabs: Sequence[Tab]) -> None:
+        """Add (or replace) one of `user_id`'s sessions in the background corpus."""
+        terms = self.session_terms(tabs)
+        with self._lock:
+            previous = self._documents.pop(user_id, key)
+            if previous is not None:
+                self._forget(previous)
+            # Evicted sessions are forgotten through `on_evict`.
+            self._documents.set(user_id, key, terms)
+            self._document_frequency.update(terms)
+
+    def _forget(self, terms: Iterable[str]) -> None:
+        for term in terms:
+            self._document_frequency[term] -= 1
+            if self._document_frequency[term] <= 0:
+                del self._document_frequency[term]
+
+    def idf(self, term: str) -> float:
+        documents = len(self._documents)
+        return math.log((1 + documents) / (1 + self._document_frequency.get(term, 0))) + 1.0
+
+    def specificity(self, terms: Sequence[str]) -> float:
+        """1.0 for labels of session-specific terms, down to 0.5 when every term is generic across the corpus."""
+        with self._lock:
+            documents = len(self._documents)
+            if documents < MIN_CORPUS_SESSIONS:
+                return UNKNOWN_SPECIFICITY
+            common = sum(1 for term in terms if self._document_frequency.get(term, 0) / documents > COMMON_TERM_SHARE)
+        return 1.0 - 0.5 * common / len(terms)
+
+    def confidence(self, chosen: Sequence[str], anchored: int, tab_count: int) -> float:
+        """Tab coverage of the lead phrase, scaled by label length, term specificity and session size."""
+        if len(chosen) < MIN_LABEL_WORDS:
+            return 0.0
+        coverage = anchored / tab_count
+        words = LABEL_WORDS_FACTOR.get(len(chosen), 1.0)
+        size = SESSION_SIZE_FACTOR.get(tab_count, 1.0)
+        return coverage * words * size * self.specificity(chosen)
+
+    def extract(self, tabs: Sequence[Tab]) -> Optional[ExtractiveLabel]:
+        """Best 4-5 word label for `tabs`, or None when they carry no usable text."""
+        self.labels += 1
+        term_frequency: Counter = Counter()
+        phrase_counts: Counter = Counter()
+        surface: Dict[str, Counter] = {}
+        tab_terms: List[Set[str]] = []
+        for tab in tabs:
+            seen: Set[str] = set()
+            for text, weight in _segments(tab):
+                for phrase in _phrases(text):
+                    key = tuple(word.lower() for word in phrase)
+                    phrase_counts[key] += weight
+                    for word, lowered in zip(phrase, key):
+                        term_frequency[lowered] += weight
+                        surface.setdefault(lowered, Counter())[word] += 1
+                        seen.add(lowered)
+            tab_terms.append(seen)
+        if not term_frequency:
+            return None
+
+        with self._lock:
+            weights = {term: frequency * self.idf(term) for term, frequency in term_frequency.items()}
+
+        def phrase_score(item: Tuple[Tuple[str, ...], float]) -> float:
+            phrase, count = item
+            return count * sum(weights[term] for term in phrase) / math.sqrt(len(phrase))
+
+        # The top phrase anchors the label; later phrases must share a tab with it so the
+        # label describes one topic instead of stitching together unrelated tabs.
+        ranked = sorted(phrase_counts.items(), key=phrase_score, reverse=True)
+        lead = set(ranked[0][0])
+        anchored = [terms for terms in tab_terms if terms & lead]
+        chosen: List[str] = []
+        for phrase, _ in ranked:
+            fresh = [term for term in phrase if term not in chosen]
+            if len(fresh) < len(phrase) and len(fresh) <= 1:
+                continue
+            if len(chosen) + len(fresh) > MAX_LABEL_WORDS:
+                continue
+            if chosen and not any(terms.issuperset(phrase) for terms in anchored):
+                continue
+            chosen.extend(fresh)
+            if len(chosen) >= MAX_LABEL_WORDS - 1:
+                break
+
+        label = " ".join(_display(surface[term].most_common(1)[0][0]) for term in chosen)[:MAX_LABEL_LENGTH].strip()
+        confidence = self.confidence(chosen, len(anchored), len(tabs))
+        if confidence >= self.min_confidence:
+            self.confident += 1
+        return ExtractiveLabel(label=label, confidence=round(confidence, 3), terms=tuple(chosen))
+
+    def snapshot_records(self) -> List[list]:
+        """`[user, key, terms]` for every corpus session, oldest first per user."""
+        with self._lock:
+            return [[user_id, key, sorted(terms)] for user_id, key, _, terms in self._documents.items()]
+
+    def restore_records(self, records: Iterable[list]) -> int:
+        """Add persisted corpus sessions that were not observed since; returns how many were added."""
+        restored = 0
+        with self._lock:
+            for record in records:
+                if len(record) != 3:
+                    # Files written before the corpus was partitioned carry no user.
+                    continue
+                user_id, key, terms = record
+                if len(self._documents) >= self.corpus_size:
+                    break
+                if self._documents.restore(user_id, key, set(terms), stored_at=0.0):
+                    self._document_frequency.update(terms)
+                    restored += 1
+        return restored
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def partition_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._documents.partition_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "corpus_sessions": len(self._documents),
+            "corpus_users": len(self._documents.partitions()),
+            "corpus_terms": len(self._document_frequency),
+            "min_confidence": self.min_confidence,
+            "labels": self.labels,
+            "confident": self.confident,
+        }
+
+
+extractive_labeler = ExtractiveLabeler(corpus_size=LABEL_CORPUS_SIZE, min_confidence=FAST_LABEL_MIN_CONFIDENCE)
+
+__all__ = ["ExtractiveLabel", "ExtractiveLabeler", "extractive_labeler"]
@@ -2,6 +2,14 @@
 Prompts for the Labeler agent.
 """
 
+from typing import List, Optional, Sequence, Tuple
+
+from ..compact import PROMPT_FORMAT, clip, shared_host, tab_row
+from ..schemas import TabInfo
+
+# Tabs shown to the labeler; more rarely change the label.
+LABEL_PROMPT_TABS = 10
+
 LABELER_INSTRUCTION = """You are a session labeling agent responsible for generating concise, descriptive labels for browsing sessions based on the tabs they contain.
 
 ## YOUR TASK
@@ -100,3 +108,90 @@ Return ONLY the label text itself. Do not include:
 
 Just output the clean label text in Title Case, 3-5 words, ready to display in the user interface."""
 
+
+BATCH_LABELER_INSTRUCTION = LABELER_INSTRUCTION.split("## OUTPUT")[0] + """## BATCH INPUT
+
+You will receive several browsing sessions at once. Each starts with a handle line such as
+`L1 (3 tab(s), all on docs.python.org):` followed by one tab per line. Label every session
+independently, following all of the rules above; never let one session's tabs influence another's label.
+
+## OUTPUT
+
+Return ONLY one JSON object that maps every handle to its label, for example:
+{"L1": "Python Async Programming", "L2": "Rome Trip Planning"}
+
+Include each handle exactly once. Do not add explanations, code fences or any other text."""
+
+MAX_LABEL_LENGTH = 50
+
+
+def clean_label(text: str) -> str:
+    """Strip quotes and surrounding whitespace from a model label and cap its length."""
+    return text.replace('"', "").replace("'", "").strip()[:MAX_LABEL_LENGTH].strip()
+
+
+def compact_label_rows(tabs: Sequence[TabInfo]) -> Tuple[Optional[str], List[str]]:
+    """`(shared host, rows)` for the first `LABEL_PROMPT_TABS` tabs in the compact layout."""
+    shown = tabs[:LABEL_PROMPT_TABS]
+    host = shared_host(shown)
+    lines: List[str] = []
+    for tab in shown:
+        lines.append(f"- {tab_row(tab, host)}")
+        if tab.content:
+            title = (tab.title or "").strip()
+            if tab.content.h1 and tab.content.h1.strip() != title:
+                lines.append(f"  h1: {clip(tab.content.h1, 80)}")
+            if tab.content.metaDescription:
+                lines.append(f"  desc: {clip(tab.content.metaDescription, 100)}")
+    return host, lines
+
+
+def build_batch_label_block(handle: str, tabs: Sequence[TabInfo]) -> str:
+    """One session of a batch label message: a handle line, then its tab rows."""
+    host, rows = compact_label_rows(tabs)
+    return "\n".join([f"{handle} ({len(tabs)} tab(s){f', all on {host}' if host else ''}):", *rows])
+
+
+def build_batch_label_message(blocks: Sequence[str]) -> str:
+    """Join session blocks from `build_batch_label_block` into the batch labeler's user message."""
+    return "\n\n".join(
+        [
+            f"Label each of these {len(blocks)} browsing sessions:",
+            *blocks,
+            "Reply with one JSON object mapping every handle to a 4-5 word label.",
+        ]
+    )
+
+
+def build_label_message(tabs: Sequence[TabInfo], compact: bool = PROMPT_FORMAT != "verbose") -> str:
+    """
+    Format a session's tabs as the labeler's user message.
+
+    Args:
+        tabs (sequence): The session's tabs.
+        compact (bool): One `title | site/path` row per tab, with a shared site named once.
+
+    Returns:
+        str: The message text.
+    """
+    if compact:
+        host, rows = compact_label_rows(tabs)
+        lines = [f"Label this browsing session ({len(tabs)} tab(s){f', all on {host}' if host else ''}):", *rows]
+        lines.append("")
+        lines.append("Reply with a 4-5 word label for the session's theme.")
+        return "\n".join(lines)
+
+    lines: List[str] = []
+    for tab in tabs[:LABEL_PROMPT_TABS]:
+        tab_text = f"- {tab.title or 'Untitled'} ({tab.url})"
+        if tab.content:
+            if tab.content.h1:
+                tab_text += f"\n  Heading: {tab.content.h1}"
+            if tab.content.metaDescription:
+                tab_text += f"\n  Description: {tab.content.metaDescription[:100]}"
+        lines.append(tab_text)
+    return f"""Generate a label for this browsing session with {len(tabs)} tab(s):
+
+{chr(10).join(lines)}
+
+Provide a concise 4-5 word label that captures the session's theme."""
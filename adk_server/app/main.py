@@ -2,26 +2,90 @@
 FastAPI application exposing a minimal Google ADK agent for the Session Context project.
 """
 
+import asyncio
 import json
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Set
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, WebSocket
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from google.adk import Runner
+from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 
-from .base_agent import root_agent, runner, session_service
-from .labeler import create_labeler_agent
+from .admin import require_admin
+from .base_agent import OPENAI_MODEL, SMALL_MODEL, root_agent, runner, session_service, small_runner
+from .base_agent.prompt import build_grouping_message, frame_grouping_message, handle_resolutions, resolve_session
+from .batching import MicroBatcher
+from .circuit import CircuitOpenError, circuit_breaker
+from .debounce import DEBOUNCE_QUIET_MS, DEBOUNCE_RESULT_TTL_SECONDS, TabEventDebouncer
+from .heuristic import heuristic_decision
+from .http_pool import close_http_client, http_pool_stats
+from .idempotency import REPLAYED_HEADER, idempotency_store, skip_storing
+from .index import session_index
+from .labeler import create_labeler_agent, extractive_labeler, topic_profiles
+from .labeler.batch import (
+    LABEL_BATCH_CONCURRENCY,
+    LABEL_BATCH_MAX_REQUEST_ITEMS,
+    LabelChunk,
+    batch_label_counts,
+    pack_label_chunks,
+    parse_batch_labels,
+)
+from .labeler.prompt import build_batch_label_message, build_label_message, clean_label
+from .matcher import create_matcher_agent
+from .matcher.batch import (
+    GROUP_BATCH_ENABLED,
+    GROUP_BATCH_MAX_SIZE,
+    GROUP_BATCH_MAX_WAIT_MS,
+    GROUP_BATCH_TOKEN_BUDGET,
+    GroupBatchItem,
+    build_batch_message,
+    parse_batch_decisions,
+)
+from .memory import memory_profiler
+from .models import probe_model
+from .profiling import PROFILE_ID_HEADER, ProfilingMiddleware, request_profiler
+from .quotas import AGENT_SESSIONS_MAX, AGENT_SESSIONS_PER_USER, SessionQuota
+from .rate_limit import client_identity, rate_limiter
+from .recorder import TrafficMiddleware, replay_store, traffic_recorder
+from .routing import LARGE_TIER, SMALL_TIER, model_router
 from .schemas import (
     AgentRequest,
     AgentResponse,
     GroupingRequest,
     GroupingResponse,
+    LabelBatchItem,
+    LabelBatchRequest,
+    LabelBatchResponse,
+    LabelBatchResult,
     LabelRequest,
     LabelResponse,
+    TabEventRequest,
+    TabEventStatus,
 )
+from .snapshot import restore_session_service, session_service_records, snapshot_manager
+from .summarizer import (
+    DOMAIN_STATE_KEY,
+    SUMMARY_CACHE_PARTITION_STATE_KEY,
+    SUMMARY_CACHE_STATE_KEY,
+    build_summary_message,
+    create_summarizer_agent,
+    domain_knowledge,
+    summary_cache,
+    summary_cache_key,
+)
+from .summarizer.domains import DOMAIN_MIN_SUMMARIES
+from .tracing import TracingMiddleware, tracer
+from .urls import normalize_url
+from .usage import prompt_usage
+from .websocket import WebSocketChannel
+from .wire import DefaultResponse, WireRoute
 
 logger = logging.getLogger("session-context-adk")
 if not logger.handlers:
@@ -76,6 +140,7 @@ def summarize_event(event: Any) -> Dict[str, Any]:
 
 def log_adk_event(endpoint_label: str, event: Any) -> None:
     """Log an ADK event with structured detail."""
+    traffic_recorder.add_event(event)
     try:
         summary = summarize_event(event)
         logger.info(
@@ -88,6 +153,7 @@ def log_adk_event(endpoint_label: str, event: Any) -> None:
 
 
 DEFAULT_USER_ID = os.getenv("SESSION_CONTEXT_DEFAULT_USER_ID", "session-context")
+MAX_TAB_EVENT_WAIT_SECONDS = 30.0
 ALLOW_ORIGINS = [origin.strip() for origin in os.getenv("SESSION_CONTEXT_ALLOW_ORIGINS", "*").split(",") if origin.strip()]
 if not ALLOW_ORIGINS:
     ALLOW_ORIGINS = ["*"]
@@ -95,11 +161,101 @@ if not ALLOW_ORIGINS:
 AGENT_NAME = root_agent.name
 RUNNER_APP_NAME = runner.app_name
 
+# The labeler agent (and its model client) is built once and reused by every /api/label request.
+LABELER_APP_NAME = "labeler"
+labeler_agent = create_labeler_agent()
+labeler_session_service = InMemorySessionService()
+labeler_runner = Runner(agent=labeler_agent, session_service=labeler_session_service, app_name=LABELER_APP_NAME)
+# `/api/label/batch` packs several sessions into each call of a second labeler.
+batch_labeler_agent = create_labeler_agent(batch=True)
+batch_labeler_runner = Runner(agent=batch_labeler_agent, session_service=labeler_session_service, app_name="batch_labeler")
+# With `SESSION_CONTEXT_GROUP_BATCH`, concurrent `/api/group` requests share batch matcher calls, one matcher per tier.
+GROUP_BATCH_USER_ID = "group-batch"
+group_batch_session_service = InMemorySessionService()
+group_batch_runners = {
+    LARGE_TIER: Runner(
+        agent=create_matcher_agent(model=OPENAI_MODEL, batch=True),
+        session_service=group_batch_session_service,
+        app_name="batch_matcher",
+    ),
+    SMALL_TIER: Runner(
+        agent=create_matcher_agent(model=SMALL_MODEL, batch=True),
+        session_service=group_batch_session_service,
+        app_name="batch_matcher_small",
+    ),
+}
+# Batched requests are summarized up front, so the batch matcher sees the summary the coordinator would have made.
+summarizer_runner = Runner(agent=create_summarizer_agent(), session_service=group_batch_session_service, app_name="summarizer")
+
+# While the breaker is open, a background task pings the provider until it answers again.
+circuit_breaker.set_probe(lambda: probe_model(OPENAI_MODEL, os.getenv("OPENAI_API_KEY")))
+
+
+def count_sessions(service: InMemorySessionService) -> int:
+    """Number of sessions held by an in-memory session service across apps and users."""
+    return sum(len(user_sessions) for app_sessions in service.sessions.values() for user_sessions in app_sessions.values())
+
+
+# `/agent/run` conversations persist; grouping sessions are deleted when their request ends.
+agent_session_quota = SessionQuota(
+    session_service,
+    RUNNER_APP_NAME,
+    per_user=AGENT_SESSIONS_PER_USER,
+    total=AGENT_SESSIONS_MAX,
+    transient_prefixes=("grouping-",),
+)
+
+memory_profiler.register("agent_sessions", session_service, count=lambda: count_sessions(session_service))
+memory_profiler.register("labeler_sessions", labeler_session_service, count=lambda: count_sessions(labeler_session_service))
+memory_profiler.register("summary_cache", summary_cache)
+memory_profiler.register("topic_profiles", topic_profiles)
+memory_profiler.register("rate_limit_buckets", rate_limiter.backend, count=rate_limiter.backend.size)
+memory_profiler.register("traces", tracer)
+memory_profiler.register("open_spans", None, count=tracer.open_spans)
+memory_profiler.register("replay_store", replay_store)
+memory_profiler.register("session_index", session_index)
+memory_profiler.register("idempotency", idempotency_store)
+memory_profiler.register("domain_table", None, count=lambda: len(domain_knowledge))
+memory_profiler.register("label_corpus", extractive_labeler)
+
+# Warm restarts: idempotency results and debounced tab events are short-lived and are not snapshotted.
+snapshot_manager.register(
+    "agent_sessions",
+    lambda: session_service_records(session_service, RUNNER_APP_NAME, agent_session_quota.transient_prefixes),
+    lambda records: restore_session_service(session_service, RUNNER_APP_NAME, records),
+)
+snapshot_manager.register("summary_cache", summary_cache.snapshot_records, summary_cache.restore_records, threadsafe=True)
+snapshot_manager.register("topic_profiles", topic_profiles.snapshot_records, topic_profiles.restore_records)
+snapshot_manager.register("session_index", session_index.snapshot_records, session_index.restore_records, threadsafe=True)
+snapshot_manager.register(
+    "label_corpus", extractive_labeler.snapshot_records, extractive_labeler.restore_records, threadsafe=True
+)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Builds the table file from the seed list on first start.
+    await asyncio.to_thread(domain_knowledge.open)
+    snapshot_manager.start()
+    yield
+    await snapshot_manager.close()
+    await asyncio.to_thread(summary_cache.save)
+    domain_knowledge.close()
+    traffic_recorder.close()
+    await circuit_breaker.close()
+    await tab_event_debouncer.close()
+    await close_http_client()
+
+
 app = FastAPI(
     title="Session Context ADK Backend",
     description="Lightweight FastAPI service that bridges the Chrome extension with a Google ADK agent.",
     version="0.1.0",
+    default_response_class=DefaultResponse,
+    lifespan=lifespan,
 )
+# Decode bodies with orjson/MessagePack and enforce the request size limit.
+app.router.route_class = WireRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -107,17 +263,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REPLAYED_HEADER, PROFILE_ID_HEADER],
 )
+app.add_middleware(TrafficMiddleware, recorder=traffic_recorder, replay=replay_store)
+if request_profiler.enabled:
+    # Only installed with the admin token set, so unprofiled deployments never see it.
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+# Added last so it is the outermost middleware and its root span covers the whole request.
+app.add_middleware(TracingMiddleware, tracer=tracer)
 
 
-async def ensure_session(user_id: str, session_id: str) -> None:
+async def ensure_session(user_id: str, session_id: str, state: Optional[Dict[str, Any]] = None) -> None:
     session = await session_service.get_session(app_name=RUNNER_APP_NAME, user_id=user_id, session_id=session_id)
     if not session:
         await session_service.create_session(
             app_name=RUNNER_APP_NAME,
             user_id=user_id,
             session_id=session_id,
-            state=None,
+            state=state,
         )
 
 
@@ -126,118 +289,634 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """Expose in-process cache and performance counters."""
+    return {
+        "summary_cache": summary_cache.stats(),
+        "topic_profiles": topic_profiles.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "model_router": model_router.stats(),
+        "prompt_usage": prompt_usage.stats(),
+        "traffic_recorder": traffic_recorder.stats(),
+        "http_pool": http_pool_stats(),
+        "circuit_breaker": circuit_breaker.stats(),
+        "websocket": websocket_channel.stats(),
+        "tab_events": tab_event_debouncer.stats(),
+        "session_index": session_index.stats(),
+        "extractive_labels": extractive_labeler.stats(),
+        "session_handles": dict(handle_resolutions),
+        "label_batches": dict(batch_label_counts),
+        "group_batches": {"enabled": GROUP_BATCH_ENABLED, **{tier: batcher.stats() for tier, batcher in group_batchers.items()}},
+        "domain_knowledge": domain_knowledge.stats(),
+        "idempotency": idempotency_store.stats(),
+        "agent_sessions": agent_session_quota.stats(),
+        "snapshots": snapshot_manager.stats(),
+        "profiling": request_profiler.stats(),
+    }
+
+
+@app.get("/debug/traces", dependencies=[Depends(require_admin)])
+async def list_traces() -> Dict[str, Any]:
+    """List the request IDs whose traces are still retained."""
+    return {"enabled": tracer.enabled, "requestIds": tracer.recent_request_ids()}
+
+
+@app.get("/debug/traces/{request_id}", dependencies=[Depends(require_admin)])
+async def get_trace(request_id: str) -> Dict[str, Any]:
+    """Return the span tree recorded for a request."""
+    spans = tracer.trace_tree(request_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"requestId": request_id, "spans": spans}
+
+
+@app.get("/debug/usage", dependencies=[Depends(require_admin)])
+async def usage_report() -> Dict[str, Any]:
+    """Per-user footprint of the partitioned server-side state."""
+    return {
+        "summary_cache": summary_cache.partition_stats(),
+        "topic_profiles": topic_profiles.partition_stats(),
+        "session_index": session_index.partition_stats(),
+        "label_corpus": extractive_labeler.partition_stats(),
+        "agent_sessions": agent_session_quota.usage(),
+    }
+
+
+@app.post("/debug/domains/refresh", dependencies=[Depends(require_admin)])
+async def refresh_domain_table(min_summaries: int = DOMAIN_MIN_SUMMARIES) -> Dict[str, Any]:
+    """Learn sites from the cached summaries into the domain knowledge table."""
+    try:
+        result = await asyncio.to_thread(domain_knowledge.refresh, list(summary_cache.summaries()), min_summaries)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to write domain table: {exc}") from exc
+    return result
+
+
+@app.post("/debug/snapshot", dependencies=[Depends(require_admin)])
+async def write_snapshot() -> Dict[str, Any]:
+    """Write a warm-restart snapshot now instead of waiting for the next interval."""
+    if not snapshot_manager.enabled:
+        raise HTTPException(status_code=409, detail="Snapshots are disabled; set SESSION_CONTEXT_SNAPSHOT_PATH")
+    result = await snapshot_manager.save()
+    if not result:
+        raise HTTPException(status_code=503, detail="Snapshot was not written; see the server log")
+    return result
+
+
+@app.get("/debug/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles() -> Dict[str, Any]:
+    """List stored request profiles, newest first."""
+    return {"profiles": await asyncio.to_thread(request_profiler.list)}
+
+
+@app.get("/debug/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = 40,
+) -> Dict[str, Any]:
+    """Top functions of a stored request profile."""
+    report = await asyncio.to_thread(request_profiler.report, profile_id, sort, limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
+@app.get("/debug/profiles/{profile_id}/raw", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str) -> FileResponse:
+    """The stored `.prof` file, for `pstats` or snakeviz."""
+    path = request_profiler.prof_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
+@app.get("/debug/memory", dependencies=[Depends(require_admin)])
+async def memory_report(deep: bool = False) -> Dict[str, Any]:
+    """Process memory, tracemalloc status and sizes of the server's in-memory structures."""
+    return memory_profiler.report(deep=deep)
+
+
+@app.post("/debug/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def start_tracemalloc(frames: int = 1) -> Dict[str, Any]:
+    memory_profiler.start(frames=max(1, frames))
+    return {"running": memory_profiler.tracing}
+
+
+@app.post("/debug/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def stop_tracemalloc() -> Dict[str, Any]:
+    memory_profiler.stop()
+    return {"running": memory_profiler.tracing}
+
+
+@app.post("/debug/memory/snapshots", dependencies=[Depends(require_admin)])
+async def take_memory_snapshot(label: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        label = memory_profiler.take_snapshot(label)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return {"label": label, "snapshots": memory_profiler.snapshots()}
+
+
+@app.get("/debug/memory/top", dependencies=[Depends(require_admin)])
+async def memory_top(group_by: Literal["module", "package", "lineno"] = "module", limit: int = 20) -> Dict[str, Any]:
+    """Largest live allocation sites."""
+    try:
+        return {"group_by": group_by, "sites": memory_profiler.top(group_by=group_by, limit=limit)}
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@app.get("/debug/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(
+    base: Optional[str] = None,
+    group_by: Literal["module", "package", "lineno"] = "module",
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """Allocation growth since a stored snapshot (the oldest one by default)."""
+    try:
+        sites = memory_profiler.diff(base=base, group_by=group_by, limit=limit)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {exc.args[0]}") from exc
+    return {"base": base, "group_by": group_by, "sites": sites}
+
+
 @app.post("/api/label", response_model=LabelResponse)
-async def generate_label(request: LabelRequest) -> LabelResponse:
+async def generate_label(request: LabelRequest, http_request: Request, response: Response) -> LabelResponse:
     """
     Label generation endpoint that generates a session label from a list of tabs.
     Matches the Node.js /api/label interface.
     """
+    user_id = client_identity(http_request)
+    return await idempotency_store.run(  # type: ignore[return-value]
+        http_request, response, "label", request, lambda: label_tabs(request, user_id), admit=lambda: rate_limiter.check(http_request)
+    )
+
+
+async def label_tabs(request: LabelRequest, user_id: str) -> LabelResponse:
+    """Generate a session label for `user_id`; shared by the HTTP and WebSocket transports."""
     if not request.tabList or len(request.tabList) == 0:
         raise HTTPException(status_code=400, detail="tabList must contain at least one tab")
 
-    user_id = DEFAULT_USER_ID
     # Generate a unique session ID for each request to avoid conversation history buildup
     from uuid import uuid4
     session_id = f"labeling-{uuid4()}"
     tab_titles = [tab.title or "Untitled" for tab in request.tabList[:3]]
     logger.info(
-        "Processing /api/label request: tabs=%s, example_titles=%s",
+        "Processing /api/label request: tabs=%s, mode=%s, example_titles=%s",
         len(request.tabList),
+        request.mode,
         tab_titles,
     )
 
+    extracted = None
+    with tracer.span("label.extract", **{"label.mode": request.mode}) as extract_span:
+        extractive_labeler.observe(user_id, extractive_labeler.corpus_key(request.tabList), request.tabList)
+        if request.mode == "fast":
+            extracted = extractive_labeler.extract(request.tabList)
+            if extract_span is not None and extracted is not None:
+                extract_span.set_attribute("label.confidence", extracted.confidence)
+    if extracted is not None and extracted.confidence >= extractive_labeler.min_confidence:
+        logger.info("Completed /api/label response (extractive): label=%s, confidence=%s", extracted.label, extracted.confidence)
+        return LabelResponse(label=extracted.label, source="extractive", confidence=extracted.confidence)
+
     try:
-        await ensure_session(user_id=user_id, session_id=session_id)
+        label_text = await circuit_breaker.call(
+            lambda: run_text_agent(labeler_runner, build_label_message(request.tabList), user_id, session_id, "/api/label")
+        )
+    except CircuitOpenError as exc:
+        raise provider_unavailable() from exc
+    except HTTPException:
+        raise
     except Exception as exc:
-        logger.exception("Failed to ensure session: %s", exc)
-        raise HTTPException(status_code=500, detail="Failed to prepare agent session") from exc
-
-    # Format tab list for the labeler agent
-    tabs_description = []
-    for tab in request.tabList[:10]:  # Limit to 10 tabs for context
-        tab_text = f"- {tab.title or 'Untitled'} ({tab.url})"
-        if tab.content:
-            if tab.content.h1:
-                tab_text += f"\n  Heading: {tab.content.h1}"
-            if tab.content.metaDescription:
-                tab_text += f"\n  Description: {tab.content.metaDescription[:100]}"
-        tabs_description.append(tab_text)
-
-    input_message = f"""Generate a label for this browsing session with {len(request.tabList)} tab(s):
-
-{chr(10).join(tabs_description)}
-
-Provide a concise 4-5 word label that captures the session's theme."""
-
-    # Create a temporary labeler agent instance
-    labeler_agent = create_labeler_agent()
-    
-    new_message = Content(role="user", parts=[Part(text=input_message)])
+        logger.exception("Label generation failed: %s", exc)
+        raise HTTPException(status_code=500, detail="Unable to generate label") from exc
+    if not label_text:
+        raise HTTPException(status_code=502, detail="Unable to generate label")
 
+    response = LabelResponse(
+        label=clean_label(label_text),
+        source="agent",
+        confidence=extracted.confidence if extracted is not None else None,
+    )
+    logger.info("Completed /api/label response: label=%s", response.label)
+    return response
+
+
+async def run_text_agent(
+    text_runner: Runner,
+    message: str,
+    user_id: str,
+    session_id: str,
+    endpoint_label: str,
+    state: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Run an agent on one message in a throwaway session and return its first text reply."""
+    await text_runner.session_service.create_session(
+        app_name=text_runner.app_name,
+        user_id=user_id,
+        session_id=session_id,
+        state=state,
+    )
     try:
-        # Use the labeler agent directly
-        from google.adk import Runner
-        from google.adk.sessions import InMemorySessionService
-        
-        temp_session_service = InMemorySessionService()
-        await temp_session_service.create_session(
-            app_name="labeler",
+        events = text_runner.run_async(
             user_id=user_id,
             session_id=session_id,
-            state=None,
+            new_message=Content(role="user", parts=[Part(text=message)]),
         )
-        
-        temp_runner = Runner(agent=labeler_agent, session_service=temp_session_service, app_name="labeler")
-        
-        events = temp_runner.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=new_message,
-        )
-
-        label_text = ""
         async for event in events:
-            log_adk_event("/api/label", event)
+            log_adk_event(endpoint_label, event)
             content = getattr(event, "content", None)
             if not content or not getattr(content, "parts", None):
                 continue
-
             for part in content.parts:  # type: ignore[attr-defined]
                 text = getattr(part, "text", None)
-                if text:
-                    label_text = text.strip()
-                    break
+                if text and text.strip():
+                    return text.strip()
+        return ""
+    finally:
+        await text_runner.session_service.delete_session(app_name=text_runner.app_name, user_id=user_id, session_id=session_id)
 
-            if label_text:
-                break
 
-        if not label_text:
-            raise HTTPException(status_code=502, detail="Unable to generate label")
+@app.post("/api/label/batch", response_model=LabelBatchResponse)
+async def generate_label_batch(request: LabelBatchRequest, http_request: Request, response: Response) -> LabelBatchResponse:
+    """
+    Label many sessions at once; results are keyed by the caller's item IDs.
+
+    Sessions are packed into as few labeler calls as the batch token budget
+    allows. A failure affects only the items it touches: sessions missing from a
+    batch reply are relabeled one by one, a call that fails outright is retried
+    once as a whole, and items that still fail carry an `error` instead of a label.
+    The request is charged one rate-limit token per labeler call it packs into.
+    """
+    user_id = client_identity(http_request)
+    return await idempotency_store.run(  # type: ignore[return-value]
+        http_request,
+        response,
+        "label_batch",
+        request,
+        lambda: label_batch(request, user_id),
+        admit=lambda: rate_limiter.check(http_request, cost=label_batch_cost(request)),
+    )
+
+
+def provider_unavailable() -> HTTPException:
+    """503 for agent-backed endpoints while the circuit breaker is open."""
+    return HTTPException(
+        status_code=503,
+        detail="Model provider unavailable; retry later",
+        headers={"Retry-After": str(max(1, int(circuit_breaker.probe_interval)))},
+    )
 
-        # Clean up the label (remove quotes, punctuation)
-        label_text = label_text.replace('"', '').replace("'", '').strip()
-        if len(label_text) > 50:
-            label_text = label_text[:50]
 
-        response = LabelResponse(label=label_text)
-        logger.info("Completed /api/label response: label=%s", response.label)
+def label_batch_cost(request: LabelBatchRequest) -> float:
+    """Rate-limit tokens for a batch: the labeler calls its sessions pack into (extractive hits are not known yet)."""
+    items = request.items[:LABEL_BATCH_MAX_REQUEST_ITEMS]
+    return float(max(1, len(pack_label_chunks((item.id, item.tabList) for item in items if item.tabList))))
+
+
+async def label_batch(request: LabelBatchRequest, user_id: str) -> LabelBatchResponse:
+    """Label a batch for `user_id`; shared by the HTTP and WebSocket transports."""
+    from uuid import uuid4
+
+    ids = [item.id for item in request.items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Batch item IDs must be unique")
+    if len(ids) > LABEL_BATCH_MAX_REQUEST_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {LABEL_BATCH_MAX_REQUEST_ITEMS} items per batch")
+
+    batch_label_counts["requests"] += 1
+    batch_label_counts["items"] += len(ids)
+    results: Dict[str, LabelBatchResult] = {}
+    pending: List[LabelBatchItem] = []
+    with tracer.span("label.batch.extract", **{"batch.items": len(ids), "label.mode": request.mode}):
+        for item in request.items:
+            if not item.tabList:
+                results[item.id] = LabelBatchResult(error="tabList must contain at least one tab")
+                continue
+            extractive_labeler.observe(user_id, extractive_labeler.corpus_key(item.tabList), item.tabList)
+            extracted = extractive_labeler.extract(item.tabList) if request.mode == "fast" else None
+            if extracted is not None and extracted.confidence >= extractive_labeler.min_confidence:
+                results[item.id] = LabelBatchResult(label=extracted.label, source="extractive", confidence=extracted.confidence)
+                batch_label_counts["extractive"] += 1
+            else:
+                pending.append(item)
+
+    tabs_by_id = {item.id: item.tabList for item in pending}
+    chunks = pack_label_chunks((item.id, item.tabList) for item in pending)
+    semaphore = asyncio.Semaphore(max(1, LABEL_BATCH_CONCURRENCY))
+    calls = 0
+    short_circuited = False
+
+    async def label_single(item_id: str) -> None:
+        nonlocal calls, short_circuited
+        async with semaphore:
+            calls += 1
+            batch_label_counts["retried"] += 1
+            try:
+                text = await circuit_breaker.call(
+                    lambda: run_text_agent(
+                        labeler_runner, build_label_message(tabs_by_id[item_id]), user_id, f"labeling-{uuid4()}", "/api/label/batch"
+                    )
+                )
+            except CircuitOpenError:
+                short_circuited = True
+                text = ""
+            except Exception as exc:
+                logger.warning("Batch label retry failed for item %s: %s", item_id, exc)
+                text = ""
+        label = clean_label(text)
+        if label:
+            results[item_id] = LabelBatchResult(label=label, source="agent")
+            batch_label_counts["labeled"] += 1
+        else:
+            results[item_id] = LabelBatchResult(error="Unable to generate label")
+            batch_label_counts["failed"] += 1
+
+    async def call_chunk(chunk: LabelChunk, handles: Dict[str, str]) -> Dict[str, str]:
+        nonlocal calls, short_circuited
+        async with semaphore:
+            calls += 1
+            batch_label_counts["calls"] += 1
+            with tracer.span("label.batch.call", **{"batch.items": len(handles), "batch.tokens": chunk.tokens}) as span:
+                try:
+                    text = await circuit_breaker.call(
+                        lambda: run_text_agent(
+                            batch_labeler_runner,
+                            build_batch_label_message(chunk.blocks()),
+                            user_id,
+                            f"batch-labeling-{uuid4()}",
+                            "/api/label/batch",
+                        )
+                    )
+                except CircuitOpenError:
+                    short_circuited = True
+                    text = ""
+                except Exception as exc:
+                    logger.warning("Batch label call for %s items failed: %s", len(handles), exc)
+                    text = ""
+                labels = parse_batch_labels(text, handles)
+                if span is not None:
+                    span.set_attribute("batch.labeled", len(labels))
+        return labels
+
+    async def label_chunk(chunk: LabelChunk) -> None:
+        handles = chunk.handles()
+        labels = await call_chunk(chunk, handles)
+        if not labels:
+            # The call failed or its reply was unusable: one more try for the whole chunk, rather
+            # than one call per session against a provider that is likely struggling.
+            batch_label_counts["chunk_retries"] += 1
+            labels = await call_chunk(chunk, handles)
+        if not labels:
+            for item_id in handles.values():
+                results[item_id] = LabelBatchResult(error="Unable to generate label")
+                batch_label_counts["failed"] += 1
+            return
+        for handle, label in labels.items():
+            results[handles[handle]] = LabelBatchResult(label=label, source="agent")
+            batch_label_counts["labeled"] += 1
+        missing = [item_id for handle, item_id in handles.items() if handle not in labels]
+        await asyncio.gather(*(label_single(item_id) for item_id in missing))
+
+    await asyncio.gather(*(label_chunk(chunk) for chunk in chunks))
+    if short_circuited:
+        # Items the open breaker kept from the provider carry errors; a retry should try them again.
+        skip_storing()
+    logger.info(
+        "Completed /api/label/batch response: items=%s, model_calls=%s, failed=%s",
+        len(ids),
+        calls,
+        sum(1 for result in results.values() if result.error),
+    )
+    return LabelBatchResponse(labels={item_id: results[item_id] for item_id in ids}, modelCalls=calls)
+
+
+def map_grouping_decision(
+    decision_json: Dict[str, Any],
+    request: GroupingRequest,
+    stable_label_ids: Set[str],
+    user_id: str,
+    similarities: List[float],
+) -> GroupingResponse:
+    """Translate the matcher's decision into the extension's response shape."""
+    action = decision_json.get("action")
+    if action == "new":
+        action = "create_new"
+    target = None
+    if action in ("merge", "no_action"):
+        # The model answers with a session handle; map it back to the real session ID.
+        target = resolve_session(decision_json.get("sessionId"), request.existingSessions)
+        if target is None and (action == "merge" or decision_json.get("sessionId")):
+            logger.warning(
+                "Unresolvable sessionId %r in %s decision; using the local heuristic",
+                decision_json.get("sessionId"),
+                action,
+            )
+            skip_storing()
+            response = heuristic_decision(request, similarities)
+            response.reason = f"unresolved_session_handle; {response.reason}"
+            return response
+    if action == "no_action":
+        reason = decision_json.get("reason") or "agent_returned_no_action"
+        updated_label = decision_json.get("updatedLabel") or decision_json.get("label")
+        response = GroupingResponse(
+            action="no_action",
+            sessionId=target.id if target is not None else None,
+            updatedLabel=updated_label,
+            label=updated_label,
+            reason=reason,
+        )
+        logger.info(
+            "Completed /api/group response: action=no_action, session_id=%s, reason=%s",
+            response.sessionId,
+            response.reason,
+        )
+        return response
+    if action == "merge" and target is not None:
+        merged_session = target
+        updated_label = decision_json.get("updatedLabel") or decision_json.get("label")
+        label_kept = merged_session.id in stable_label_ids or not updated_label
+        if label_kept and merged_session.label:
+            updated_label = merged_session.label
+        topic_profiles.record_merge(user_id, merged_session, request.newTab, label_kept=label_kept, label=updated_label)
+        session_index.add_tab(user_id, merged_session, request.newTab)
+        response = GroupingResponse(
+            action="merge",
+            sessionId=merged_session.id,
+            updatedLabel=updated_label,
+            label=updated_label,
+            reason=decision_json.get("reason"),
+        )
+        logger.info(
+            "Completed /api/group response: action=merge, session_id=%s, updated_label=%s",
+            response.sessionId,
+            response.updatedLabel,
+        )
+        return response
+    else:
+        suggested_label = decision_json.get("suggestedLabel") or decision_json.get("label")
+        response = GroupingResponse(
+            action="create_new",
+            suggestedLabel=suggested_label,
+            label=suggested_label,
+            reason=decision_json.get("reason"),
+        )
+        logger.info(
+            "Completed /api/group response: action=create_new, suggested_label=%s",
+            response.suggestedLabel,
+        )
         return response
 
-    except HTTPException:
+
+async def collect_grouping_decision(
+    group_runner: Runner, user_id: str, session_id: str, new_message: Content
+) -> Optional[Dict[str, Any]]:
+    """Run the coordinator and return the first structured decision it emits."""
+    events = group_runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=new_message,
+    )
+
+    decision_json = None
+    async for event in events:
+        log_adk_event("/api/group", event)
+        content = getattr(event, "content", None)
+        if not content or not getattr(content, "parts", None):
+            continue
+
+        # Look for structured output from the matcher agent
+        for part in content.parts:  # type: ignore[attr-defined]
+            function_response = getattr(part, "function_response", None)
+            if function_response and getattr(function_response, "response", None):
+                resp = function_response.response
+                if isinstance(resp, dict):
+                    # Check if this is the matcher's output
+                    if "action" in resp:
+                        decision_json = resp
+                        break
+
+        if decision_json:
+            break
+
+    return decision_json
+
+
+async def decide_group_batch(tier: str, items: List[GroupBatchItem]) -> List[Optional[Dict[str, Any]]]:
+    """Decide several grouping requests in one batch matcher call; None for any it did not answer."""
+    from uuid import uuid4
+    started = time.perf_counter()
+    try:
+        text = await asyncio.wait_for(
+            run_text_agent(
+                group_batch_runners[tier],
+                build_batch_message(items),
+                GROUP_BATCH_USER_ID,
+                f"group-batch-{uuid4()}",
+                "/api/group batch",
+            ),
+            timeout=circuit_breaker.call_timeout,
+        )
+    except Exception:
+        # Successful batches are recorded by each request they answer; a failed one
+        # answers none, so it is reported here.
+        circuit_breaker.record((time.perf_counter() - started) * 1000, error=True)
         raise
+    decisions = parse_batch_decisions(text, len(items))
+    logger.info(
+        "Batch matcher decided %s of %s grouping requests (tier=%s)",
+        sum(1 for decision in decisions if decision is not None),
+        len(items),
+        tier,
+    )
+    return decisions
+
+
+async def presummarize_tab(request: GroupingRequest, user_id: str, summary_key: str) -> Optional[str]:
+    """
+    Summarize the new tab before it joins a grouping batch, and cache the summary.
+
+    The batch matcher has no summarizer step of its own, so this keeps batched
+    decisions working from the same summary as the coordinator's.
+
+    Returns:
+        str, optional: The summary, or None when the summarizer failed or returned nothing.
+    """
+    from uuid import uuid4
+    started = time.perf_counter()
+    message = build_summary_message(request.newTab, site=domain_knowledge.describe(request.newTab.url))
+    try:
+        with tracer.span("group.summarize"):
+            summary = await asyncio.wait_for(
+                run_text_agent(
+                    summarizer_runner,
+                    message,
+                    user_id,
+                    f"summary-{uuid4()}",
+                    "/api/group summary",
+                    state={DOMAIN_STATE_KEY: request.newTab.url},
+                ),
+                timeout=circuit_breaker.call_timeout,
+            )
     except Exception as exc:
-        logger.exception("Label generation failed: %s", exc)
-        raise HTTPException(status_code=500, detail="Unable to generate label") from exc
+        circuit_breaker.record((time.perf_counter() - started) * 1000, error=True)
+        logger.warning("Summarizing the new tab failed; deciding without a summary: %s", exc)
+        return None
+    if not summary:
+        return None
+    summary_cache.store(user_id, summary_key, summary, (time.perf_counter() - started) * 1000)
+    return summary
+
+
+group_batchers: Dict[str, MicroBatcher[GroupBatchItem, Dict[str, Any]]] = {
+    tier: MicroBatcher(
+        dispatch=lambda items, tier=tier: decide_group_batch(tier, items),
+        max_size=GROUP_BATCH_MAX_SIZE,
+        max_wait_seconds=GROUP_BATCH_MAX_WAIT_MS / 1000,
+        weigh=lambda item: item.tokens,
+        max_weight=GROUP_BATCH_TOKEN_BUDGET,
+    )
+    for tier in group_batch_runners
+}
+
+
+def degraded_response(request: GroupingRequest, similarities: List[float], cause: str) -> GroupingResponse:
+    """Serve a local heuristic decision instead of calling the provider."""
+    circuit_breaker.record_fallback()
+    # A retry should get a real decision once the provider is back, not this guess.
+    skip_storing()
+    response = heuristic_decision(request, similarities)
+    logger.info(
+        "Completed /api/group response (degraded, %s): action=%s, session_id=%s, reason=%s",
+        cause,
+        response.action,
+        response.sessionId,
+        response.reason,
+    )
+    return response
 
 
 @app.post("/api/group", response_model=GroupingResponse)
-async def group_session(request: GroupingRequest) -> GroupingResponse:
+async def group_session(request: GroupingRequest, http_request: Request, response: Response) -> GroupingResponse:
     """
     Session grouping endpoint that matches the Node.js /api/group interface.
     
     Receives current tab + existing sessions and returns merge/new decision.
     """
-    user_id = DEFAULT_USER_ID
+    user_id = client_identity(http_request)
+    return await idempotency_store.run(  # type: ignore[return-value]
+        http_request, response, "group", request, lambda: group_tabs(request, user_id), admit=lambda: rate_limiter.check(http_request)
+    )
+
+
+async def group_tabs(request: GroupingRequest, user_id: str) -> GroupingResponse:
+    """Decide how to group a new tab for `user_id`; shared by the HTTP and WebSocket transports."""
     # Generate a unique session ID for each request to avoid conversation history buildup
     from uuid import uuid4
     session_id = f"grouping-{uuid4()}"
@@ -250,18 +929,21 @@ async def group_session(request: GroupingRequest) -> GroupingResponse:
         existing_labels,
     )
 
-    def normalize_url(url: Optional[str]) -> str:
-        if not url:
-            return ""
-        return url.strip().rstrip("/")
-
-    normalized_new_url = normalize_url(request.newTab.url)
-    duplicate_session = None
-    if normalized_new_url:
-        for session in request.existingSessions:
-            if any(normalize_url(tab.url) == normalized_new_url for tab in session.tabList):
+    with tracer.span("group.index_lookup", **{"sessions.count": len(request.existingSessions)}) as index_span:
+        for session in session_index.sync(user_id, request.existingSessions):
+            # New or changed sessions also feed the extractive labeler's background corpus.
+            extractive_labeler.observe(user_id, session.id, session.tabList)
+        normalized_new_url = normalize_url(request.newTab.url)
+        sessions_by_id = {session.id: session for session in request.existingSessions}
+        duplicate_session = None
+        # The index names the sessions holding this URL; confirm against their tabs in case it is stale.
+        for duplicate_id in session_index.sessions_with_url(user_id, normalized_new_url):
+            session = sessions_by_id.get(duplicate_id)
+            if session is not None and any(normalize_url(tab.url) == normalized_new_url for tab in session.tabList):
                 duplicate_session = session
                 break
+        if index_span is not None:
+            index_span.set_attribute("index.candidates", len(session_index.candidates(user_id, request.newTab)))
 
     if duplicate_session:
         logger.info(
@@ -277,75 +959,84 @@ async def group_session(request: GroupingRequest) -> GroupingResponse:
             reason="duplicate_tab_url",
         )
 
+    similarities = topic_profiles.similarities(user_id, request.existingSessions, request.newTab)
+    if not circuit_breaker.allow():
+        return degraded_response(request, similarities, "circuit_open")
+
+    summary_key = summary_cache_key(request.newTab)
+    cached_summary = summary_cache.lookup(user_id, summary_key)
+    summary_hit = bool(cached_summary)
+    if cached_summary:
+        logger.info("Summary cache hit for new tab: key=%s", summary_key)
+    elif GROUP_BATCH_ENABLED:
+        cached_summary = await presummarize_tab(request, user_id, summary_key)
+
     try:
-        await ensure_session(user_id=user_id, session_id=session_id)
+        await ensure_session(
+            user_id=user_id,
+            session_id=session_id,
+            state={
+                SUMMARY_CACHE_STATE_KEY: summary_key,
+                SUMMARY_CACHE_PARTITION_STATE_KEY: user_id,
+                DOMAIN_STATE_KEY: request.newTab.url,
+            },
+        )
     except Exception as exc:
         logger.exception("Failed to ensure session: %s", exc)
         raise HTTPException(status_code=500, detail="Failed to prepare agent session") from exc
 
-    # Format the input as a structured message for the agent
-    input_message = f"""Process this tab grouping request:
-
-NEW TAB:
-- URL: {request.newTab.url}
-- Title: {request.newTab.title or 'Untitled'}
-"""
-    
-    if request.newTab.content:
-        if request.newTab.content.h1:
-            input_message += f"- Main Heading: {request.newTab.content.h1}\n"
-        if request.newTab.content.h2:
-            input_message += f"- Sections: {', '.join(request.newTab.content.h2[:3])}\n"
-        if request.newTab.content.metaDescription:
-            input_message += f"- Description: {request.newTab.content.metaDescription[:150]}\n"
-
-    if request.currentTabs:
-        input_message += f"\nCURRENT OPEN TABS ({len(request.currentTabs)}):\n"
-        for tab in request.currentTabs[:5]:
-            input_message += f"- {tab.title or 'Untitled'} — {tab.url}\n"
-
-    if request.existingSessions:
-        input_message += f"\nEXISTING SESSIONS ({len(request.existingSessions)}):\n"
-        for idx, session in enumerate(request.existingSessions):
-            input_message += f"\nSession {idx + 1} (ID: {session.id}, Label: {session.label or 'Unnamed'}):\n"
-            for tab in session.tabList[:3]:
-                input_message += f"  - {tab.title or 'Untitled'} — {tab.url}\n"
-    else:
-        input_message += "\nNo existing sessions.\n"
-
-    input_message += "\nProvide your grouping decision."
+    with tracer.span("group.prompt", **{"summary_cache.hit": summary_hit}) as prompt_span:
+        # Sessions whose topic would barely move with this tab keep their label on merge.
+        stable_label_ids = {
+            session.id
+            for session in request.existingSessions
+            if topic_profiles.is_stable(user_id, session, request.newTab)
+        }
+
+        grouping_body = build_grouping_message(
+            request,
+            cached_summary=cached_summary,
+            stable_label_ids=stable_label_ids,
+            site=None if cached_summary else domain_knowledge.describe(request.newTab.url),
+            framed=False,
+        )
+        input_message = frame_grouping_message(grouping_body)
+        if prompt_span is not None:
+            prompt_span.set_attribute("prompt.chars", len(input_message))
 
     new_message = Content(role="user", parts=[Part(text=input_message)])
 
-    try:
-        events = runner.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=new_message,
-        )
+    route = model_router.route(request.newTab, similarities)
+    group_runner = small_runner if route.tier == SMALL_TIER else runner
+    root_span = tracer.current_span()
+    if root_span is not None:
+        root_span.set_attribute("model.tier", route.tier)
+    route_started = time.perf_counter()
+    route_failed = False
+    route_cancelled = False
 
+    try:
         decision_json = None
-        async for event in events:
-            log_adk_event("/api/group", event)
-            content = getattr(event, "content", None)
-            if not content or not getattr(content, "parts", None):
-                continue
-
-            # Look for structured output from the matcher agent
-            for part in content.parts:  # type: ignore[attr-defined]
-                function_response = getattr(part, "function_response", None)
-                if function_response and getattr(function_response, "response", None):
-                    resp = function_response.response
-                    if isinstance(resp, dict):
-                        # Check if this is the matcher's output
-                        if "action" in resp:
-                            decision_json = resp
-                            break
-
-            if decision_json:
-                break
+        if GROUP_BATCH_ENABLED:
+            with tracer.span("group.batch") as batch_span:
+                # One user's tabs and sessions never share a prompt with another user's.
+                decision_json = await group_batchers[route.tier].submit(GroupBatchItem(grouping_body), key=user_id)
+                if batch_span is not None:
+                    batch_span.set_attribute("batch.answered", decision_json is not None)
+        if decision_json is None:
+            # Not batched (alone in its window), or the batch left this request undecided. The
+            # single call only gets the time the batch left over, so a batch that timed out
+            # degrades its requests instead of sending each of them to a slow provider.
+            remaining = circuit_breaker.call_timeout - (time.perf_counter() - route_started)
+            if remaining <= 0 or not circuit_breaker.allow():
+                raise asyncio.TimeoutError("Grouping time budget was spent waiting for the batch")
+            decision_json = await asyncio.wait_for(
+                collect_grouping_decision(group_runner, user_id, session_id, new_message),
+                timeout=remaining,
+            )
 
         if not decision_json:
+            skip_storing()
             response = GroupingResponse(
                 action="create_new",
                 suggestedLabel=None,
@@ -357,67 +1048,115 @@ NEW TAB:
             )
             return response
 
-        # Parse the decision
-        action = decision_json.get("action")
-        if action == "new":
-            action = "create_new"
-        if action == "no_action":
-            reason = decision_json.get("reason") or "agent_returned_no_action"
-            updated_label = decision_json.get("updatedLabel") or decision_json.get("label")
-            response = GroupingResponse(
-                action="no_action",
-                sessionId=decision_json.get("sessionId"),
-                updatedLabel=updated_label,
-                label=updated_label,
-                reason=reason,
-            )
-            logger.info(
-                "Completed /api/group response: action=no_action, session_id=%s, reason=%s",
-                response.sessionId,
-                response.reason,
-            )
-            return response
-        if action == "merge":
-            updated_label = decision_json.get("updatedLabel") or decision_json.get("label")
-            response = GroupingResponse(
-                action="merge",
-                sessionId=decision_json.get("sessionId", ""),
-                updatedLabel=updated_label,
-                label=updated_label,
-                reason=decision_json.get("reason"),
-            )
-            logger.info(
-                "Completed /api/group response: action=merge, session_id=%s, updated_label=%s",
-                response.sessionId,
-                response.updatedLabel,
-            )
-            return response
-        else:
-            suggested_label = decision_json.get("suggestedLabel") or decision_json.get("label")
-            response = GroupingResponse(
-                action="create_new",
-                suggestedLabel=suggested_label,
-                label=suggested_label,
-                reason=decision_json.get("reason"),
-            )
-            logger.info(
-                "Completed /api/group response: action=create_new, suggested_label=%s",
-                response.suggestedLabel,
-            )
-            return response
+        with tracer.span("group.map_response", **{"decision.action": decision_json.get("action")}):
+            return map_grouping_decision(decision_json, request, stable_label_ids, user_id, similarities)
 
+    except asyncio.CancelledError:
+        # The caller went away; that says nothing about the provider's health.
+        route_cancelled = True
+        raise
     except Exception as exc:
+        route_failed = True
         logger.exception("Agent execution failed: %s", exc)
-        raise HTTPException(status_code=500, detail="Agent execution failed") from exc
+        return degraded_response(request, similarities, "agent_error")
+    finally:
+        if not route_cancelled:
+            elapsed_ms = (time.perf_counter() - route_started) * 1000
+            model_router.record(route.tier, elapsed_ms, error=route_failed)
+            circuit_breaker.record(elapsed_ms, error=route_failed)
+        # Grouping sessions are single-use; drop them so their event history does not accumulate.
+        await session_service.delete_session(app_name=RUNNER_APP_NAME, user_id=user_id, session_id=session_id)
+
+
+# Navigation bursts are debounced per tab; only the settled URL reaches the agent.
+tab_event_debouncer = TabEventDebouncer(
+    classify=group_tabs,
+    quiet_seconds=DEBOUNCE_QUIET_MS / 1000,
+    result_ttl_seconds=DEBOUNCE_RESULT_TTL_SECONDS,
+)
+
+
+@app.post("/api/tab-events", response_model=TabEventStatus, status_code=202)
+async def submit_tab_event(request: TabEventRequest, http_request: Request) -> TabEventStatus:
+    """
+    Queue a tab navigation for debounced grouping.
+
+    Poll `GET /api/tab-events/{eventId}` for the decision. A newer event for the
+    same `tabId` within the quiet window supersedes this one.
+    """
+    await rate_limiter.check(http_request)
+    user_id = client_identity(http_request)
+    event = tab_event_debouncer.submit(f"{user_id}:{request.tabId}", request, user_id)
+    return event.to_status()
+
+
+@app.get("/api/tab-events/{event_id}", response_model=TabEventStatus)
+async def get_tab_event(event_id: str, wait: float = 0.0) -> TabEventStatus:
+    """Return a tab event's state, optionally long-polling up to `wait` seconds for it to settle."""
+    event = tab_event_debouncer.get(event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired tab event")
+    await tab_event_debouncer.wait(event, timeout=min(max(wait, 0.0), MAX_TAB_EVENT_WAIT_SECONDS))
+    return event.to_status()
+
+
+async def ws_group(payload: Dict[str, Any], websocket: WebSocket) -> GroupingResponse:
+    return await group_tabs(GroupingRequest.model_validate(payload), client_identity(websocket))
+
+
+async def ws_label(payload: Dict[str, Any], websocket: WebSocket) -> LabelResponse:
+    return await label_tabs(LabelRequest.model_validate(payload), client_identity(websocket))
+
+
+async def ws_label_batch(payload: Dict[str, Any], websocket: WebSocket) -> LabelBatchResponse:
+    request = LabelBatchRequest.model_validate(payload)
+    # The channel already took one token for this message.
+    extra_cost = label_batch_cost(request) - 1
+    if extra_cost > 0:
+        await rate_limiter.check(websocket, cost=extra_cost)
+    return await label_batch(request, client_identity(websocket))
+
+
+async def ws_tab_event(payload: Dict[str, Any], websocket: WebSocket) -> TabEventStatus:
+    """Push delivery: reply once the event is classified or superseded."""
+    request = TabEventRequest.model_validate(payload)
+    user_id = client_identity(websocket)
+    event = tab_event_debouncer.submit(f"{user_id}:{request.tabId}", request, user_id)
+    await event.settled.wait()
+    return event.to_status()
+
+
+websocket_channel = WebSocketChannel(
+    handlers={"group": ws_group, "label": ws_label, "label_batch": ws_label_batch, "tab_event": ws_tab_event},
+    admit=rate_limiter.check,
+    allowed_origins=ALLOW_ORIGINS,
+)
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket) -> None:
+    """
+    Persistent channel for `group` and `label` requests.
+
+    Each frame is `{"id", "type", "payload"}` where `payload` has the same shape
+    as the matching HTTP request body; replies arrive as they complete.
+    """
+    await websocket_channel.serve(websocket)
 
 
 @app.post("/agent/run", response_model=AgentResponse)
-async def run_agent(request: AgentRequest) -> AgentResponse:
+async def run_agent(request: AgentRequest, http_request: Request) -> AgentResponse:
+    await rate_limiter.check(http_request)
+    # Multi-turn tool runs take as long as the conversation needs, so their latency would skew the
+    # breaker's window; they are not recorded, but are still refused while the provider is down.
+    if not circuit_breaker.allow():
+        raise provider_unavailable()
     user_id = request.user_id or DEFAULT_USER_ID
     session_id = request.ensure_session_id()
 
     try:
         await ensure_session(user_id=user_id, session_id=session_id)
+        await agent_session_quota.enforce(user_id, keep=session_id)
     except Exception as exc:
         logger.exception("Failed to ensure session: %s", exc)
         raise HTTPException(status_code=500, detail="Failed to prepare agent session") from exc
@@ -7,25 +7,29 @@ import os
 from typing import Optional
 
 from google.adk.agents import LlmAgent
-from google.adk.models.lite_llm import LiteLlm
 
-from .prompt import MATCHER_INSTRUCTION
+from ..models import create_model
+from ..tracing import tracer
+from ..usage import prompt_usage
+from .prompt import BATCH_MATCHER_INSTRUCTION, MATCHER_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 
 
-def create_matcher_agent(api_key: Optional[str] = None, model: Optional[str] = None) -> LlmAgent:
+def create_matcher_agent(api_key: Optional[str] = None, model: Optional[str] = None, batch: bool = False) -> LlmAgent:
     """
     Create the matcher agent that decides session grouping.
 
     Args:
         api_key (str, optional): OpenAI API key. Defaults to env var.
         model (str, optional): Model identifier. Defaults to gpt-4o.
+        batch (bool): Decide several grouping requests per message, answering with a JSON object.
 
     Returns:
         LlmAgent: The configured matcher agent
     """
-    logger.info("Creating matcher agent")
+    name = "batch_matcher_agent" if batch else "matcher_agent"
+    logger.info("Creating %s", name)
 
     if not api_key:
         api_key = os.getenv("OPENAI_API_KEY")
@@ -34,12 +38,14 @@ def create_matcher_agent(api_key: Optional[str] = None, model: Optional[str] = N
         model = os.getenv("OPENAI_MODEL", "openai/gpt-4o")
 
     agent = LlmAgent(
-        name="matcher_agent",
-        model=LiteLlm(model=model, api_key=api_key),
+        name=name,
+        model=create_model(model, api_key, agent_name=name),
         description="Determines if current tab should merge into an existing session or create a new one.",
-        instruction=MATCHER_INSTRUCTION,
+        instruction=BATCH_MATCHER_INSTRUCTION if batch else MATCHER_INSTRUCTION,
+        before_model_callback=tracer.before_model_callback,
+        after_model_callback=[prompt_usage.after_model_callback, tracer.after_model_callback],
     )
 
-    logger.info("Matcher agent created successfully")
+    logger.info("%s created successfully", name)
     return agent
 
@@ -0,0 +1,85 @@
+"""
+Batched grouping - Decides several concurrent `/api/group` requests in one matcher call.
+
+Each request becomes a block headed by a short handle (`=== R1 ===`) holding
+its usual grouping message, whose session handles (`S1`, `S2`, ...) stay local
+to the block. The batch matcher answers with one JSON object mapping request
+handles to decision objects, which are then mapped back exactly like a single
+request's decision.
+
+Only requests from the same user share a batch. The batch matcher has no
+summarizer step; the request handler summarizes the new tab first (or reuses
+a cached summary), so batched and single decisions see the same summary.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..compact import estimate_tokens
+from .prompt import build_batch_group_message
+
+GROUP_BATCH_ENABLED = os.getenv("SESSION_CONTEXT_GROUP_BATCH", "false").lower() in ("1", "true", "yes")
+GROUP_BATCH_MAX_SIZE = int(os.getenv("SESSION_CONTEXT_GROUP_BATCH_MAX_SIZE", "8"))
+GROUP_BATCH_MAX_WAIT_MS = float(os.getenv("SESSION_CONTEXT_GROUP_BATCH_MAX_WAIT_MS", "50"))
+GROUP_BATCH_TOKEN_BUDGET = int(os.getenv("SESSION_CONTEXT_GROUP_BATCH_TOKEN_BUDGET", "12000"))
+
+DECISION_ACTIONS = {"merge", "create_new", "new", "no_action"}
+
+
+@dataclass
+class GroupBatchItem:
+    """One grouping request waiting for a batch: its unframed grouping message."""
+
+    message: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.message)
+
+
+def request_handle(index: int) -> str:
+    return f"R{index + 1}"
+
+
+def build_batch_message(items: Sequence[GroupBatchItem]) -> str:
+    return build_batch_group_message([(request_handle(index), item.message) for index, item in enumerate(items)])
+
+
+def parse_batch_decisions(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Read per-request decisions from the batch matcher's reply.
+
+    Accepts the requested JSON object, also inside code fences or surrounding
+    text. A request whose handle is missing, or whose value is not a decision
+    with a known action, gets None; the caller decides it on its own.
+
+    Returns:
+        list: One decision or None per request, in request order.
+    """
+    parsed: Any = None
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        try:
+            parsed = json.loads(text[start : end + 1])
+        except ValueError:
+            parsed = None
+    by_handle = {str(key).strip().upper(): value for key, value in parsed.items()} if isinstance(parsed, dict) else {}
+    decisions: List[Optional[Dict[str, Any]]] = []
+    for index in range(count):
+        decision = by_handle.get(request_handle(index))
+        valid = isinstance(decision, dict) and decision.get("action") in DECISION_ACTIONS
+        decisions.append(decision if valid else None)
+    return decisions
+
+
+__all__ = [
+    "GROUP_BATCH_ENABLED",
+    "GROUP_BATCH_MAX_SIZE",
+    "GROUP_BATCH_MAX_WAIT_MS",
+    "GROUP_BATCH_TOKEN_BUDGET",
+    "GroupBatchItem",
+    "build_batch_message",
+    "parse_batch_decisions",
+]
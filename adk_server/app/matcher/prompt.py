@@ -2,6 +2,8 @@
 Prompts for the Matcher agent.
 """
 
+from typing import Sequence, Tuple
+
 MATCHER_INSTRUCTION = """You are a session matching agent responsible for determining whether a new browser tab should be merged into an existing browsing session or start a new one.
 
 ## YOUR TASK
@@ -9,7 +11,7 @@ MATCHER_INSTRUCTION = """You are a session matching agent responsible for determ
 You will receive:
 1. A detailed summary of the current browser tab (including its URL, topic, purpose, and key details)
 2. A list of existing browsing sessions, each containing:
-   - Session ID
+   - Session handle (`S1`, `S2`, ...) or ID
    - Current session label
    - List of tabs already in that session (with their URLs and descriptions)
 
@@ -43,7 +45,7 @@ Only create a new session when the topic is clearly distinct. When uncertain, pr
 ## OUTPUT REQUIREMENTS
 
 ### For MERGE decisions:
-- Provide the `sessionId` of the session to merge into (select the most relevant one if multiple sessions could fit)
+- Provide the session's handle exactly as listed (e.g. `S2`) as `sessionId`; use the ID only if the session is listed with one (select the most relevant session if multiple could fit)
 - Generate an `updatedLabel` that:
   * Captures BOTH the existing session content AND the new tab being added
   * Remains concise (3-5 words maximum)
@@ -64,10 +66,13 @@ Only create a new session when the topic is clearly distinct. When uncertain, pr
 
 ### For NO_ACTION decisions:
 - Set `action` to exactly "no_action"
-- Provide the `sessionId` of the session where the duplicate exists (if applicable)
+- Provide the handle (e.g. `S2`) of the session where the duplicate exists as `sessionId` (if applicable)
 - Include the existing session's `label` in the `updatedLabel` and `label` fields
 - Provide a clear `reason` (e.g., "Duplicate URL already exists in session")
 
+### Label stability:
+Sessions listed under `KEEP LABEL` are still on topic with the new tab. When merging into one of them, leave `updatedLabel` and `label` empty; the existing label is kept by the server.
+
 ## LABEL GENERATION GUIDELINES
 
 Good labels:
@@ -90,3 +95,32 @@ Always include a clear `reason` field that:
 
 Return your complete analysis as natural text, explaining your reasoning before providing your structured decision."""
 
+
+BATCH_MATCHER_INSTRUCTION = MATCHER_INSTRUCTION.split("## REASONING AND TRANSPARENCY")[0] + """## BATCH INPUT
+
+You will receive several independent tab grouping requests at once, all from one user. Each starts
+with a handle line such as `=== R1 ===` and holds its own existing sessions, open tabs and new tab.
+There is no separate summary step: judge the new tab from its `CACHED SUMMARY`, or from its URL,
+title, site description and headings when there is none. Session handles (`S1`, `S2`, ...) are numbered per request and only
+refer to sessions listed in that request. Decide every request independently, following all of the
+rules above; never let one request's sessions or tabs influence another's decision.
+
+## OUTPUT
+
+Return ONLY one JSON object that maps every request handle to its decision object, for example:
+{"R1": {"action": "merge", "sessionId": "S2", "updatedLabel": "Python Async Programming", "label": "Python Async Programming", "reason": "Same topic as S2"},
+ "R2": {"action": "create_new", "suggestedLabel": "Rome Trip Planning", "label": "Rome Trip Planning", "reason": "Unrelated to existing sessions"}}
+
+Include each handle exactly once. Keep each `reason` to one sentence. Do not add code fences or any other text."""
+
+
+def build_batch_group_message(blocks: Sequence[Tuple[str, str]]) -> str:
+    """List `(handle, grouping message)` blocks for the batch matcher, in order."""
+    lines = [f"Decide these {len(blocks)} independent tab grouping requests:"]
+    for handle, message in blocks:
+        lines.append("")
+        lines.append(f"=== {handle} ===")
+        lines.append(message)
+    lines.append("")
+    lines.append("Provide one decision per request handle.")
+    return "\n".join(lines)
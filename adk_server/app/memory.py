@@ -0,0 +1,253 @@
+"""
+Memory diagnostics for long-running workers.
+
+`tracemalloc` is only started on demand (or at startup with
+`SESSION_CONTEXT_TRACEMALLOC=true`), so nothing is traced and no allocation
+overhead is paid until an operator turns it on. The server registers its
+in-memory structures (session services, caches, trace buffers) so their entry
+counts and approximate deep sizes can be reported alongside the allocation
+statistics.
+"""
+
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC_AT_STARTUP = os.getenv("SESSION_CONTEXT_TRACEMALLOC", "false").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.getenv("SESSION_CONTEXT_TRACEMALLOC_FRAMES", "1"))
+MAX_SNAPSHOTS = 5
+# Deep size walks stop after this many objects so a huge structure cannot stall the worker.
+DEEP_SIZE_OBJECT_LIMIT = 200_000
+
+GROUPINGS = ("module", "package", "lineno")
+# Classes, modules and functions are shared by the whole process, not owned by a structure.
+SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj: Any, limit: int = DEEP_SIZE_OBJECT_LIMIT) -> Tuple[int, bool]:
+    """
+    Approximate the memory held by `obj` and everything reachable from it.
+
+    Returns:
+        tuple: (bytes, truncated) where `truncated` is True if the walk hit `limit`.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        if len(seen) >= limit:
+            return total, True
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, SHARED_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item, 0)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, int, float, bool)) and item is not None:
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total, False
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    )
+
+
+def _module_index() -> Dict[str, str]:
+    index = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename:
+            index[os.path.abspath(filename)] = name
+    return index
+
+
+def _module_for(filename: str, index: Dict[str, str]) -> str:
+    module = index.get(os.path.abspath(filename))
+    if module:
+        return module
+    for entry in sorted(sys.path, key=len, reverse=True):
+        if entry and filename.startswith(entry.rstrip(os.sep) + os.sep):
+            relative = filename[len(entry.rstrip(os.sep)) + 1 :]
+            return os.path.splitext(relative)[0].replace(os.sep, ".")
+    return filename
+
+
+def _rows(
+    statistics: List[Any], group_by: str, limit: int, diff: bool = False
+) -> List[Dict[str, Any]]:
+    """Aggregate tracemalloc statistics by module, top-level package or line."""
+    index = _module_index()
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for stat in statistics:
+        frame = stat.traceback[0]
+        module = _module_for(frame.filename, index)
+        if group_by == "package":
+            key = module.split(".", 1)[0]
+        elif group_by == "lineno":
+            key = f"{module}:{frame.lineno}"
+        else:
+            key = module
+        row = grouped.setdefault(key, {"site": key, "size_kb": 0.0, "count": 0})
+        row["size_kb"] += stat.size / 1024
+        row["count"] += stat.count
+        if diff:
+            row["size_diff_kb"] = row.get("size_diff_kb", 0.0) + stat.size_diff / 1024
+            row["count_diff"] = row.get("count_diff", 0) + stat.count_diff
+
+    sort_key = "size_diff_kb" if diff else "size_kb"
+    rows = sorted(grouped.values(), key=lambda row: abs(row[sort_key]), reverse=True)[:limit]
+    for row in rows:
+        row["size_kb"] = round(row["size_kb"], 1)
+        if diff:
+            row["size_diff_kb"] = round(row["size_diff_kb"], 1)
+    return rows
+
+
+class MemoryProfiler:
+    """On-demand tracemalloc control plus sizes of registered in-memory structures."""
+
+    def __init__(self) -> None:
+        self._structures: Dict[str, Tuple[Any, Optional[Callable[[], int]]]] = {}
+        self._snapshots: "OrderedDict[str, Tuple[float, tracemalloc.Snapshot]]" = OrderedDict()
+
+    def register(self, name: str, obj: Any, count: Optional[Callable[[], int]] = None) -> None:
+        """
+        Report `obj` under `name`.
+
+        Args:
+            name (str): Label used in the report.
+            obj (Any): The structure; its deep size is measured on request (skipped when None).
+            count (callable, optional): Returns the entry count; defaults to `len(obj)`.
+        """
+        self._structures[name] = (obj, count)
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("tracemalloc started (frames=%s)", frames)
+
+    def stop(self) -> None:
+        """Stop tracing and drop stored snapshots, which are only comparable within one run."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        self._snapshots.clear()
+
+    def take_snapshot(self, label: Optional[str] = None) -> str:
+        """Store a snapshot under `label` (evicting the oldest beyond MAX_SNAPSHOTS) and return the label."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        label = label or f"snapshot-{int(time.time())}"
+        snapshot = _snapshot()
+        self._snapshots[label] = (time.time(), snapshot)
+        self._snapshots.move_to_end(label)
+        while len(self._snapshots) > MAX_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+        return label
+
+    def top(self, group_by: str = "module", limit: int = 20) -> List[Dict[str, Any]]:
+        """Largest live allocation sites right now; raises RuntimeError if tracemalloc is not running."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        return _rows(_snapshot().statistics("lineno"), group_by, limit)
+
+    def diff(self, base: Optional[str] = None, group_by: str = "module", limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Allocation growth since snapshot `base` (default: the oldest stored one).
+
+        Raises:
+            KeyError: If `base` (or any snapshot) is not stored.
+            RuntimeError: If tracemalloc is not running.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        if base is None:
+            base = next(iter(self._snapshots), None)
+        if base is None or base not in self._snapshots:
+            raise KeyError(base or "no snapshot stored")
+        previous = self._snapshots[base][1]
+        return _rows(_snapshot().compare_to(previous, "lineno"), group_by, limit, diff=True)
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        return [{"label": label, "taken_at": taken_at} for label, (taken_at, _) in self._snapshots.items()]
+
+    def structures(self, deep: bool = False) -> Dict[str, Dict[str, Any]]:
+        report: Dict[str, Dict[str, Any]] = {}
+        for name, (obj, count) in self._structures.items():
+            entry: Dict[str, Any] = {}
+            try:
+                entry["entries"] = count() if count is not None else len(obj)
+            except Exception as exc:  # pragma: no cover - defensive against third-party internals
+                entry["error"] = str(exc)
+            if deep and obj is not None:
+                size, truncated = deep_sizeof(obj)
+                entry["approx_kb"] = round(size / 1024, 1)
+                if truncated:
+                    entry["truncated"] = True
+            report[name] = entry
+        return report
+
+    def report(self, deep: bool = False) -> Dict[str, Any]:
+        traced: Dict[str, Any] = {"running": self.tracing, "snapshots": self.snapshots()}
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            traced.update(
+                current_kb=round(current / 1024, 1),
+                peak_kb=round(peak / 1024, 1),
+                overhead_kb=round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+            )
+        return {
+            "process": process_memory(),
+            "gc": {"counts": gc.get_count(), "objects": len(gc.get_objects()) if deep else None},
+            "tracemalloc": traced,
+            "structures": self.structures(deep=deep),
+        }
+
+
+def process_memory() -> Dict[str, Any]:
+    """Resident and peak memory of this worker, where the platform exposes them."""
+    memory: Dict[str, Any] = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            resident_pages = int(handle.read().split()[1])
+        memory["rss_kb"] = resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_kb"] = peak // 1024 if sys.platform == "darwin" else peak
+    except ImportError:  # pragma: no cover - not available on Windows
+        pass
+    return memory
+
+
+memory_profiler = MemoryProfiler()
+if TRACEMALLOC_AT_STARTUP:
+    memory_profiler.start()
+
+__all__ = ["GROUPINGS", "MemoryProfiler", "deep_sizeof", "memory_profiler", "process_memory"]
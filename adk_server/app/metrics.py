@@ -0,0 +1,52 @@
+"""
+Minimal in-process metric primitives reported by `GET /metrics`.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class LatencyStats:
+    """
+    Request counter with latency percentiles over a sliding window.
+
+    Args:
+        window (int): Number of most recent samples used for percentiles.
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def record(self, elapsed_ms: float, error: bool = False) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if error:
+                self.errors += 1
+            self._samples.append(elapsed_ms)
+
+    def percentile(self, fraction: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 1),
+            "p95_ms": round(self.percentile(0.95), 1),
+            "p99_ms": round(self.percentile(0.99), 1),
+        }
+
+
+__all__ = ["LatencyStats"]
@@ -0,0 +1,110 @@
+"""
+Model construction shared by every agent.
+
+All agents obtain their model through `create_model` so that cross-cutting
+behaviour (traffic recording, replayed responses) is applied in one place.
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator, List, Optional
+
+import litellm
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .http_pool import install_litellm_client
+from .recorder import REPLAY_SPEED, next_replayed_call, replay_store, traffic_recorder
+
+logger = logging.getLogger(__name__)
+
+# Every LiteLlm instance created below shares one pooled keep-alive HTTP client.
+install_litellm_client()
+
+
+class RecordingLlm(BaseLlm):
+    """Wraps another model and records each call's responses and timing."""
+
+    agent_name: str
+    inner: BaseLlm
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        latencies: List[float] = []
+        responses: List[LlmResponse] = []
+        error: Optional[str] = None
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                latencies.append((time.perf_counter() - started) * 1000)
+                responses.append(response)
+                yield response
+        except Exception as exc:
+            error = str(exc)
+            raise
+        finally:
+            # Also when the caller stops early: text agents return on the first reply and close the stream.
+            traffic_recorder.add_model_call(self.agent_name, latencies, responses, error=error)
+
+
+class ReplayLlm(BaseLlm):
+    """Answers model calls with responses recorded for the request being replayed."""
+
+    agent_name: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        call = next_replayed_call(self.agent_name)
+        if call is None:
+            raise RuntimeError(f"No recorded model response left for {self.agent_name}")
+        if call.get("error"):
+            raise RuntimeError(f"Replayed model error: {call['error']}")
+
+        elapsed_ms = 0.0
+        for latency_ms, payload in zip(call["latency_ms"], call["responses"]):
+            if REPLAY_SPEED > 0:
+                await asyncio.sleep(max(0.0, latency_ms - elapsed_ms) / 1000 / REPLAY_SPEED)
+            elapsed_ms = latency_ms
+            yield LlmResponse.model_validate(payload)
+
+
+def create_model(model: str, api_key: Optional[str], agent_name: str) -> BaseLlm:
+    """
+    Build the model an agent should use.
+
+    Args:
+        model (str): LiteLLM model identifier.
+        api_key (str, optional): Provider API key.
+        agent_name (str): Name of the agent the model serves; used to match
+            recorded responses during replay.
+
+    Returns:
+        BaseLlm: A LiteLlm instance, optionally wrapped for recording, or a
+        replayed model when `SESSION_CONTEXT_REPLAY_FILE` is set.
+    """
+    if replay_store.enabled:
+        return ReplayLlm(model=model, agent_name=agent_name)
+    llm = LiteLlm(model=model, api_key=api_key)
+    if traffic_recorder.enabled:
+        return RecordingLlm(model=model, agent_name=agent_name, inner=llm)
+    return llm
+
+
+async def probe_model(model: str, api_key: Optional[str]) -> None:
+    """Send a one-token completion to check that the provider answers; raises on failure."""
+    if replay_store.enabled:
+        return
+    await litellm.acompletion(
+        model=model,
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1,
+        api_key=api_key,
+    )
+
+
+__all__ = ["RecordingLlm", "ReplayLlm", "create_model", "probe_model"]
@@ -0,0 +1,255 @@
+"""
+On-demand profiling of single agent requests.
+
+When one request shape is slow, an operator can rerun that exact request with
+`X-Profile: 1` (or `?profile=1`) plus the admin token. It then runs under
+`cProfile` and the response carries an `X-Profile-Id` header. The profile is
+written to `SESSION_CONTEXT_PROFILE_DIR` and can be listed and fetched from the
+`/debug/profiles` endpoints, as a JSON table of the top functions or as a raw
+`.prof` file for `pstats` or snakeviz.
+
+The profiler is attached to the event-loop thread for the whole time the
+request is in flight. It covers body decoding, prompt building, the agent run
+with its event processing, and response encoding, including tasks the request
+hands off to (idempotent runs and grouping batches). It also sees whatever else
+the loop ran meanwhile, so a quiet worker gives the cleanest profile. Work done
+in `asyncio.to_thread` workers is not included. Only one request is profiled at
+a time, because Python allows one active profiler per thread.
+
+The middleware is only installed when the admin token is set, so unflagged
+requests pay nothing unless profiling is available, and then only a path and
+header lookup.
+"""
+
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+from uuid import uuid4
+
+from starlette.responses import JSONResponse
+
+from .admin import ADMIN_TOKEN, ADMIN_TOKEN_HEADER, admin_token_valid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("SESSION_CONTEXT_PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("SESSION_CONTEXT_PROFILE_KEEP", "50"))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILED_PATHS = {"/api/group", "/api/label", "/agent/run"}
+# Sort orders of a profile report, by the report column they sort on.
+SORT_KEYS = {"cumulative": "cumtime_ms", "tottime": "tottime_ms", "calls": "calls"}
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{9}-[0-9a-f]{8}$")
+_FLAG_VALUES = {"1", "true", "yes"}
+
+
+def _flagged(scope: Dict[str, Any]) -> bool:
+    header = dict(scope["headers"]).get(PROFILE_HEADER.encode("latin-1"))
+    if header is not None:
+        return header.decode("latin-1").strip().lower() in _FLAG_VALUES
+    query = scope.get("query_string") or b""
+    if b"profile" not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get("profile", [])
+    return any(value.lower() in _FLAG_VALUES for value in values)
+
+
+def _function_rows(stats: pstats.Stats, sort: str, limit: int) -> List[Dict[str, Any]]:
+    rows = []
+    for (filename, line, name), (primitive, calls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append(
+            {
+                "function": f"{filename}:{line}({name})" if line else name,
+                "calls": calls,
+                "primitive_calls": primitive,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda row: row[SORT_KEYS[sort]], reverse=True)
+    return rows[:limit]
+
+
+class RequestProfiler:
+    """
+    Profiles flagged requests and keeps the most recent profiles on disk.
+
+    Args:
+        directory (str): Where `.prof` files and their metadata are written.
+        keep (int): Profiles kept; older ones are deleted.
+        enabled (bool): Whether flagged requests are profiled (requires the admin token).
+    """
+
+    def __init__(self, directory: str, keep: int, enabled: bool) -> None:
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.enabled = enabled
+        self._active = False
+        self.profiled = 0
+        self.rejected = 0
+        self.write_failures = 0
+
+    def _paths(self, profile_id: str) -> Dict[str, str]:
+        base = os.path.join(self.directory, profile_id)
+        return {"prof": f"{base}.prof", "meta": f"{base}.json"}
+
+    def _write(self, profile_id: str, profiler: cProfile.Profile, meta: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        paths = self._paths(profile_id)
+        stats = pstats.Stats(profiler)
+        meta["total_calls"] = stats.total_calls  # type: ignore[attr-defined]
+        stats.dump_stats(paths["prof"])
+        with open(paths["meta"], "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        self._prune()
+
+    def _prune(self) -> None:
+        profiles = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in profiles[: max(0, len(profiles) - self.keep)]:
+            for path in self._paths(profile_id).values():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    async def run(self, app: Any, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        """Run one flagged request under the profiler and save the result."""
+        if self._active:
+            self.rejected += 1
+            response = JSONResponse({"detail": "Another request is being profiled; retry shortly"}, status_code=409)
+            await response(scope, receive, send)
+            return
+
+        now = time.time()
+        # Sortable by start time, down to the millisecond.
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}-{uuid4().hex[:8]}"
+        status = 500
+
+        async def profiled_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        self._active = True
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        profiler.enable()
+        try:
+            await app(scope, receive, profiled_send)
+        finally:
+            profiler.disable()
+            wall_ms = (time.perf_counter() - started) * 1000
+            cpu_ms = (time.thread_time() - cpu_started) * 1000
+            self._active = False
+            self.profiled += 1
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "request_id": scope.get("state", {}).get("request_id"),
+                "created_at": now,
+                "wall_ms": round(wall_ms, 1),
+                "loop_cpu_ms": round(cpu_ms, 1),
+            }
+            try:
+                await asyncio.to_thread(self._write, profile_id, profiler, meta)
+                logger.info("Profiled %s %s as %s (%.0f ms)", scope["method"], scope["path"], profile_id, wall_ms)
+            except OSError as exc:
+                self.write_failures += 1
+                logger.warning("Failed to write profile %s to %s: %s", profile_id, self.directory, exc)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as handle:
+                    profiles.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def prof_path(self, profile_id: str) -> Optional[str]:
+        """Path of a stored `.prof` file, or None for unknown (or malformed) IDs."""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self._paths(profile_id)["prof"]
+        return path if os.path.isfile(path) else None
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[Dict[str, Any]]:
+        """
+        Summarize a stored profile.
+
+        Args:
+            profile_id (str): ID from the `X-Profile-Id` header or the listing.
+            sort (str): `cumulative`, `tottime` or `calls`.
+            limit (int): Functions returned.
+
+        Returns:
+            dict: The profile's metadata and its top functions, or None if it does not exist.
+        """
+        path = self.prof_path(profile_id)
+        if path is None:
+            return None
+        with open(self._paths(profile_id)["meta"], encoding="utf-8") as handle:
+            meta = json.load(handle)
+        meta["sort"] = sort
+        meta["functions"] = _function_rows(pstats.Stats(path), sort, limit)
+        return meta
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "active": self._active,
+            "profiled": self.profiled,
+            "rejected": self.rejected,
+            "write_failures": self.write_failures,
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-flagged requests to the agent endpoints."""
+
+    def __init__(self, app: Any, profiler: RequestProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS or not _flagged(scope):
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(ADMIN_TOKEN_HEADER.encode("latin-1"), b"")
+        if not admin_token_valid(token.decode("latin-1")):
+            response = JSONResponse({"detail": "Admin token required to profile a request"}, status_code=403)
+            await response(scope, receive, send)
+            return
+        await self.profiler.run(self.app, scope, receive, send)
+
+
+request_profiler = RequestProfiler(directory=PROFILE_DIR, keep=PROFILE_KEEP, enabled=ADMIN_TOKEN is not None)
+
+__all__ = [
+    "PROFILE_ID_HEADER",
+    "ProfilingMiddleware",
+    "RequestProfiler",
+    "request_profiler",
+]
@@ -0,0 +1,106 @@
+"""
+Per-user quotas for ADK sessions held by an in-memory session service.
+
+Grouping and label sessions are deleted as soon as their request finishes, but
+`/agent/run` conversations persist. Each user keeps at most
+`SESSION_CONTEXT_AGENT_SESSIONS_PER_USER` of them, with the least recently
+updated dropped first. When all users together exceed
+`SESSION_CONTEXT_AGENT_SESSIONS_MAX`, sessions are dropped from whichever user
+holds the most, so a single heavy user cannot evict everyone else's history.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence
+
+from google.adk.sessions import InMemorySessionService
+
+logger = logging.getLogger(__name__)
+
+AGENT_SESSIONS_PER_USER = int(os.getenv("SESSION_CONTEXT_AGENT_SESSIONS_PER_USER", "20"))
+AGENT_SESSIONS_MAX = int(os.getenv("SESSION_CONTEXT_AGENT_SESSIONS_MAX", "1000"))
+
+
+class SessionQuota:
+    """
+    Enforces per-user and global session limits on one app of a session service.
+
+    Args:
+        service (InMemorySessionService): The session service to trim.
+        app_name (str): App whose sessions are limited.
+        per_user (int): Sessions kept per user.
+        total (int): Sessions kept across all users.
+        transient_prefixes (sequence): Session ID prefixes of single-request sessions,
+            which are neither counted nor evicted (they are deleted when their request ends).
+    """
+
+    def __init__(
+        self,
+        service: InMemorySessionService,
+        app_name: str,
+        per_user: int,
+        total: int,
+        transient_prefixes: Sequence[str] = (),
+    ) -> None:
+        self.service = service
+        self.app_name = app_name
+        self.transient_prefixes = tuple(transient_prefixes)
+        self.per_user = max(1, per_user)
+        self.total = max(self.per_user, total)
+        self.quota_evictions = 0
+        self.evictions = 0
+
+    def _users(self) -> Dict[str, Dict[str, Any]]:
+        """User -> {session ID -> session}, without transient sessions."""
+        return {
+            user_id: {
+                session_id: session
+                for session_id, session in sessions.items()
+                if not session_id.startswith(self.transient_prefixes)
+            }
+            for user_id, sessions in self.service.sessions.get(self.app_name, {}).items()
+        }
+
+    def _oldest(self, user_id: str, keep: Optional[str]) -> Optional[str]:
+        sessions = self._users().get(user_id, {})
+        candidates = [(session.last_update_time, session_id) for session_id, session in sessions.items() if session_id != keep]
+        return min(candidates)[1] if candidates else None
+
+    async def _evict(self, user_id: str, keep: Optional[str]) -> bool:
+        session_id = self._oldest(user_id, keep)
+        if session_id is None:
+            return False
+        await self.service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        logger.info("Evicted agent session %s of %s to stay within quota", session_id, user_id)
+        return True
+
+    async def enforce(self, user_id: str, keep: Optional[str] = None) -> None:
+        """Trim `user_id` to its quota, then the heaviest users to the global limit; never drops `keep`."""
+        while len(self._users().get(user_id, {})) > self.per_user and await self._evict(user_id, keep):
+            self.quota_evictions += 1
+        while self.session_count() > self.total:
+            users = self._users()
+            heaviest = max(users, key=lambda name: len(users[name]))
+            if not await self._evict(heaviest, keep):
+                break
+            self.evictions += 1
+
+    def session_count(self) -> int:
+        return sum(len(sessions) for sessions in self._users().values())
+
+    def usage(self) -> Dict[str, int]:
+        """Sessions held per user."""
+        return {user_id: len(sessions) for user_id, sessions in self._users().items() if sessions}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": self.session_count(),
+            "users": len(self.usage()),
+            "per_user": self.per_user,
+            "total": self.total,
+            "quota_evictions": self.quota_evictions,
+            "evictions": self.evictions,
+        }
+
+
+__all__ = ["AGENT_SESSIONS_MAX", "AGENT_SESSIONS_PER_USER", "SessionQuota"]
@@ -0,0 +1,316 @@
+"""
+Per-user token-bucket rate limiting for the agent-backed endpoints.
+
+A bucket belongs to an authenticated API key (`X-API-Key` or a bearer token
+listed in `SESSION_CONTEXT_API_KEYS`) or, failing that, to the client address.
+`X-User-Id` and a request's own user id are never trusted for admission: they
+only name a sub-partition of server-side state under the key or address, so a
+client cannot get a fresh bucket by sending a new value. Buckets live in process
+memory by default; the SQLite backend lets several workers on one host share the
+same buckets.
+"""
+
+import abc
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("SESSION_CONTEXT_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BURST = float(os.getenv("SESSION_CONTEXT_RATE_LIMIT_BURST", "30"))
+RATE_LIMIT_REFILL_PER_SECOND = float(os.getenv("SESSION_CONTEXT_RATE_LIMIT_REFILL", "0.5"))
+RATE_LIMIT_BACKEND = os.getenv("SESSION_CONTEXT_RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv("SESSION_CONTEXT_RATE_LIMIT_SQLITE_PATH", "rate_limits.sqlite3")
+RATE_LIMIT_MAX_BUCKETS = 100_000
+# Seconds between sweeps of idle rows in the SQLite backend.
+RATE_LIMIT_PRUNE_INTERVAL_SECONDS = 60.0
+
+
+def _key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+# Digests of the accepted API keys; with none configured every client is keyed by address.
+API_KEY_DIGESTS = frozenset(
+    _key_digest(key.strip()) for key in os.getenv("SESSION_CONTEXT_API_KEYS", "").split(",") if key.strip()
+)
+
+
+class TokenBucketBackend(abc.ABC):
+    """
+    Storage for token buckets.
+
+    `acquire` atomically refills the bucket for `key`, takes `cost` tokens when
+    available and returns 0. Otherwise it returns the seconds until enough
+    tokens will have accumulated.
+    """
+
+    blocking = False
+
+    @abc.abstractmethod
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens from `key`'s bucket; returns 0 or the seconds to wait."""
+
+    @abc.abstractmethod
+    def size(self) -> int:
+        """Number of buckets currently stored."""
+
+
+def _take(tokens: float, capacity: float, refill_per_second: float, elapsed: float, cost: float) -> tuple:
+    """Refill then try to take `cost` tokens. Returns (remaining tokens, retry after)."""
+    tokens = min(capacity, tokens + max(0.0, elapsed) * refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    if refill_per_second <= 0:
+        return tokens, math.inf
+    return tokens, (cost - tokens) / refill_per_second
+
+
+class InMemoryBackend(TokenBucketBackend):
+    """Buckets held in a dict; idle buckets expire once they would be full again."""
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        idle_ttl = capacity / refill_per_second if refill_per_second > 0 else 0
+        # Values are (tokens, last refill time).
+        self._buckets: TTLCache[tuple] = TTLCache(max_entries=RATE_LIMIT_MAX_BUCKETS, ttl_seconds=idle_ttl)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, record=False) or (capacity, now)
+            tokens, retry_after = _take(tokens, capacity, refill_per_second, now - updated, cost)
+            self._buckets.set(key, (tokens, now))
+        return retry_after
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBackend(TokenBucketBackend):
+    """
+    Buckets stored in a SQLite file so multiple worker processes share them.
+
+    Args:
+        path (str): Database file; every worker must point at the same file.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_buckets: int = RATE_LIMIT_MAX_BUCKETS,
+        prune_interval: float = RATE_LIMIT_PRUNE_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_buckets = max_buckets
+        self.prune_interval = prune_interval
+        self.pruned = 0
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.time()
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, retry_after = _take(tokens, capacity, refill_per_second, now - updated, cost)
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        if now >= self._next_prune and self._prune_lock.acquire(blocking=False):
+            try:
+                self._next_prune = now + self.prune_interval
+                self.prune(capacity / refill_per_second if refill_per_second > 0 else 0.0, now)
+            finally:
+                self._prune_lock.release()
+        return retry_after
+
+    def prune(self, idle_seconds: float, now: Optional[float] = None) -> int:
+        """
+        Delete buckets idle long enough to be full again, then the oldest beyond `max_buckets`.
+
+        A missing bucket reads as a full one, so dropping a refilled bucket changes nothing.
+
+        Args:
+            idle_seconds (float): Time an empty bucket takes to refill completely.
+            now (float, optional): Current wall-clock time.
+
+        Returns:
+            int: Rows deleted.
+        """
+        now = time.time() if now is None else now
+        connection = self._connect()
+        deleted = connection.execute("DELETE FROM buckets WHERE updated < ?", (now - idle_seconds,)).rowcount
+        deleted += connection.execute(
+            "DELETE FROM buckets WHERE key IN (SELECT key FROM buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_buckets,),
+        ).rowcount
+        self.pruned += deleted
+        return deleted
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+def authenticated_key(request: HTTPConnection) -> Optional[str]:
+    """Digest of the request's API key when it is one of `SESSION_CONTEXT_API_KEYS`, else None."""
+    api_key = request.headers.get("x-api-key")
+    authorization = request.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+    if not api_key:
+        return None
+    digest = _key_digest(api_key)
+    return digest if digest in API_KEY_DIGESTS else None
+
+
+def rate_limit_key(request: HTTPConnection) -> str:
+    """The bucket a request is charged to: its authenticated API key, else its client address."""
+    digest = authenticated_key(request)
+    if digest is not None:
+        return "key:" + digest[:16]
+    return f"addr:{request.client.host if request.client else 'unknown'}"
+
+
+def client_identity(request: HTTPConnection, user_id: Optional[str] = None) -> str:
+    """
+    Derive the partition that owns a request's server-side state.
+
+    `X-User-Id` (or `user_id`) narrows the rate-limit key to one user behind it and
+    never replaces it, so state stays scoped to the caller that can be verified.
+    """
+    principal = rate_limit_key(request)
+    sub_user = request.headers.get("x-user-id") or user_id
+    return f"{principal}/user:{sub_user}" if sub_user else principal
+
+
+class RateLimiter:
+    """
+    Admission control for agent-backed endpoints.
+
+    Args:
+        backend (TokenBucketBackend): Bucket storage.
+        capacity (float): Burst size in requests.
+        refill_per_second (float): Sustained request rate per identity.
+        enabled (bool): When False every request is admitted.
+    """
+
+    def __init__(self, backend: TokenBucketBackend, capacity: float, refill_per_second: float, enabled: bool = True) -> None:
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.enabled = enabled
+        self.allowed = 0
+        self.limited = 0
+
+    async def check(self, request: HTTPConnection, cost: float = 1.0) -> None:
+        """
+        Take `cost` tokens for the caller.
+
+        Raises:
+            HTTPException: 429 with a `Retry-After` header when the bucket is empty.
+        """
+        if not self.enabled:
+            return
+        # A request costing more than the whole burst could never be admitted; it empties the bucket instead.
+        cost = min(cost, self.capacity)
+        identity = rate_limit_key(request)
+        try:
+            if self.backend.blocking:
+                retry_after = await asyncio.to_thread(
+                    self.backend.acquire, identity, self.capacity, self.refill_per_second, cost
+                )
+            else:
+                retry_after = self.backend.acquire(identity, self.capacity, self.refill_per_second, cost)
+        except Exception as exc:
+            # Fail open: a broken limiter must not take the service down.
+            logger.warning("Rate limiter backend failed, admitting request: %s", exc)
+            return
+
+        if retry_after <= 0:
+            self.allowed += 1
+            return
+
+        self.limited += 1
+        logger.info("Rate limited %s on %s (retry after %.1fs)", identity, request.url.path, retry_after)
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)) if math.isfinite(retry_after) else 3600)},
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "burst": self.capacity,
+            "refill_per_second": self.refill_per_second,
+            "buckets": self.backend.size(),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter configured through environment variables."""
+    if RATE_LIMIT_BACKEND == "sqlite":
+        backend: TokenBucketBackend = SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    else:
+        backend = InMemoryBackend(RATE_LIMIT_BURST, RATE_LIMIT_REFILL_PER_SECOND)
+    return RateLimiter(
+        backend=backend,
+        capacity=RATE_LIMIT_BURST,
+        refill_per_second=RATE_LIMIT_REFILL_PER_SECOND,
+        enabled=RATE_LIMIT_ENABLED,
+    )
+
+
+rate_limiter = create_rate_limiter()
+
+__all__ = [
+    "InMemoryBackend",
+    "RateLimiter",
+    "SQLiteBackend",
+    "TokenBucketBackend",
+    "authenticated_key",
+    "client_identity",
+    "create_rate_limiter",
+    "rate_limit_key",
+    "rate_limiter",
+]
@@ -0,0 +1,408 @@
+"""
+Opt-in traffic recording and replay support.
+
+When `SESSION_CONTEXT_RECORD_DIR` is set, every `/api/group`, `/api/label` and
+`/api/label/batch` request is written to a gzip-compressed JSONL file together
+with its response, the ADK event stream and each model call (with timing).
+URLs are replaced by salted hashes of their path segments before anything
+touches the disk. That includes the schemeless `host/path` and bare `/path`
+forms compact prompts use, which the coordinator copies verbatim into tool-call
+arguments.
+
+Page text is hashed too, unless `SESSION_CONTEXT_RECORD_RAW_TEXT` is set:
+titles, headings, descriptions, labels and summaries in request and response
+bodies, and the free text of prompts, model replies and tool calls. A model
+reply that is JSON keeps its structure, with only its text fields hashed, so
+replayed decisions still parse. Equal texts hash equally, so duplicates stay
+recognisable in a recording.
+
+When `SESSION_CONTEXT_REPLAY_FILE` is set, agents use a replayed model instead
+of the provider: requests tagged with `X-Replay-Id` are answered with the model
+responses recorded for that request, paced by `SESSION_CONTEXT_REPLAY_SPEED`.
+"""
+
+import contextvars
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+RECORD_DIR = os.getenv("SESSION_CONTEXT_RECORD_DIR") or None
+RECORD_SALT = os.getenv("SESSION_CONTEXT_RECORD_SALT") or os.urandom(16).hex()
+RECORD_RAW_TEXT = os.getenv("SESSION_CONTEXT_RECORD_RAW_TEXT", "false").lower() in ("1", "true", "yes")
+REPLAY_FILE = os.getenv("SESSION_CONTEXT_REPLAY_FILE") or None
+REPLAY_SPEED = float(os.getenv("SESSION_CONTEXT_REPLAY_SPEED", "1.0"))
+RECORDED_PATHS = {"/api/group", "/api/label", "/api/label/batch"}
+REPLAY_ID_HEADER = b"x-replay-id"
+
+URL_PATTERN = re.compile(r"\b[a-z][a-z0-9+.-]*://[^\s\"'<>()\[\]]+", re.IGNORECASE)
+# `host/path` as printed by compact prompt rows (no scheme); a bare host is left alone.
+HOST_PATH_PATTERN = re.compile(
+    r"(?<![\w@/.:-])((?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z]{2,63})(/[^\s|\"'<>()\[\]]+)", re.IGNORECASE
+)
+# `/path` as printed by compact rows of a session whose header already names the host.
+PATH_PATTERN = re.compile(r"(?:^|(?<=[\s|]))(/[^\s|\"'<>()\[\]]+)", re.MULTILINE)
+
+# Body fields that carry page or session text.
+TEXT_FIELDS = {
+    "title", "h1", "h2", "metaDescription", "description", "summary", "label", "updatedLabel", "suggestedLabel", "reason"
+}
+# Fields of ADK events and model responses whose strings are free text: content parts and tool calls.
+FREE_TEXT_FIELDS = {"text", "args", "response"}
+# Values inside free text that replay needs verbatim: decisions, session handles and identifiers.
+STRUCTURAL_FIELDS = {"action", "sessionId", "id", "type", "name", "source"}
+
+
+def _digest(value: str, salt: str) -> str:
+    return hashlib.sha256(f"{salt}:{value}".encode("utf-8")).hexdigest()[:10]
+
+
+def hash_path(path: str, salt: str = RECORD_SALT) -> str:
+    """Replace each segment of a URL path with a short salted hash."""
+    return "/" + "/".join(_digest(segment, salt) for segment in path.split("/") if segment)
+
+
+def hash_url(url: str, salt: str = RECORD_SALT) -> str:
+    """Keep scheme and host, replace each path segment and the query with a short salted hash."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return f"urlhash://{_digest(url, salt)}"
+    hashed = f"{parts.scheme}://{parts.netloc}" + hash_path(parts.path, salt)
+    if parts.query:
+        hashed += f"?q={_digest(parts.query, salt)}"
+    return hashed
+
+
+def scrub_text(text: str) -> str:
+    """Hash full URLs, then the schemeless `host/path` and `/path` forms of compact prompts."""
+    text = URL_PATTERN.sub(lambda match: hash_url(match.group(0)), text)
+    text = HOST_PATH_PATTERN.sub(lambda match: match.group(1) + hash_path(match.group(2)), text)
+    return PATH_PATTERN.sub(lambda match: hash_path(match.group(1)), text)
+
+
+def hash_text(text: str, salt: str = RECORD_SALT) -> str:
+    """Replace page text with a short salted hash."""
+    return f"text:{_digest(text, salt)}"
+
+
+def _hash_strings(value: Any) -> Any:
+    if isinstance(value, str):
+        return hash_text(value) if value else value
+    if isinstance(value, list):
+        return [_hash_strings(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _hash_strings(item) for key, item in value.items()}
+    return value
+
+
+def _redact_free_text(value: Any, key: Optional[str] = None) -> Any:
+    """Hash free text; a JSON object inside a string keeps its structure so replayed replies still parse."""
+    if isinstance(value, str):
+        if key in STRUCTURAL_FIELDS:
+            return value
+        start, end = value.find("{"), value.rfind("}")
+        if start != -1 and end > start:
+            try:
+                parsed = json.loads(value[start : end + 1])
+            except ValueError:
+                pass
+            else:
+                # Prose around the object (model reasoning, code fences) is hashed on its own.
+                before, after = value[:start].strip(), value[end + 1 :].strip()
+                parts = [hash_text(before)] if before else []
+                parts.append(json.dumps(_redact_free_text(parsed), ensure_ascii=False))
+                if after:
+                    parts.append(hash_text(after))
+                return "\n".join(parts)
+        return hash_text(value) if value else value
+    if isinstance(value, list):
+        return [_redact_free_text(item, key) for item in value]
+    if isinstance(value, dict):
+        # Structured replies and tool arguments: keep keys and structural values, hash the rest.
+        return {name: _redact_free_text(item, name) for name, item in value.items()}
+    return value
+
+
+def redact_text(value: Any) -> Any:
+    """Recursively hash page text: `TEXT_FIELDS` values and the free text of `FREE_TEXT_FIELDS`."""
+    if isinstance(value, list):
+        return [redact_text(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    redacted: Dict[str, Any] = {}
+    for key, item in value.items():
+        if key in TEXT_FIELDS:
+            redacted[key] = _hash_strings(item)
+        elif key in FREE_TEXT_FIELDS:
+            redacted[key] = _redact_free_text(item)
+        else:
+            redacted[key] = redact_text(item)
+    return redacted
+
+
+def scrub(value: Any) -> Any:
+    """Recursively replace every URL inside strings, lists and dicts."""
+    if isinstance(value, str):
+        return scrub_text(value)
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    if isinstance(value, dict):
+        return {key: scrub(item) for key, item in value.items()}
+    return value
+
+
+def _dump(model: Any) -> Any:
+    if hasattr(model, "model_dump"):
+        return model.model_dump(mode="json", exclude_none=True)
+    return model
+
+
+class TrafficRecord:
+    """Everything captured for one request while it is in flight."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.id = str(uuid4())
+        self.endpoint = endpoint
+        self.started_at = time.time()
+        self.events: List[Any] = []
+        self.model_calls: List[Dict[str, Any]] = []
+
+
+_current_record: contextvars.ContextVar[Optional[TrafficRecord]] = contextvars.ContextVar(
+    "session_context_traffic_record", default=None
+)
+
+
+class TrafficRecorder:
+    """
+    Appends scrubbed request records to `traffic-<timestamp>-<pid>.jsonl.gz`.
+
+    Args:
+        directory (str, optional): Output directory; recording is disabled when None.
+        raw_text (bool): Keep page text instead of hashing it (URLs are hashed regardless).
+    """
+
+    def __init__(self, directory: Optional[str], raw_text: bool = False) -> None:
+        self.directory = directory
+        self.raw_text = raw_text
+        self.path: Optional[str] = None
+        self.recorded = 0
+        self._handle: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _open(self) -> Any:
+        if self._handle is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"traffic-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl.gz"
+            self.path = os.path.join(self.directory, name)
+            self._handle = gzip.open(self.path, "at", encoding="utf-8")
+            logger.info("Recording traffic to %s", self.path)
+        return self._handle
+
+    def begin(self, endpoint: str) -> TrafficRecord:
+        record = TrafficRecord(endpoint)
+        _current_record.set(record)
+        return record
+
+    @staticmethod
+    def current() -> Optional[TrafficRecord]:
+        return _current_record.get()
+
+    def add_event(self, event: Any) -> None:
+        record = _current_record.get()
+        if record is not None:
+            record.events.append(_dump(event))
+
+    def add_model_call(self, agent_name: str, latency_ms: List[float], responses: List[Any], error: Optional[str] = None) -> None:
+        record = _current_record.get()
+        if record is not None:
+            call: Dict[str, Any] = {
+                "agent": agent_name,
+                "latency_ms": [round(value, 1) for value in latency_ms],
+                "responses": [_dump(response) for response in responses],
+            }
+            if error:
+                call["error"] = error
+            record.model_calls.append(call)
+
+    def finish(self, record: TrafficRecord, request_body: bytes, status: int, response_body: bytes) -> None:
+        """Scrub and append a finished record."""
+
+        def decode(body: bytes) -> Any:
+            try:
+                return json.loads(body) if body else None
+            except ValueError:
+                return None
+
+        captured = {
+            "request": decode(request_body),
+            "response": decode(response_body),
+            "events": record.events,
+            "model_calls": record.model_calls,
+        }
+        if not self.raw_text:
+            # Part by part: the top-level "response" is a body, not a tool result.
+            captured = {name: redact_text(part) for name, part in captured.items()}
+        line = {
+            "id": record.id,
+            "endpoint": record.endpoint,
+            "ts": record.started_at,
+            "duration_ms": round((time.time() - record.started_at) * 1000, 1),
+            "status": status,
+            # Only captured traffic is scrubbed; the endpoint path above must stay readable.
+            **scrub(captured),
+        }
+        text = json.dumps(line, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                handle = self._open()
+                handle.write(text + "\n")
+                handle.flush()
+                self.recorded += 1
+            except OSError as exc:
+                logger.warning("Failed to write traffic record: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "raw_text": self.raw_text, "recorded": self.recorded, "path": self.path}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a (optionally gzip-compressed) JSONL recording."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayStore:
+    """Recorded model responses indexed by record ID and agent name."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self._calls: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        if path:
+            for record in read_records(path):
+                by_agent: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+                for call in record.get("model_calls", []):
+                    by_agent[call["agent"]].append(call)
+                self._calls[record["id"]] = dict(by_agent)
+            logger.info("Loaded %s recorded requests for replay from %s", len(self._calls), path)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def cursor(self, record_id: str) -> Optional[Dict[str, Deque[Dict[str, Any]]]]:
+        calls = self._calls.get(record_id)
+        if calls is None:
+            return None
+        return {agent: deque(agent_calls) for agent, agent_calls in calls.items()}
+
+
+_replay_cursor: contextvars.ContextVar[Optional[Dict[str, Deque[Dict[str, Any]]]]] = contextvars.ContextVar(
+    "session_context_replay_cursor", default=None
+)
+
+
+def next_replayed_call(agent_name: str) -> Optional[Dict[str, Any]]:
+    """Pop the next recorded model call for `agent_name` in the current request."""
+    cursor = _replay_cursor.get()
+    if not cursor or not cursor.get(agent_name):
+        return None
+    return cursor[agent_name].popleft()
+
+
+class TrafficMiddleware:
+    """
+    ASGI middleware that captures recorded endpoints and binds replay cursors.
+
+    Works at the ASGI layer so the request and response bodies are seen exactly
+    as sent, and so the per-request context is visible to the agent run.
+    """
+
+    def __init__(self, app: Any, recorder: "TrafficRecorder", replay: "ReplayStore") -> None:
+        self.app = app
+        self.recorder = recorder
+        self.replay = replay
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] not in RECORDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if self.replay.enabled:
+            replay_id = dict(scope["headers"]).get(REPLAY_ID_HEADER)
+            _replay_cursor.set(self.replay.cursor(replay_id.decode("latin-1")) if replay_id else None)
+
+        if not self.recorder.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        record = self.recorder.begin(scope["path"])
+        request_chunks: List[bytes] = []
+        response_chunks: List[bytes] = []
+        status = 500
+
+        async def recording_receive() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_chunks.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            self.recorder.finish(record, b"".join(request_chunks), status, b"".join(response_chunks))
+
+
+traffic_recorder = TrafficRecorder(RECORD_DIR, raw_text=RECORD_RAW_TEXT)
+replay_store = ReplayStore(REPLAY_FILE)
+
+__all__ = [
+    "REPLAY_SPEED",
+    "ReplayStore",
+    "TrafficMiddleware",
+    "TrafficRecorder",
+    "hash_path",
+    "hash_text",
+    "hash_url",
+    "next_replayed_call",
+    "read_records",
+    "redact_text",
+    "replay_store",
+    "scrub",
+    "traffic_recorder",
+]
@@ -0,0 +1,117 @@
+"""
+Difficulty-based model routing for grouping requests.
+
+Easy grouping decisions (few candidate sessions, one clearly best lexical
+match or none at all, well-described tabs) are served by the small model
+tier; ambiguous ones go to the large tier.
+"""
+
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .metrics import LatencyStats
+from .schemas import TabInfo
+
+logger = logging.getLogger(__name__)
+
+MODEL_ROUTING_ENABLED = os.getenv("SESSION_CONTEXT_MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+MODEL_ROUTING_THRESHOLD = float(os.getenv("SESSION_CONTEXT_MODEL_ROUTING_THRESHOLD", "0.5"))
+
+SMALL_TIER = "small"
+LARGE_TIER = "large"
+
+# Candidate count at which the count signal saturates.
+CANDIDATE_SATURATION = 20
+# Best similarity below which the tab is clearly unrelated to every session.
+UNRELATED_SIMILARITY = 0.05
+# Margin between the two best candidates that counts as unambiguous.
+CLEAR_MARGIN = 0.3
+
+
+@dataclass
+class RouteDecision:
+    """Chosen tier plus the signals that produced it."""
+
+    tier: str
+    score: float
+    signals: Dict[str, float] = field(default_factory=dict)
+
+
+def content_sparsity(tab: TabInfo) -> float:
+    """0 for a richly described tab, 1 for a bare URL."""
+    missing = 0.0
+    if not tab.title or tab.title == "Untitled" or len(tab.title) < 12:
+        missing += 1
+    content = tab.content
+    if not content or not content.h1:
+        missing += 1
+    if not content or not content.metaDescription:
+        missing += 1
+    if not content or not content.h2:
+        missing += 0.5
+    return missing / 3.5
+
+
+class ModelRouter:
+    """
+    Scores grouping difficulty from local signals and picks a model tier.
+
+    Args:
+        threshold (float): Scores at or above this go to the large tier.
+        enabled (bool): When False every request uses the large tier.
+    """
+
+    def __init__(self, threshold: float, enabled: bool = True) -> None:
+        self.threshold = threshold
+        self.enabled = enabled
+        self.tiers: Dict[str, LatencyStats] = {SMALL_TIER: LatencyStats(), LARGE_TIER: LatencyStats()}
+
+    def route(self, new_tab: TabInfo, similarities: List[float]) -> RouteDecision:
+        """
+        Decide the tier for a grouping request.
+
+        Args:
+            new_tab (TabInfo): The tab being classified.
+            similarities (list): Lexical similarity of the tab to each existing session.
+        """
+        ranked = sorted(similarities, reverse=True)
+        count_signal = min(1.0, math.log1p(len(ranked)) / math.log1p(CANDIDATE_SATURATION))
+        if not ranked or ranked[0] < UNRELATED_SIMILARITY:
+            ambiguity = 0.0
+        else:
+            margin = ranked[0] - (ranked[1] if len(ranked) > 1 else 0.0)
+            ambiguity = max(0.0, 1.0 - margin / CLEAR_MARGIN)
+        sparsity = content_sparsity(new_tab)
+
+        score = 0.3 * count_signal + 0.5 * ambiguity + 0.2 * sparsity
+        tier = LARGE_TIER if not self.enabled or score >= self.threshold else SMALL_TIER
+        decision = RouteDecision(
+            tier=tier,
+            score=round(score, 3),
+            signals={
+                "candidates": len(ranked),
+                "top_similarity": round(ranked[0], 3) if ranked else 0.0,
+                "ambiguity": round(ambiguity, 3),
+                "sparsity": round(sparsity, 3),
+            },
+        )
+        logger.info("Routing grouping request to %s tier: score=%s signals=%s", tier, decision.score, decision.signals)
+        return decision
+
+    def record(self, tier: str, elapsed_ms: float, error: bool = False) -> None:
+        self.tiers[tier].record(elapsed_ms, error=error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "tiers": {tier: stats.snapshot() for tier, stats in self.tiers.items()},
+        }
+
+
+model_router = ModelRouter(threshold=MODEL_ROUTING_THRESHOLD, enabled=MODEL_ROUTING_ENABLED)
+
+__all__ = ["LARGE_TIER", "SMALL_TIER", "ModelRouter", "RouteDecision", "model_router"]
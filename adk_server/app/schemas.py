@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Literal, Optional, Union
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class AgentRequest(BaseModel):
@@ -52,15 +52,47 @@ class TabInfo(BaseModel):
 
     url: str = Field(..., description="Tab URL")
     title: Optional[str] = Field(default=None, description="Tab title")
+    ts: Optional[float] = Field(default=None, description="Capture time (epoch milliseconds)")
     content: Optional[TabContent] = Field(default=None, description="Extracted content")
 
 
+class SessionTab(BaseModel):
+    """
+    Tab stored inside an existing session.
+
+    `existingSessions` can carry thousands of tabs whose extracted content is
+    rarely read, so `content` is kept as the raw decoded value and only
+    validated into a `TabContent` when `get_content()` is called.
+    """
+
+    url: str = Field(..., description="Tab URL")
+    title: Optional[str] = Field(default=None, description="Tab title")
+    ts: Optional[float] = Field(default=None, description="Capture time (epoch milliseconds)")
+    content: Optional[Any] = Field(default=None, description="Extracted content (validated lazily)")
+
+    _parsed_content: Optional[TabContent] = PrivateAttr(default=None)
+
+    def get_content(self) -> Optional[TabContent]:
+        """Validate and cache the extracted content, ignoring malformed payloads."""
+        if self._parsed_content is None and self.content:
+            if isinstance(self.content, TabContent):
+                self._parsed_content = self.content
+            else:
+                try:
+                    self._parsed_content = TabContent.model_validate(self.content)
+                except ValueError:
+                    return None
+        return self._parsed_content
+
+
 class ExistingSession(BaseModel):
     """Representation of an existing browsing session."""
 
     id: str = Field(..., description="Unique session identifier")
     label: Optional[str] = Field(default=None, description="Session label")
-    tabList: List[TabInfo] = Field(default_factory=list, description="List of tabs in this session")
+    startTs: Optional[float] = Field(default=None, description="Session start time (epoch milliseconds)")
+    endTs: Optional[float] = Field(default=None, description="Session end time (epoch milliseconds)")
+    tabList: List[SessionTab] = Field(default_factory=list, description="List of tabs in this session")
 
 
 class GroupingRequest(BaseModel):
@@ -108,6 +140,30 @@ class GroupingResponse(BaseModel):
     reason: Optional[str] = Field(default=None, description="Explanation for the decision (e.g., duplicate tab detected)")
 
 
+class TabEventRequest(GroupingRequest):
+    """
+    A navigation event for one browser tab.
+
+    Events for the same `tabId` that arrive within the debounce window replace
+    each other; only the settled URL is classified.
+    """
+
+    tabId: Union[int, str] = Field(..., description="Browser tab ID the event belongs to")
+
+
+class TabEventStatus(BaseModel):
+    """
+    State of a submitted tab event.
+    """
+
+    eventId: str = Field(..., description="Identifier to poll with")
+    tabId: Union[int, str] = Field(..., description="Browser tab ID")
+    status: Literal["pending", "running", "done", "superseded", "failed"] = Field(..., description="Processing state")
+    supersededBy: Optional[str] = Field(default=None, description="Newer event that replaced this one")
+    decision: Optional[GroupingResponse] = Field(default=None, description="Grouping decision once done")
+    detail: Optional[str] = Field(default=None, description="Error detail when failed")
+
+
 # ----- Output Schema for Matcher Agent -----
 
 
@@ -117,7 +173,7 @@ class SessionMatchOutput(BaseModel):
     """
 
     action: Literal["merge", "create_new", "no_action"] = Field(..., description="Whether to merge, create new, or skip")
-    sessionId: Optional[str] = Field(default=None, description="Session ID if merging")
+    sessionId: Optional[str] = Field(default=None, description="Session handle (e.g. S2) if merging")
     updatedLabel: Optional[str] = Field(default=None, description="Updated label if merging")
     label: Optional[str] = Field(default=None, description="Alias for updated label if merging")
     suggestedLabel: Optional[str] = Field(default=None, description="Suggested label if creating new")
@@ -133,6 +189,10 @@ class LabelRequest(BaseModel):
     """
 
     tabList: List[TabInfo] = Field(..., description="List of tabs in the session", min_length=1)
+    mode: Literal["fast", "quality"] = Field(
+        default="quality",
+        description="`fast` labels locally and uses the agent only when unsure; `quality` always uses the agent",
+    )
 
 
 class LabelResponse(BaseModel):
@@ -141,4 +201,47 @@ class LabelResponse(BaseModel):
     """
 
     label: str = Field(..., description="Generated session label")
+    source: Optional[Literal["extractive", "agent"]] = Field(default=None, description="Where the label came from")
+    confidence: Optional[float] = Field(default=None, description="Extractive label confidence (0-1)")
+
+
+
+class LabelBatchItem(BaseModel):
+    """
+    One session to label in a batch.
+    """
+
+    id: str = Field(..., description="Caller-supplied identifier the label is returned under")
+    tabList: List[TabInfo] = Field(default_factory=list, description="List of tabs in the session")
+
+
+class LabelBatchRequest(BaseModel):
+    """
+    Request payload for labeling many sessions at once.
+    """
+
+    items: List[LabelBatchItem] = Field(..., description="Sessions to label; IDs must be unique", min_length=1)
+    mode: Literal["fast", "quality"] = Field(
+        default="quality",
+        description="`fast` labels locally and uses the agent only when unsure; `quality` always uses the agent",
+    )
+
+
+class LabelBatchResult(BaseModel):
+    """
+    Outcome for one batch item: a label, or the error that item hit.
+    """
+
+    label: Optional[str] = Field(default=None, description="Generated session label")
+    source: Optional[Literal["extractive", "agent"]] = Field(default=None, description="Where the label came from")
+    confidence: Optional[float] = Field(default=None, description="Extractive label confidence (0-1)")
+    error: Optional[str] = Field(default=None, description="Why this item has no label")
+
+
+class LabelBatchResponse(BaseModel):
+    """
+    Response payload for batch labeling.
+    """
 
+    labels: Dict[str, LabelBatchResult] = Field(..., description="Results keyed by item ID")
+    modelCalls: int = Field(default=0, description="Labeler model calls made for the batch")
@@ -0,0 +1,342 @@
+"""
+Warm-restart snapshots of the server's in-process state.
+
+Every restart used to start cold: no cached summaries, topic profiles, session
+indexes or `/agent/run` conversations, so the first minutes after a deploy paid
+full model latency for everything. With `SESSION_CONTEXT_SNAPSHOT_PATH` set,
+registered components are written to a local file every
+`SESSION_CONTEXT_SNAPSHOT_INTERVAL` seconds and once more on graceful shutdown.
+
+The file is JSON lines: a header with the creation time and per-component
+record counts, then one `[component, record]` line per record. Records are
+collected on the event loop, then encoded and written in a worker thread (to
+a temporary file that atomically replaces the previous snapshot).
+
+On startup the snapshot is restored in the background, so the server accepts
+requests immediately. A worker thread reads and decodes the file in chunks,
+and each chunk is applied on the event loop between requests. State created by
+requests while the restore is running wins over restored records for the same
+key. Snapshots older than `SESSION_CONTEXT_SNAPSHOT_MAX_AGE` seconds are
+ignored.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from google.adk.sessions import InMemorySessionService, Session
+
+from .wire import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = os.getenv("SESSION_CONTEXT_SNAPSHOT_PATH") or None
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SESSION_CONTEXT_SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SESSION_CONTEXT_SNAPSHOT_MAX_AGE", str(24 * 60 * 60)))
+
+SNAPSHOT_VERSION = 1
+# Lines decoded per worker-thread hop while restoring.
+RESTORE_CHUNK_LINES = 1000
+
+
+@dataclass
+class SnapshotComponent:
+    """A piece of state that can be dumped to records and restored from them."""
+
+    name: str
+    dump: Callable[[], Iterable[Any]]
+    restore: Callable[[List[Any]], int]
+    # Dumps guarded by their own locks run in the writer thread instead of on the event loop.
+    threadsafe: bool = False
+
+
+def session_service_records(service: InMemorySessionService, app_name: str, skip_prefixes: Sequence[str] = ()) -> List[list]:
+    """
+    Sessions, user state and app state of one app of an in-memory session service.
+
+    Returns:
+        list: `["session", session]`, `["user_state", user_id, state]` and `["app_state", state]` records.
+    """
+    skip = tuple(skip_prefixes)
+    records: List[list] = []
+    for sessions in service.sessions.get(app_name, {}).values():
+        for session_id, session in sessions.items():
+            if not session_id.startswith(skip):
+                records.append(["session", session.model_dump(mode="json")])
+    for user_id, state in service.user_state.get(app_name, {}).items():
+        records.append(["user_state", user_id, state])
+    if service.app_state.get(app_name):
+        records.append(["app_state", service.app_state[app_name]])
+    return records
+
+
+def restore_session_service(service: InMemorySessionService, app_name: str, records: List[list]) -> int:
+    """Put persisted sessions back into `service`; sessions created since startup are kept. Returns sessions added."""
+    # InMemorySessionService has no import API, so this writes to the dicts it keeps
+    # its sessions and scoped state in (`sessions`, `user_state`, `app_state`).
+    restored = 0
+    for record in records:
+        kind = record[0]
+        if kind == "session":
+            session = Session.model_validate(record[1])
+            sessions = service.sessions.setdefault(app_name, {}).setdefault(session.user_id, {})
+            if session.id not in sessions:
+                sessions[session.id] = session
+                restored += 1
+        elif kind == "user_state":
+            state = service.user_state.setdefault(app_name, {}).setdefault(record[1], {})
+            for key, value in record[2].items():
+                state.setdefault(key, value)
+        elif kind == "app_state":
+            state = service.app_state.setdefault(app_name, {})
+            for key, value in record[1].items():
+                state.setdefault(key, value)
+    return restored
+
+
+def _read_chunk(handle: IO[bytes]) -> Tuple[List[Any], Optional[ValueError]]:
+    """Decode the next lines; on a corrupt line, those before it and the error."""
+    records: List[Any] = []
+    for line in islice(handle, RESTORE_CHUNK_LINES):
+        if line.strip():
+            try:
+                records.append(loads(line))
+            except ValueError as exc:
+                return records, exc
+    return records, None
+
+
+def _collect(components: Iterable[SnapshotComponent]) -> List[Tuple[str, List[Any]]]:
+    records: List[Tuple[str, List[Any]]] = []
+    for component in components:
+        try:
+            records.append((component.name, list(component.dump())))
+        except Exception:
+            logger.exception("Failed to snapshot %s", component.name)
+    return records
+
+
+def _write_snapshot(
+    path: str,
+    created_at: float,
+    records: List[Tuple[str, List[Any]]],
+    threadsafe: Sequence[SnapshotComponent],
+) -> Tuple[Dict[str, int], int]:
+    records = records + _collect(threadsafe)
+    counts = {name: len(items) for name, items in records}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(dumps({"snapshot": SNAPSHOT_VERSION, "created_at": created_at, "components": counts}) + b"\n")
+        for name, items in records:
+            for record in items:
+                handle.write(dumps([name, record]) + b"\n")
+    os.replace(tmp_path, path)
+    return counts, os.path.getsize(path)
+
+
+class SnapshotManager:
+    """
+    Periodic and shutdown snapshots of registered components, restored on startup.
+
+    Args:
+        path (str, optional): Snapshot file; snapshots are disabled when unset.
+        interval_seconds (float): Time between periodic snapshots; `0` only snapshots on shutdown.
+        max_age_seconds (float): Snapshots older than this are not restored.
+    """
+
+    def __init__(self, path: Optional[str], interval_seconds: float, max_age_seconds: float) -> None:
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.max_age_seconds = max_age_seconds
+        self._components: "OrderedDict[str, SnapshotComponent]" = OrderedDict()
+        self._save_lock = asyncio.Lock()
+        self._restore_task: Optional["asyncio.Task[None]"] = None
+        self._periodic_task: Optional["asyncio.Task[None]"] = None
+        self.restored = False
+        self.restore_stats: Dict[str, Any] = {}
+        self.saves = 0
+        self.save_failures = 0
+        self.last_save: Dict[str, Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def register(
+        self,
+        name: str,
+        dump: Callable[[], Iterable[Any]],
+        restore: Callable[[List[Any]], int],
+        threadsafe: bool = False,
+    ) -> None:
+        """
+        Snapshot `dump()` records under `name`; `restore(records)` applies them and returns how many were added.
+
+        Args:
+            threadsafe (bool): `dump` may run in a worker thread while requests mutate the state.
+        """
+        self._components[name] = SnapshotComponent(name, dump, restore, threadsafe)
+
+    def start(self) -> None:
+        """Begin restoring the last snapshot and schedule periodic snapshots (call from the running loop)."""
+        if not self.enabled:
+            return
+        self._restore_task = asyncio.create_task(self._restore())
+        if self.interval_seconds > 0:
+            self._periodic_task = asyncio.create_task(self._periodic())
+
+    async def wait_restored(self) -> None:
+        if self._restore_task is not None:
+            await asyncio.shield(self._restore_task)
+
+    async def _periodic(self) -> None:
+        # Never overwrite the previous snapshot with a half-restored state.
+        await self.wait_restored()
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.save()
+
+    async def save(self) -> Dict[str, Any]:
+        """Write a snapshot of every registered component."""
+        if not self.enabled:
+            return {}
+        if self._restore_task is not None and not self.restored:
+            # The restore is still running or was cancelled; saving now would replace the
+            # previous snapshot with a partial copy of it.
+            logger.warning("Not writing a snapshot: the previous one was not fully restored")
+            return {}
+        async with self._save_lock:
+            started = time.perf_counter()
+            created_at = time.time()
+            # Only state without its own locking is copied on the event loop.
+            records = _collect(component for component in self._components.values() if not component.threadsafe)
+            collected_ms = (time.perf_counter() - started) * 1000
+            threadsafe = [component for component in self._components.values() if component.threadsafe]
+            try:
+                counts, size = await asyncio.to_thread(_write_snapshot, self.path, created_at, records, threadsafe)  # type: ignore[arg-type]
+            except (OSError, TypeError, ValueError) as exc:
+                self.save_failures += 1
+                logger.warning("Failed to write snapshot to %s: %s", self.path, exc)
+                return {}
+            self.saves += 1
+            self.last_save = {
+                "created_at": created_at,
+                "records": counts,
+                "bytes": size,
+                "loop_ms": round(collected_ms, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            logger.info("Wrote snapshot to %s: %s", self.path, self.last_save)
+            return self.last_save
+
+    async def _restore(self) -> None:
+        started = time.perf_counter()
+        restored: Dict[str, int] = defaultdict(int)
+        try:
+            handle = open(self.path, "rb")  # type: ignore[arg-type]
+        except FileNotFoundError:
+            self.restored = True
+            return
+        except OSError as exc:
+            # Nothing can be restored; the next save replaces the file if it can.
+            logger.warning("Failed to open snapshot %s; starting cold: %s", self.path, exc)
+            self.restored = True
+            return
+        try:
+            header = await asyncio.to_thread(handle.readline)
+            try:
+                meta = loads(header)
+            except ValueError:
+                meta = None
+            if not isinstance(meta, dict) or meta.get("snapshot") != SNAPSHOT_VERSION:
+                self._set_aside()
+                self.restored = True
+                return
+            age = time.time() - float(meta.get("created_at", 0))
+            if self.max_age_seconds and age > self.max_age_seconds:
+                logger.info("Ignoring snapshot %s: %.0fs old", self.path, age)
+                self.restored = True
+                return
+            while True:
+                lines, error = await asyncio.to_thread(_read_chunk, handle)
+                if not lines and error is None:
+                    break
+                grouped: Dict[str, List[Any]] = defaultdict(list)
+                for name, record in lines:
+                    grouped[name].append(record)
+                for name, records in grouped.items():
+                    component = self._components.get(name)
+                    if component is None:
+                        continue
+                    try:
+                        restored[name] += component.restore(records)
+                    except Exception:
+                        logger.exception("Failed to restore %s records from snapshot", name)
+                if error is not None:
+                    raise error
+                # Let requests run between chunks.
+                await asyncio.sleep(0)
+            self.restored = True
+        except (TypeError, ValueError) as exc:
+            logger.warning("Snapshot %s is truncated or corrupt; restored what preceded the error: %s", self.path, exc)
+            self.restored = True
+        finally:
+            handle.close()
+            self.restore_stats = {
+                "records": dict(restored),
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            if restored:
+                logger.info("Restored snapshot from %s: %s", self.path, self.restore_stats)
+
+    def _set_aside(self) -> None:
+        """Keep an unusable snapshot (unknown version or not a snapshot) next to the path for inspection."""
+        aside = f"{self.path}.unusable"
+        try:
+            os.replace(self.path, aside)  # type: ignore[arg-type]
+            logger.warning("Ignoring snapshot %s: unknown format; moved it to %s", self.path, aside)
+        except OSError as exc:
+            logger.warning("Ignoring snapshot %s: unknown format (could not move it aside: %s)", self.path, exc)
+
+    async def close(self) -> None:
+        """Stop background work and write a final snapshot (called on shutdown)."""
+        for task in (self._periodic_task, self._restore_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval_s": self.interval_seconds,
+            "components": list(self._components),
+            "restoring": self._restore_task is not None and not self._restore_task.done(),
+            "restored": self.restore_stats,
+            "saves": self.saves,
+            "save_failures": self.save_failures,
+            "last_save": self.last_save,
+        }
+
+
+snapshot_manager = SnapshotManager(
+    path=SNAPSHOT_PATH,
+    interval_seconds=SNAPSHOT_INTERVAL_SECONDS,
+    max_age_seconds=SNAPSHOT_MAX_AGE_SECONDS,
+)
+
+__all__ = [
+    "SnapshotManager",
+    "restore_session_service",
+    "session_service_records",
+    "snapshot_manager",
+]
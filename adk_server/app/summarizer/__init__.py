@@ -3,6 +3,26 @@ Summarizer agent module - Analyzes tab content and produces summaries.
 """
 
 from .agent import create_summarizer_agent
+from .cache import (
+    SUMMARY_CACHE_PARTITION_STATE_KEY,
+    SUMMARY_CACHE_STATE_KEY,
+    SummaryCache,
+    summary_cache,
+    summary_cache_key,
+)
+from .domains import DOMAIN_STATE_KEY, DomainKnowledge, domain_knowledge
+from .prompt import build_summary_message
 
-__all__ = ["create_summarizer_agent"]
+__all__ = [
+    "DOMAIN_STATE_KEY",
+    "DomainKnowledge",
+    "SUMMARY_CACHE_PARTITION_STATE_KEY",
+    "SUMMARY_CACHE_STATE_KEY",
+    "SummaryCache",
+    "build_summary_message",
+    "create_summarizer_agent",
+    "domain_knowledge",
+    "summary_cache",
+    "summary_cache_key",
+]
 
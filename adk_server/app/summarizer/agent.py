@@ -7,9 +7,12 @@ import os
 from typing import Optional
 
 from google.adk.agents import LlmAgent
-from google.adk.models.lite_llm import LiteLlm
 
 from ..base_agent.tools import web_search, get_current_datetime
+from ..models import create_model
+from ..tracing import tracer
+from ..usage import prompt_usage
+from .domains import domain_knowledge
 from .prompt import SUMMARIZER_INSTRUCTION
 
 logger = logging.getLogger(__name__)
@@ -36,10 +39,15 @@ def create_summarizer_agent(api_key: Optional[str] = None, model: Optional[str]
 
     agent = LlmAgent(
         name="summarizer_agent",
-        model=LiteLlm(model=model, api_key=api_key),
+        model=create_model(model, api_key, agent_name="summarizer_agent"),
         description="Analyzes current tab information and produces a structured summary with web search support.",
         instruction=SUMMARIZER_INSTRUCTION,
         tools=[web_search, get_current_datetime],
+        # Known sites answer `web_search` from the local domain table instead of Serper.
+        before_tool_callback=[tracer.before_tool_callback, domain_knowledge.before_tool_callback],
+        after_tool_callback=[domain_knowledge.after_tool_callback, tracer.after_tool_callback],
+        before_model_callback=tracer.before_model_callback,
+        after_model_callback=[prompt_usage.after_model_callback, tracer.after_model_callback],
     )
 
     logger.info("Summarizer agent created successfully")
@@ -0,0 +1,234 @@
+"""
+Summary cache - Reuses summarizer output for tabs that were summarized recently.
+
+Entries are keyed by the canonical URL plus a hash of the tab's title and
+extracted content, so a page whose content changed is summarized again. The
+cache plugs into the coordinator through ADK tool callbacks: a hit answers the
+`summarizer_agent` tool call directly and a miss stores the fresh summary.
+
+The cache is partitioned by user: each user has an entry and byte quota, and
+when the whole cache is full the heaviest user loses entries first.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from ..cache import PartitionedCache, TTLCache
+from ..schemas import TabInfo
+from ..urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZER_TOOL_NAME = "summarizer_agent"
+SUMMARY_CACHE_STATE_KEY = "summary_cache_key"
+SUMMARY_CACHE_PARTITION_STATE_KEY = "summary_cache_partition"
+
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_SUMMARY_CACHE_SIZE", "2048"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CONTEXT_SUMMARY_CACHE_TTL", str(24 * 60 * 60)))
+SUMMARY_CACHE_USER_MAX_ENTRIES = int(os.getenv("SESSION_CONTEXT_SUMMARY_CACHE_USER_SIZE", "512"))
+SUMMARY_CACHE_USER_MAX_BYTES = int(os.getenv("SESSION_CONTEXT_SUMMARY_CACHE_USER_BYTES", str(1024 * 1024)))
+SUMMARY_CACHE_PATH = os.getenv("SESSION_CONTEXT_SUMMARY_CACHE_PATH") or None
+SUMMARY_CACHE_SAVE_EVERY = 50
+# Summarizer calls timed but not yet finished; a call whose after-callback never runs is evicted eventually.
+PENDING_CALLS_MAX = 1024
+
+
+def summary_cache_key(tab: TabInfo) -> str:
+    """Build the cache key for a tab from its canonical URL and content fingerprint."""
+    content = tab.content
+    fingerprint = json.dumps(
+        [
+            tab.title or "",
+            content.h1 if content else None,
+            content.h2 if content else None,
+            content.metaDescription if content else None,
+        ],
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+    return f"{canonicalize_url(tab.url)}#{digest}"
+
+
+class SummaryCache:
+    """
+    LRU/TTL cache of tab summaries with optional JSON persistence.
+
+    Args:
+        max_entries (int): Maximum number of cached summaries.
+        ttl_seconds (float): Lifetime of a cached summary.
+        user_max_entries (int): Summaries kept per user.
+        user_max_bytes (int): Summary bytes kept per user.
+        path (str, optional): File used to persist the cache across restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        user_max_entries: int,
+        user_max_bytes: int,
+        path: Optional[str] = None,
+    ) -> None:
+        # Values are (summary, milliseconds the summarizer took to produce it).
+        self._cache: PartitionedCache[tuple] = PartitionedCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            partition_max_entries=user_max_entries,
+            weigh=lambda value: len(value[0].encode("utf-8")),
+            partition_max_weight=user_max_bytes,
+        )
+        self.path = path
+        self.latency_saved_ms = 0.0
+        self._pending: TTLCache[float] = TTLCache(max_entries=PENDING_CALLS_MAX, ttl_seconds=0)
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_task: Optional["asyncio.Future[None]"] = None
+        if self.path:
+            self.load()
+
+    def lookup(self, user_id: str, key: str) -> Optional[str]:
+        """Return `user_id`'s cached summary for `key`, recording the hit or miss."""
+        entry = self._cache.get(user_id, key)
+        if entry is None:
+            return None
+        self.latency_saved_ms += entry[1]
+        return entry[0]
+
+    def store(self, user_id: str, key: str, summary: str, cost_ms: float) -> None:
+        self._cache.set(user_id, key, (summary, cost_ms))
+        self._unsaved += 1
+        if self.path and self._unsaved >= SUMMARY_CACHE_SAVE_EVERY:
+            self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        """Persist in a worker thread so the file write never blocks the event loop."""
+        if self._save_task is not None and not self._save_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._save_task = loop.run_in_executor(None, self.save)
+
+    def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict[str, Any]]:
+        """Answer `summarizer_agent` calls from the cache; time the call on a miss."""
+        if tool.name != SUMMARIZER_TOOL_NAME:
+            return None
+        key = tool_context.state.get(SUMMARY_CACHE_STATE_KEY)
+        if not key:
+            return None
+        # The request handler already counted the lookup when it built the prompt.
+        entry = self._cache.get(tool_context.state.get(SUMMARY_CACHE_PARTITION_STATE_KEY, ""), key, record=False)
+        if entry is not None:
+            logger.info("Serving summarizer_agent call from cache: key=%s", key)
+            return {"result": entry[0]}
+        self._pending.set(tool_context.function_call_id or key, time.perf_counter())
+        return None
+
+    def after_tool_callback(
+        self,
+        tool: BaseTool,
+        args: Dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> Optional[Dict[str, Any]]:
+        """Store fresh summarizer output under the request's cache key."""
+        if tool.name != SUMMARIZER_TOOL_NAME:
+            return None
+        key = tool_context.state.get(SUMMARY_CACHE_STATE_KEY)
+        started = self._pending.pop(tool_context.function_call_id or key) if key else None
+        if started is None:
+            return None
+        summary = tool_response.get("result") if isinstance(tool_response, dict) else tool_response
+        if isinstance(summary, str) and summary.strip():
+            user_id = tool_context.state.get(SUMMARY_CACHE_PARTITION_STATE_KEY, "")
+            self.store(user_id, key, summary, (time.perf_counter() - started) * 1000)
+        return None
+
+    def snapshot_records(self) -> List[list]:
+        """`[user, key, stored_at, summary, cost_ms]` for every live entry."""
+        return [[user_id, key, stored_at, value[0], value[1]] for user_id, key, stored_at, value in self._cache.items()]
+
+    def restore_records(self, records: Iterable[list]) -> int:
+        """Add persisted entries that have not expired or been cached since; returns how many were added."""
+        restored = 0
+        for record in records:
+            if len(record) != 5:
+                # Files written before the cache was partitioned carry no user.
+                continue
+            user_id, key, stored_at, summary, cost_ms = record
+            restored += self._cache.restore(user_id, key, (summary, cost_ms), stored_at)
+        return restored
+
+    def load(self) -> None:
+        """Load persisted entries, skipping expired ones."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                entries = json.load(handle)
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to load summary cache from %s: %s", self.path, exc)
+            return
+        loaded = self.restore_records(entries)
+        logger.info("Loaded %s cached summaries from %s", loaded, self.path)
+
+    def save(self) -> None:
+        """Atomically write live entries to `path`."""
+        if not self.path:
+            return
+        with self._lock:
+            entries = self.snapshot_records()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(entries, handle, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._unsaved = 0
+            except OSError as exc:
+                logger.warning("Failed to persist summary cache to %s: %s", self.path, exc)
+
+    def summaries(self) -> Iterator[Tuple[str, str]]:
+        """`(canonical URL, summary)` for every live entry, across users."""
+        for _, key, _, value in self._cache.items():
+            yield key.rsplit("#", 1)[0], value[0]
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def partition_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._cache.partition_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats["latency_saved_ms"] = round(self.latency_saved_ms, 1)
+        stats["persistent"] = bool(self.path)
+        stats["pending_calls"] = len(self._pending)
+        return stats
+
+
+summary_cache = SummaryCache(
+    max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+    ttl_seconds=SUMMARY_CACHE_TTL_SECONDS,
+    user_max_entries=SUMMARY_CACHE_USER_MAX_ENTRIES,
+    user_max_bytes=SUMMARY_CACHE_USER_MAX_BYTES,
+    path=SUMMARY_CACHE_PATH,
+)
+
+__all__ = [
+    "SUMMARY_CACHE_PARTITION_STATE_KEY",
+    "SUMMARY_CACHE_STATE_KEY",
+    "SummaryCache",
+    "summary_cache",
+    "summary_cache_key",
+]
@@ -0,0 +1,336 @@
+"""
+Domain knowledge table - What well-known sites are, without a web search.
+
+The summarizer used to call `web_search` (Serper) to find out what a site is,
+even for GitHub, Stack Overflow or a news site. The table answers that locally.
+It maps a host (`docs.python.org`) or registrable domain (`python.org`) to a
+category, a one-line description, and a few page topics seen in our own
+summaries.
+
+The table is a single file that is memory-mapped rather than loaded: a sorted
+array of fixed-size `(hash, offset, length)` records, followed by one JSON
+object per domain. A lookup is a binary search over the records plus one JSON
+decode. Opening the file costs nothing, however large it is, and worker
+processes share its pages. The file is built from `domains_seed.json`, which
+ships next to this module, and refreshed from recorded summaries (see
+`scripts/build_domain_table.py` and `POST /debug/domains/refresh`).
+
+When the new tab's site is in the table, the grouping prompt names it, and a
+`web_search` call made while summarizing that tab is answered from the table
+instead of Serper. Only unknown domains reach the network.
+
+The module does no file I/O on import: the app opens (and, the first time,
+builds) the table when it starts.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from ..cache import TTLCache
+from ..urls import registrable_domain
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_TABLE_ENABLED = os.getenv("SESSION_CONTEXT_DOMAIN_TABLE", "true").lower() in ("1", "true", "yes")
+DOMAIN_TABLE_PATH = os.getenv("SESSION_CONTEXT_DOMAIN_TABLE_PATH", "domain_table.bin")
+DOMAIN_MIN_SUMMARIES = int(os.getenv("SESSION_CONTEXT_DOMAIN_MIN_SUMMARIES", "3"))
+SEED_PATH = os.path.join(os.path.dirname(__file__), "domains_seed.json")
+
+# State key holding the new tab's URL, so summarizer tool callbacks know which site is being summarized.
+DOMAIN_STATE_KEY = "domain_knowledge_url"
+WEB_SEARCH_TOOL_NAME = "web_search"
+
+MAGIC = b"SCDOMT01"
+HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<QII")
+MAX_EXAMPLES = 3
+# Real searches timed but not yet finished; a search whose after-callback never runs is evicted eventually.
+PENDING_SEARCHES_MAX = 1024
+TOPIC_PATTERN = re.compile(r"\*\*Main Topic/Activity:\*\*\s*(.+)")
+
+
+def domain_hash(domain: str) -> int:
+    return int.from_bytes(hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def candidate_domains(url: Optional[str]) -> List[str]:
+    """Host first, then each parent down to the registrable domain (`a.b.example.com`, `b.example.com`, ...)."""
+    if not url:
+        return []
+    try:
+        host = (urlsplit(url.strip()).hostname or "").lower().rstrip(".")
+    except ValueError:
+        return []
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        return []
+    base = registrable_domain(url) or host
+    if base.startswith("www."):
+        base = base[4:]
+    candidates = [host]
+    while host != base and "." in host:
+        host = host.split(".", 1)[1]
+        candidates.append(host)
+    return candidates
+
+
+def write_domain_table(path: str, entries: Dict[str, Dict[str, Any]]) -> int:
+    """Atomically write `entries` (domain -> entry) as a table file; returns the entry count."""
+    payloads = sorted(
+        (domain_hash(domain), json.dumps({**entry, "domain": domain}, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        for domain, entry in entries.items()
+    )
+    offset = HEADER.size + RECORD.size * len(payloads)
+    records = bytearray()
+    for digest, payload in payloads:
+        records += RECORD.pack(digest, offset, len(payload))
+        offset += len(payload)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, len(payloads)))
+        handle.write(records)
+        for _, payload in payloads:
+            handle.write(payload)
+    os.replace(tmp_path, path)
+    return len(payloads)
+
+
+def load_seed(path: str = SEED_PATH) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as handle:
+        rows = json.load(handle)
+    return {row["domain"]: {key: value for key, value in row.items() if key != "domain"} for row in rows}
+
+
+def entries_from_summaries(pairs: Iterable[Tuple[str, str]], min_summaries: int = DOMAIN_MIN_SUMMARIES) -> Dict[str, Dict[str, Any]]:
+    """
+    Derive table entries from recorded `(url, summary)` pairs.
+
+    Sites summarized at least `min_summaries` times get an entry. Its description
+    is the most frequent `Main Topic/Activity` line, and it lists a few distinct
+    topics as examples.
+
+    Args:
+        pairs (iterable): `(url, summarizer output)` pairs.
+        min_summaries (int): Summaries a site needs before it is trusted.
+
+    Returns:
+        dict: Domain -> entry, keyed by host without `www.`.
+    """
+    topics: Dict[str, Counter] = {}
+    for url, summary in pairs:
+        candidates = candidate_domains(url)
+        match = TOPIC_PATTERN.search(summary or "")
+        if not candidates or not match:
+            continue
+        topics.setdefault(candidates[0], Counter())[match.group(1).strip()[:160]] += 1
+    entries: Dict[str, Dict[str, Any]] = {}
+    for domain, counts in topics.items():
+        total = sum(counts.values())
+        if total < min_summaries:
+            continue
+        ranked = [topic for topic, _ in counts.most_common(MAX_EXAMPLES + 1)]
+        entries[domain] = {"description": ranked[0], "examples": ranked[1:], "summaries": total, "source": "summaries"}
+    return entries
+
+
+def merge_entries(base: Dict[str, Dict[str, Any]], learned: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Curated descriptions and categories win; learned entries add examples and new domains."""
+    merged = {domain: dict(entry) for domain, entry in base.items()}
+    for domain, entry in learned.items():
+        current = merged.get(domain)
+        if current is None or current.get("source") == "summaries":
+            merged[domain] = dict(entry)
+        else:
+            current["examples"] = entry.get("examples", []) or [entry["description"]]
+            current["summaries"] = entry.get("summaries", 0)
+    return merged
+
+
+class DomainKnowledge:
+    """
+    Memory-mapped domain table with `web_search` short-circuiting.
+
+    Lookups find nothing until `open` has mapped the table.
+
+    Args:
+        path (str, optional): Table file; created from the seed list when missing. None disables lookups.
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._pending: TTLCache[float] = TTLCache(max_entries=PENDING_SEARCHES_MAX, ttl_seconds=0)
+        self.lookups = 0
+        self.hits = 0
+        self.searches = 0
+        self.searches_avoided = 0
+        self.search_ms_total = 0.0
+
+    def open(self) -> None:
+        """Map the table file, building it from the seed list if it does not exist yet."""
+        if not self.path:
+            return
+        try:
+            if not os.path.exists(self.path):
+                count = write_domain_table(self.path, load_seed())
+                logger.info("Built domain table with %s seed entries at %s", count, self.path)
+            with open(self.path, "rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            logger.warning("Domain table unavailable at %s: %s", self.path, exc)
+            return
+        magic, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            logger.warning("Ignoring %s: not a domain table", self.path)
+            mapped.close()
+            return
+        with self._lock:
+            previous, self._map, self._count = self._map, mapped, count
+        if previous is not None:
+            previous.close()
+
+    def close(self) -> None:
+        with self._lock:
+            mapped, self._map, self._count = self._map, None, 0
+        if mapped is not None:
+            mapped.close()
+
+    def _find(self, domain: str) -> Optional[Dict[str, Any]]:
+        digest = domain_hash(domain)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(self._map, HEADER.size + middle * RECORD.size)[0] < digest:  # type: ignore[arg-type]
+                low = middle + 1
+            else:
+                high = middle
+        while low < self._count:
+            record_hash, offset, length = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)  # type: ignore[arg-type]
+            if record_hash != digest:
+                return None
+            entry = json.loads(self._map[offset : offset + length])  # type: ignore[index]
+            if entry.get("domain") == domain:
+                return entry
+            low += 1
+        return None
+
+    def lookup(self, url: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The most specific entry for `url`'s host or one of its parent domains."""
+        if self._map is None:
+            return None
+        self.lookups += 1
+        with self._lock:
+            if self._map is None:
+                return None
+            for domain in candidate_domains(url):
+                entry = self._find(domain)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+        return None
+
+    def describe(self, url: Optional[str]) -> Optional[str]:
+        """One line for the grouping prompt, e.g. `github.com (developer): Code hosting ...`."""
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        category = f" ({entry['category']})" if entry.get("category") else ""
+        return f"{entry['domain']}{category}: {entry['description']}"
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            if self._map is None:
+                return
+            for index in range(self._count):
+                _, offset, length = RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+                yield json.loads(self._map[offset : offset + length])
+
+    def refresh(self, pairs: Iterable[Tuple[str, str]], min_summaries: int = DOMAIN_MIN_SUMMARIES) -> Dict[str, int]:
+        """Merge domains learned from `(url, summary)` pairs into the table file and remap it."""
+        if not self.path:
+            raise RuntimeError("Domain table is disabled")
+        current = {entry.pop("domain"): entry for entry in self.entries()} or load_seed()
+        learned = entries_from_summaries(pairs, min_summaries)
+        merged = merge_entries(current, learned)
+        count = write_domain_table(self.path, merged)
+        self.open()
+        added = len(set(merged) - set(current))
+        logger.info("Refreshed domain table: %s entries, %s new", count, added)
+        return {"entries": count, "learned": len(learned), "added": added}
+
+    def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict[str, Any]]:
+        """Answer `web_search` from the table when the tab being summarized is on a known site."""
+        if tool.name != WEB_SEARCH_TOOL_NAME:
+            return None
+        entry = self.lookup(tool_context.state.get(DOMAIN_STATE_KEY))
+        if entry is None:
+            self._pending.set(tool_context.function_call_id or "", time.perf_counter())
+            return None
+        self.searches_avoided += 1
+        snippet = entry["description"]
+        if entry.get("examples"):
+            snippet += ". Typical pages: " + "; ".join(entry["examples"])
+        return {
+            "status": "success",
+            "source": "domain_table",
+            "query": args.get("query", ""),
+            "total_results": 1,
+            "results": [{"title": f"{entry['domain']} ({entry.get('category') or 'site'})", "link": f"https://{entry['domain']}", "snippet": snippet}],
+        }
+
+    def after_tool_callback(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> Optional[Dict[str, Any]]:
+        """Time real searches; the mean is what each avoided search saves."""
+        started = self._pending.pop(tool_context.function_call_id or "") if tool.name == WEB_SEARCH_TOOL_NAME else None
+        if started is not None:
+            self.searches += 1
+            self.search_ms_total += (time.perf_counter() - started) * 1000
+        return None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, Any]:
+        search_ms = self.search_ms_total / self.searches if self.searches else None
+        total_searches = self.searches + self.searches_avoided
+        return {
+            "entries": self._count,
+            "open": self._map is not None,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "web_searches": self.searches,
+            "web_searches_avoided": self.searches_avoided,
+            "search_reduction": round(self.searches_avoided / total_searches, 3) if total_searches else 0.0,
+            "web_search_ms_mean": round(search_ms, 1) if search_ms is not None else None,
+            "latency_saved_ms": round(self.searches_avoided * search_ms, 1) if search_ms is not None else None,
+        }
+
+
+domain_knowledge = DomainKnowledge(DOMAIN_TABLE_PATH if DOMAIN_TABLE_ENABLED else None)
+
+__all__ = [
+    "DOMAIN_STATE_KEY",
+    "DomainKnowledge",
+    "domain_knowledge",
+    "entries_from_summaries",
+    "load_seed",
+    "merge_entries",
+    "write_domain_table",
+]
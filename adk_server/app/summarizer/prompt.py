@@ -2,6 +2,10 @@
 Prompts for the Summarizer agent.
 """
 
+from typing import List, Optional
+
+from ..schemas import TabInfo
+
 SUMMARIZER_INSTRUCTION = """You are a tab summarization agent responsible for analyzing browser tabs and creating detailed, actionable summaries that help downstream agents make informed session-matching decisions.
 
 ## YOUR TASK
@@ -66,6 +70,7 @@ Use the `web_search` tool when:
 4. Understanding the broader context would significantly improve the summary quality
 
 Do NOT use web search for:
+- Sites described by a `Site:` line in the request; that description is already known
 - Well-known websites where the purpose is obvious from the URL/title
 - Pages with sufficient extracted content
 - Routine browsing (social media feeds, news articles, common services)
@@ -89,3 +94,28 @@ Structure your summary clearly with the sections above. Use markdown formatting
 
 Your summary will be used by a matching agent to decide whether this tab belongs with existing browsing sessions. Provide enough detail and context to enable accurate grouping of related activities."""
 
+
+
+def build_summary_message(tab: TabInfo, site: Optional[str] = None) -> str:
+    """
+    Format a tab for a direct summarizer call, with the fields the coordinator passes it.
+
+    Args:
+        tab (TabInfo): The tab to summarize.
+        site (str, optional): What the tab's site is, from the domain knowledge table.
+
+    Returns:
+        str: The summarizer's user message.
+    """
+    lines: List[str] = ["Summarize this browser tab:", f"Title: {tab.title or 'Untitled'}", f"URL: {tab.url}"]
+    if site:
+        lines.append(f"Site: {site}")
+    content = tab.content
+    if content is not None:
+        if content.h1:
+            lines.append(f"Heading: {content.h1}")
+        if content.h2:
+            lines.append("Section headings: " + "; ".join(content.h2[:10]))
+        if content.metaDescription:
+            lines.append(f"Description: {content.metaDescription}")
+    return "\n".join(lines)
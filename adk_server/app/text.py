@@ -0,0 +1,93 @@
+"""
+Lightweight text helpers for local (non-LLM) matching and labeling.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlsplit
+
+from .schemas import TabContent
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each few for from further had has
+    have having he her here hers him his how i if in into is it its just me more most my no nor not
+    now of off on once only or other our ours out over own same she should so some such than that
+    the their theirs them then there these they this those through to too under until up very was
+    we were what when where which while who whom why will with would you your yours
+    new get use using via vs page home welcome untitled official site online free best top
+    """.split()
+)
+
+# URL fragments that carry no topical signal.
+URL_NOISE = frozenset(
+    """
+    http https www com org net io co uk us dev app html htm php aspx jsp index amp m en
+    """.split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-case word tokens with stopwords, numbers and single characters removed."""
+    if not text:
+        return []
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and not token.isdigit() and token not in STOPWORDS
+    ]
+
+
+def url_terms(url: Optional[str]) -> List[str]:
+    """Tokens from a URL's host labels and path segments."""
+    if not url:
+        return []
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return []
+    host_terms = [label for label in (parts.hostname or "").split(".") if label and label not in URL_NOISE]
+    path_terms = tokenize(unquote(parts.path).replace("-", " ").replace("_", " "))
+    return [term for term in host_terms + path_terms if term not in URL_NOISE]
+
+
+def tab_terms(url: Optional[str], title: Optional[str], content: Optional[TabContent] = None) -> List[str]:
+    """Collect the topical terms of a tab from its URL, title and extracted content."""
+    terms = url_terms(url) + tokenize(title)
+    if content:
+        terms += tokenize(content.h1)
+        terms += tokenize(content.metaDescription)
+        for heading in (content.h2 or [])[:5]:
+            terms += tokenize(heading)
+    return terms
+
+
+def term_vector(terms: Iterable[str]) -> Dict[str, float]:
+    """Unit-length term frequency vector."""
+    counts = Counter(terms)
+    norm = math.sqrt(sum(count * count for count in counts.values()))
+    if not norm:
+        return {}
+    return {term: count / norm for term, count in counts.items()}
+
+
+def cosine(left: Dict[str, float], right: Dict[str, float]) -> float:
+    """Cosine similarity between two sparse vectors."""
+    if not left or not right:
+        return 0.0
+    if len(left) > len(right):
+        left, right = right, left
+    dot = sum(weight * right.get(term, 0.0) for term, weight in left.items())
+    left_norm = math.sqrt(sum(weight * weight for weight in left.values()))
+    right_norm = math.sqrt(sum(weight * weight for weight in right.values()))
+    if not left_norm or not right_norm:
+        return 0.0
+    return dot / (left_norm * right_norm)
+
+
+__all__ = ["STOPWORDS", "cosine", "tab_terms", "term_vector", "tokenize", "url_terms"]
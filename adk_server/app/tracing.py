@@ -0,0 +1,291 @@
+"""
+Per-request span tracing.
+
+Spans follow the OpenTelemetry data model (128-bit trace IDs, 64-bit span IDs,
+parent links, nanosecond timestamps, attributes and status) and are exported
+as OTLP-style JSON to the console or a JSONL file. Every request gets a
+request ID (taken from `X-Request-Id` or generated) and its finished spans are
+kept in memory so `GET /debug/traces/{request_id}` can return the span tree.
+
+Agent hops are traced through ADK callbacks: every model call and tool call
+(including `summarizer_agent`, `matcher_agent` and `web_search`) becomes a
+child span of whatever span was current when it started. A call that never
+reaches its after-callback (it raised, or the request was cancelled) is closed
+with an error status when its request's root span ends.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("SESSION_CONTEXT_TRACING", "true").lower() in ("1", "true", "yes")
+TRACE_EXPORTER = os.getenv("SESSION_CONTEXT_TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("SESSION_CONTEXT_TRACE_FILE", "traces.jsonl")
+TRACE_RETENTION = int(os.getenv("SESSION_CONTEXT_TRACE_RETENTION", "500"))
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_SPANS_PER_TRACE = 1000
+
+
+@dataclass
+class Span:
+    """A timed operation within a request's trace."""
+
+    name: str
+    trace_id: str
+    request_id: str
+    parent: Optional["Span"] = None
+    span_id: str = field(default_factory=lambda: uuid4().hex[:16])
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otel(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "attributes": dict(self.attributes, **{"request.id": self.request_id}),
+            "status": {"code": self.status},
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "session_context_current_span", default=None
+)
+
+
+def _tool_key(tool: BaseTool, tool_context: ToolContext) -> str:
+    return f"tool:{tool_context.invocation_id}:{tool_context.function_call_id or tool.name}"
+
+
+def _model_key(callback_context: CallbackContext) -> str:
+    return f"llm:{callback_context.invocation_id}:{callback_context.agent_name}"
+
+
+class SpanExporter:
+    """Writes finished spans to the console log or a JSONL file."""
+
+    def __init__(self, kind: str, path: str) -> None:
+        self.kind = kind
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self.kind == "console":
+            logger.info("span %s", json.dumps(span.to_otel(), default=str))
+        elif self.kind == "file":
+            with self._lock:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as handle:
+                        handle.write(json.dumps(span.to_otel(), default=str) + "\n")
+                except OSError as exc:
+                    logger.warning("Failed to export span to %s: %s", self.path, exc)
+
+
+class Tracer:
+    """
+    Creates spans, tracks the current one per task and keeps recent traces.
+
+    Args:
+        enabled (bool): When False spans are not created and every hook is a no-op.
+        exporter (SpanExporter): Destination for finished spans.
+        retention (int): Number of recent request traces kept for the debug endpoint.
+    """
+
+    def __init__(self, enabled: bool, exporter: SpanExporter, retention: int) -> None:
+        self.enabled = enabled
+        self.exporter = exporter
+        self._traces: TTLCache[List[Span]] = TTLCache(max_entries=retention, ttl_seconds=0)
+        # Spans started by ADK callbacks and not yet ended, per trace ID.
+        self._open: Dict[str, Dict[str, Span]] = {}
+
+    def start_trace(self, request_id: str, name: str, **attributes: Any) -> Optional[Span]:
+        """Start the root span of a request."""
+        if not self.enabled:
+            return None
+        span = Span(name=name, trace_id=uuid4().hex, request_id=request_id, attributes=attributes)
+        self._traces.set(request_id, [])
+        _current_span.set(span)
+        return span
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, **attributes: Any) -> Optional[Span]:
+        """Start a child of the current span and make it current."""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        span = Span(name=name, trace_id=parent.trace_id, request_id=parent.request_id, parent=parent, attributes=attributes)
+        _current_span.set(span)
+        return span
+
+    def end_span(self, span: Optional[Span], error: Optional[BaseException] = None) -> None:
+        if span is None or span.end_ns is not None:
+            return
+        if span.parent is None:
+            self._close_abandoned(span.trace_id)
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "ERROR"
+            span.set_attribute("exception.message", str(error))
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+        spans = self._traces.get(span.request_id, record=False)
+        if spans is not None and len(spans) < MAX_SPANS_PER_TRACE:
+            spans.append(span)
+        self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as exc:
+            self.end_span(span, error=exc)
+            raise
+        self.end_span(span)
+
+    def trace_tree(self, request_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the request's spans nested by parent, or None if unknown."""
+        spans = self._traces.get(request_id, record=False)
+        if spans is None:
+            return None
+        nodes = {span.span_id: dict(span.to_otel(), children=[]) for span in spans}
+        roots = []
+        for span in sorted(spans, key=lambda item: item.start_ns):
+            node = nodes[span.span_id]
+            parent_id = span.parent.span_id if span.parent else None
+            if parent_id in nodes:
+                nodes[parent_id]["children"].append(node)
+            else:
+                roots.append(node)
+        return roots
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def open_spans(self) -> int:
+        """Spans started by ADK callbacks that have not ended yet."""
+        return sum(len(spans) for spans in self._open.values())
+
+    def _track(self, key: str, span: Optional[Span]) -> None:
+        if span is not None:
+            self._open.setdefault(span.trace_id, {})[key] = span
+
+    def _untrack(self, key: str) -> Optional[Span]:
+        current = _current_span.get()
+        spans = self._open.get(current.trace_id) if current is not None else None
+        if not spans:
+            return None
+        span = spans.pop(key, None)
+        if not spans:
+            del self._open[current.trace_id]  # type: ignore[union-attr]
+        return span
+
+    def _close_abandoned(self, trace_id: str) -> None:
+        """End the callback spans of a trace whose after-callback never ran."""
+        for span in reversed(list(self._open.pop(trace_id, {}).values())):
+            span.status = "ERROR"
+            span.set_attribute("span.abandoned", True)
+            self.end_span(span)
+
+    def recent_request_ids(self) -> List[str]:
+        return [request_id for request_id, _, _ in self._traces.items()]
+
+    # ----- ADK callbacks -----
+
+    def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict[str, Any]]:
+        span = self.start_span(f"tool {tool.name}", **{"tool.name": tool.name, "agent.name": tool_context.agent_name})
+        self._track(_tool_key(tool, tool_context), span)
+        return None
+
+    def after_tool_callback(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> Optional[Dict[str, Any]]:
+        span = self._untrack(_tool_key(tool, tool_context))
+        if span is not None and isinstance(tool_response, dict) and tool_response.get("status") == "error":
+            span.status = "ERROR"
+        self.end_span(span)
+        return None
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        span = self.start_span(f"llm {callback_context.agent_name}", **{"agent.name": callback_context.agent_name})
+        self._track(_model_key(callback_context), span)
+        return None
+
+    def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if getattr(llm_response, "partial", False):
+            return None
+        span = self._untrack(_model_key(callback_context))
+        if span is not None and getattr(llm_response, "error_code", None):
+            span.status = "ERROR"
+        self.end_span(span)
+        return None
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens the root span and echoes the request ID header."""
+
+    def __init__(self, app: Any, tracer: Tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope["headers"]).get(REQUEST_ID_HEADER)
+        request_id = header.decode("latin-1") if header else uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        root = self.tracer.start_trace(
+            request_id, f"{scope['method']} {scope['path']}", **{"http.method": scope["method"], "http.route": scope["path"]}
+        )
+
+        async def traced_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as exc:
+            self.tracer.end_span(root, error=exc)
+            raise
+        self.tracer.end_span(root)
+
+
+tracer = Tracer(
+    enabled=TRACING_ENABLED,
+    exporter=SpanExporter(TRACE_EXPORTER, TRACE_FILE),
+    retention=TRACE_RETENTION,
+)
+
+__all__ = ["Span", "SpanExporter", "Tracer", "TracingMiddleware", "tracer"]
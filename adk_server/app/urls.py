@@ -0,0 +1,82 @@
+"""
+URL helpers shared by the caches and matching code.
+"""
+
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Two-label public suffixes under which the registrable domain has three labels.
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "co.jp", "ne.jp", "or.jp", "ac.jp", "com.au", "net.au",
+    "org.au", "edu.au", "gov.au", "co.nz", "org.nz", "com.br", "com.cn", "com.mx", "com.tr", "co.in", "co.kr",
+    "co.za", "com.sg", "com.hk", "com.tw", "github.io", "gitlab.io", "herokuapp.com", "vercel.app", "netlify.app",
+    "pages.dev", "appspot.com", "blogspot.com",
+}
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ref_src", "igshid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: Optional[str]) -> str:
+    """
+    Return a canonical form of `url` suitable for cache keys.
+
+    Lower-cases the scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the remaining query parameters.
+    Unparseable input is returned stripped.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url.rstrip("/")
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """Light normalization used for duplicate-tab checks: trimmed, without trailing slashes."""
+    if not url:
+        return ""
+    return url.strip().rstrip("/")
+
+
+def registrable_domain(url: Optional[str]) -> Optional[str]:
+    """
+    Return the registrable domain of `url` (e.g. `docs.python.org` -> `python.org`).
+
+    Uses a short list of multi-label public suffixes rather than the full
+    Public Suffix List; IP addresses and single-label hosts are returned as is.
+    """
+    if not url:
+        return None
+    try:
+        host = urlsplit(url.strip()).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    labels = host.lower().rstrip(".").split(".")
+    if len(labels) <= 2 or labels[-1].isdigit():
+        return ".".join(labels)
+    if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+__all__ = ["canonicalize_url", "normalize_url", "registrable_domain"]
@@ -0,0 +1,53 @@
+"""
+Token usage accounting per agent, including provider prompt-cache hits.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_response import LlmResponse
+
+logger = logging.getLogger(__name__)
+
+
+class PromptUsage:
+    """Accumulates prompt, cached and output token counts reported by the model."""
+
+    def __init__(self) -> None:
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_name: str, usage: Any) -> None:
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        with self._lock:
+            totals = self._agents.setdefault(
+                agent_name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["output_tokens"] += output_tokens
+
+    def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        """ADK `after_model_callback` that records the response's usage metadata."""
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            self.record(callback_context.agent_name, usage)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {name: dict(totals) for name, totals in self._agents.items()}
+        for totals in agents.values():
+            prompt_tokens = totals["prompt_tokens"]
+            totals["cached_ratio"] = round(totals["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+        return agents
+
+
+prompt_usage = PromptUsage()
+
+__all__ = ["PromptUsage", "prompt_usage"]
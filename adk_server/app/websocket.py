@@ -0,0 +1,230 @@
+"""
+Persistent WebSocket channel for tab events and grouping decisions.
+
+One connection carries many concurrent requests. Every client frame is an
+envelope `{"id": ..., "type": ..., "payload": {...}}`; the server answers each
+one asynchronously with `{"id": ..., "type": "<type>.result", "payload": ...}`
+or `{"id": ..., "type": "error", "status": ..., "detail": ...}`, in whatever
+order the requests finish. `{"type": "cancel", "id": ...}` abandons an
+in-flight request.
+
+Backpressure: at most `SESSION_CONTEXT_WS_MAX_IN_FLIGHT` requests run per
+connection and results wait in a bounded send queue. When either is full the
+server stops reading frames, so a client that floods or reads slowly is
+throttled by TCP flow control instead of growing server memory.
+
+Browsers do not apply CORS to WebSockets, so the handshake checks `Origin`
+itself against the same allowed list and closes with 1008 (policy violation)
+on a mismatch. Clients that send no `Origin` are not browsers and are let in,
+as they are over HTTP.
+
+Frames are JSON text by default; a client that offers the `msgpack`
+subprotocol gets binary MessagePack frames both ways.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+from uuid import uuid4
+
+from fastapi import HTTPException, WebSocket
+from pydantic import BaseModel, ValidationError
+from starlette.websockets import WebSocketDisconnect
+
+from .metrics import LatencyStats
+from .tracing import tracer
+from .wire import dumps, loads
+
+try:  # Optional binary wire format
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+WS_MAX_IN_FLIGHT = int(os.getenv("SESSION_CONTEXT_WS_MAX_IN_FLIGHT", "8"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("SESSION_CONTEXT_WS_SEND_QUEUE", "32"))
+MSGPACK_SUBPROTOCOL = "msgpack"
+POLICY_VIOLATION = 1008
+
+Handler = Callable[[Dict[str, Any], WebSocket], Awaitable[Any]]
+Admit = Callable[[WebSocket], Awaitable[None]]
+
+
+class WebSocketChannel:
+    """
+    Multiplexes request/response envelopes over WebSocket connections.
+
+    Args:
+        handlers (dict): Message type -> coroutine taking the payload and the connection
+            and returning a Pydantic model or JSON-compatible value.
+        admit (callable, optional): Awaited before each request; raise HTTPException to reject it.
+        allowed_origins (sequence, optional): Origins allowed to connect; None or "*" allows any.
+        max_in_flight (int): Concurrent requests per connection.
+        send_queue_size (int): Results buffered per connection before handlers block.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Handler],
+        admit: Optional[Admit] = None,
+        allowed_origins: Optional[Sequence[str]] = None,
+        max_in_flight: int = WS_MAX_IN_FLIGHT,
+        send_queue_size: int = WS_SEND_QUEUE_SIZE,
+    ) -> None:
+        self.handlers = handlers
+        self.admit = admit
+        self.allowed_origins = None if allowed_origins is None or "*" in allowed_origins else frozenset(allowed_origins)
+        self.max_in_flight = max_in_flight
+        self.send_queue_size = send_queue_size
+        self.connections = 0
+        self.rejected_origins = 0
+        self.active_connections = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.backpressure_waits = 0
+        self.latency: Dict[str, LatencyStats] = {name: LatencyStats() for name in handlers}
+
+    def origin_allowed(self, origin: Optional[str]) -> bool:
+        return origin is None or self.allowed_origins is None or origin in self.allowed_origins
+
+    async def serve(self, websocket: WebSocket) -> None:
+        origin = websocket.headers.get("origin")
+        if not self.origin_allowed(origin):
+            self.rejected_origins += 1
+            logger.warning("Rejected WebSocket connection from origin %s", origin)
+            # Closing before accepting would surface as a bare HTTP 403; accept so the close code reaches the client.
+            await websocket.accept()
+            await websocket.close(code=POLICY_VIOLATION)
+            return
+        binary = msgpack is not None and MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        await websocket.accept(subprotocol=MSGPACK_SUBPROTOCOL if binary else None)
+        self.connections += 1
+        self.active_connections += 1
+
+        outgoing: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=self.send_queue_size)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        in_flight: Dict[str, "asyncio.Task[None]"] = {}
+        sender = asyncio.create_task(self._send_loop(websocket, outgoing, binary))
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                self.messages_in += 1
+                try:
+                    raw = message.get("bytes") if message.get("bytes") is not None else message.get("text", "")
+                    envelope = msgpack.unpackb(raw, raw=False) if binary else loads(raw)
+                    if not isinstance(envelope, dict):
+                        raise ValueError("envelope must be an object")
+                except Exception:
+                    self.errors += 1
+                    await outgoing.put({"id": None, "type": "error", "status": 400, "detail": "Malformed frame"})
+                    continue
+
+                request_id = str(envelope.get("id", ""))
+                kind = envelope.get("type")
+                if kind == "ping":
+                    await outgoing.put({"id": request_id, "type": "pong"})
+                    continue
+                if kind == "cancel":
+                    task = in_flight.get(request_id)
+                    if task is not None and task.cancel():
+                        self.cancelled += 1
+                    continue
+                if kind not in self.handlers:
+                    self.errors += 1
+                    await outgoing.put({"id": request_id, "type": "error", "status": 400, "detail": f"Unknown type: {kind}"})
+                    continue
+                if request_id in in_flight:
+                    await outgoing.put({"id": request_id, "type": "error", "status": 409, "detail": "Duplicate id"})
+                    continue
+
+                # Stop reading frames until a request slot frees up.
+                if slots.locked():
+                    self.backpressure_waits += 1
+                await slots.acquire()
+                task = asyncio.create_task(
+                    self._dispatch(websocket, request_id, kind, envelope.get("payload") or {}, outgoing)
+                )
+                in_flight[request_id] = task
+                task.add_done_callback(lambda _, key=request_id: (in_flight.pop(key, None), slots.release()))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.active_connections -= 1
+            for task in list(in_flight.values()):
+                task.cancel()
+            sender.cancel()
+
+    async def _dispatch(
+        self,
+        websocket: WebSocket,
+        request_id: str,
+        kind: str,
+        payload: Dict[str, Any],
+        outgoing: "asyncio.Queue[Dict[str, Any]]",
+    ) -> None:
+        started = time.perf_counter()
+        root = tracer.start_trace(uuid4().hex, f"WS {kind}", **{"ws.message_id": request_id})
+        failed = False
+        try:
+            if self.admit is not None:
+                await self.admit(websocket)
+            result = await self.handlers[kind](payload, websocket)
+            if isinstance(result, BaseModel):
+                result = result.model_dump(mode="json")
+            reply: Dict[str, Any] = {"id": request_id, "type": f"{kind}.result", "payload": result}
+        except asyncio.CancelledError:
+            tracer.end_span(root)
+            raise
+        except HTTPException as exc:
+            failed = True
+            reply = {"id": request_id, "type": "error", "status": exc.status_code, "detail": exc.detail}
+        except ValidationError as exc:
+            failed = True
+            reply = {"id": request_id, "type": "error", "status": 422, "detail": exc.errors(include_url=False)}
+        except Exception as exc:
+            failed = True
+            logger.exception("WebSocket %s request failed: %s", kind, exc)
+            reply = {"id": request_id, "type": "error", "status": 500, "detail": "Internal error"}
+
+        if failed:
+            self.errors += 1
+        self.latency[kind].record((time.perf_counter() - started) * 1000, error=failed)
+        tracer.end_span(root)
+        await outgoing.put(reply)
+
+    async def _send_loop(self, websocket: WebSocket, outgoing: "asyncio.Queue[Dict[str, Any]]", binary: bool) -> None:
+        try:
+            while True:
+                reply = await outgoing.get()
+                if binary:
+                    await websocket.send_bytes(msgpack.packb(reply, use_bin_type=True, default=str))
+                else:
+                    await websocket.send_text(dumps(reply).decode("utf-8"))
+                self.messages_out += 1
+        except (WebSocketDisconnect, RuntimeError):
+            # The client went away; the receive loop notices and cleans up.
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "rejected_origins": self.rejected_origins,
+            "active_connections": self.active_connections,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "backpressure_waits": self.backpressure_waits,
+            "latency": {name: stats.snapshot() for name, stats in self.latency.items()},
+        }
+
+
+__all__ = ["MSGPACK_SUBPROTOCOL", "WebSocketChannel"]
@@ -0,0 +1,179 @@
+"""
+Wire-format helpers for the FastAPI surface.
+
+Request bodies are decoded with orjson when it is installed (falling back to the
+standard library) and may alternatively be sent as MessagePack using the
+`application/x-msgpack` content type. Bodies larger than
+`SESSION_CONTEXT_MAX_BODY_BYTES` are rejected before they are parsed.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Coroutine, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from .tracing import tracer
+
+try:  # Optional fast JSON codec
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+try:  # Optional binary wire format
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None  # type: ignore[assignment]
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:  # pragma: no cover - depends on the environment
+    DefaultResponse = JSONResponse  # type: ignore[misc]
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/msgpack", "application/vnd.msgpack"}
+MAX_BODY_BYTES = int(os.getenv("SESSION_CONTEXT_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document, preferring orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON, preferring orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _media_type(header_value: Optional[str]) -> str:
+    if not header_value:
+        return ""
+    return header_value.split(";", 1)[0].strip().lower()
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Return True when the client asked for a MessagePack response."""
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(_media_type(item) in MSGPACK_MEDIA_TYPES for item in accept.split(","))
+
+
+async def read_limited_body(request: Request, limit: int = MAX_BODY_BYTES) -> bytes:
+    """
+    Read the request body, aborting once it grows beyond `limit` bytes.
+
+    Raises:
+        HTTPException: 413 when the declared or actual body size exceeds the limit.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class WireRequest(Request):
+    """Request whose JSON body is decoded with orjson (or pre-decoded from MessagePack)."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            self._json = loads(body)
+        return self._json
+
+
+async def decode_request(request: Request) -> WireRequest:
+    """
+    Buffer and size-check the body, then return a request FastAPI can validate.
+
+    MessagePack bodies are decoded up-front and presented to FastAPI as JSON so
+    that the regular Pydantic validation path applies unchanged.
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return WireRequest(request.scope, request.receive)
+
+    body = await read_limited_body(request)
+    content_type = _media_type(request.headers.get("content-type"))
+    scope = request.scope
+
+    decoded: Any = None
+    is_msgpack = content_type in MSGPACK_MEDIA_TYPES
+    if is_msgpack:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+        try:
+            decoded = msgpack.unpackb(body, raw=False)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail="Malformed MessagePack body") from exc
+        headers = [(key, value) for key, value in scope["headers"] if key != b"content-type"]
+        headers.append((b"content-type", b"application/json"))
+        scope = {**scope, "headers": headers}
+
+    wire_request = WireRequest(scope, request.receive)
+    wire_request._body = body
+    if is_msgpack:
+        wire_request._json = decoded
+    return wire_request
+
+
+def encode_msgpack_response(response: Response) -> Response:
+    """Transcode a JSON response into MessagePack."""
+    payload = loads(bytes(response.body))
+    headers = {key: value for key, value in response.headers.items() if key not in ("content-length", "content-type")}
+    return Response(
+        content=msgpack.packb(payload, use_bin_type=True),
+        status_code=response.status_code,
+        headers=headers,
+        media_type=MSGPACK_MEDIA_TYPE,
+    )
+
+
+class WireRoute(APIRoute):
+    """APIRoute that applies the size limit, orjson decoding and MessagePack negotiation."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        original_handler = super().get_route_handler()
+
+        async def wire_route_handler(request: Request) -> Response:
+            with tracer.span("request.decode", **{"http.content_type": request.headers.get("content-type", "")}):
+                wire_request = await decode_request(request)
+            response = await original_handler(wire_request)
+            if (
+                wants_msgpack(request)
+                and _media_type(response.headers.get("content-type")) == "application/json"
+                and getattr(response, "body", None) is not None
+            ):
+                return encode_msgpack_response(response)
+            return response
+
+        return wire_route_handler
+
+
+__all__ = [
+    "DefaultResponse",
+    "MAX_BODY_BYTES",
+    "MSGPACK_MEDIA_TYPE",
+    "WireRequest",
+    "WireRoute",
+    "dumps",
+    "loads",
+    "read_limited_body",
+    "wants_msgpack",
+]
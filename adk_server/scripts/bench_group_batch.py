@@ -0,0 +1,135 @@
+"""
+Benchmark `/api/group` micro-batching: throughput against added latency per window size.
+
+Starts `scripts.stub_openai`, then for each batching window starts the API
+under uvicorn with `SESSION_CONTEXT_GROUP_BATCH_MAX_WAIT_MS` set to it (`off`
+leaves batching disabled) and drives open-loop Poisson `/api/group` traffic at
+each arrival rate. For every window and rate it reports throughput, p50/p95
+latency, model calls per request, the mean batch size, the share of requests
+decided in a batch and the mean time a request spent waiting for its batch.
+
+    python -m scripts.bench_group_batch --windows off,25,50,100,250 --rates 4,8,16 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+import httpx
+
+from scripts.loadtest import run_step, summarize, wait_ready
+
+
+def start_server(port: int, stub_url: str, window: str, max_size: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "OPENAI_API_KEY": "stub-key",
+            "OPENAI_API_BASE": stub_url,
+            "OPENAI_BASE_URL": stub_url,
+            "SERPER_API_KEY": "",
+            "SESSION_CONTEXT_RATE_LIMIT_ENABLED": "false",
+            "SESSION_CONTEXT_GROUP_BATCH": "false" if window == "off" else "true",
+            "SESSION_CONTEXT_GROUP_BATCH_MAX_WAIT_MS": "0" if window == "off" else window,
+            "SESSION_CONTEXT_GROUP_BATCH_MAX_SIZE": str(max_size),
+        }
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def model_calls(metrics: Dict[str, Any]) -> int:
+    return sum(agent["calls"] for agent in metrics["prompt_usage"].values())
+
+
+def batch_totals(metrics: Dict[str, Any]) -> Dict[str, float]:
+    tiers = [stats for name, stats in metrics["group_batches"].items() if name != "enabled"]
+    return {
+        "batches": sum(stats["batches"] for stats in tiers),
+        "batched": sum(stats["batched"] for stats in tiers),
+        "fallbacks": sum(stats["fallbacks"] for stats in tiers),
+        "wait_ms": sum(stats["mean_wait_ms"] * stats["waited"] for stats in tiers),
+        "submitted": sum(stats["submitted"] for stats in tiers),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    stub_url = f"http://127.0.0.1:{args.stub_port}/v1"
+    stub_command = [
+        sys.executable,
+        "-m",
+        "scripts.stub_openai",
+        "--port",
+        str(args.stub_port),
+        "--ttft-ms",
+        str(args.stub_ttft_ms),
+        "--tokens-per-second",
+        str(args.stub_tokens_per_second),
+    ]
+    stub = subprocess.Popen(stub_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    mix = [("/api/group", 1.0)]
+    print(
+        f"{'window':>7} {'rate':>5} {'thrpt/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'calls/req':>9} "
+        f"{'batch size':>10} {'batched':>8} {'wait ms':>8} {'errors':>7}"
+    )
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.stub_port}/v1/models")
+        for window in args.windows.split(","):
+            server = start_server(args.port, stub_url, window, args.max_size)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                await wait_ready(f"{base_url}/health")
+                limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+                async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+                    for rate in [float(value) for value in args.rates.split(",")]:
+                        before = (await client.get("/metrics")).json()
+                        started = time.perf_counter()
+                        results = await run_step(client, rate, args.duration, mix)
+                        stats = summarize(results, time.perf_counter() - started, 0.0)
+                        after = (await client.get("/metrics")).json()
+                        calls = (model_calls(after) - model_calls(before)) / max(1, len(results))
+                        first, last = batch_totals(before), batch_totals(after)
+                        delta = {key: last[key] - first[key] for key in last}
+                        size = delta["batched"] / delta["batches"] if delta["batches"] else 0.0
+                        share = delta["batched"] / len(results) if results else 0.0
+                        wait = delta["wait_ms"] / delta["submitted"] if delta["submitted"] else 0.0
+                        print(
+                            f"{window:>7} {rate:5.0f} {stats['throughput']:8.2f} {stats['p50_ms']:7.0f} {stats['p95_ms']:7.0f} "
+                            f"{calls:9.2f} {size:10.2f} {share:8.0%} {wait:8.1f} {stats['error_rate']:7.1%}"
+                        )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /api/group micro-batching at several window sizes.")
+    parser.add_argument("--windows", default="off,25,50,100,250", help="Comma-separated max waits in ms; `off` disables batching")
+    parser.add_argument("--rates", default="4,8,16", help="Comma-separated arrival rates (req/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per rate step")
+    parser.add_argument("--max-size", type=int, default=8, help="Requests per batch")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--stub-ttft-ms", type=float, default=350.0)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare `/api/label/batch` with one `/api/label` call per session.
+
+Run against a server backed by the stub model server (see `scripts.stub_openai`)
+with `SESSION_CONTEXT_RATE_LIMIT_ENABLED=false`, since every request comes from
+one client. The same realistic sessions (see `scripts.bench_prompt`) are
+labeled three ways:
+
+- `sequential`: `/api/label` calls one after another, as the extension relabels today.
+- `concurrent`: `/api/label` calls with `--concurrency` in flight.
+- `batch`: `/api/label/batch` requests of `--batch-size` sessions, one at a time.
+
+It reports sessions labeled per second, model calls and failed items.
+
+    python -m scripts.bench_label_batch --url http://127.0.0.1:8000 --sessions 100 --batch-size 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from scripts.bench_prompt import make_label_request
+
+
+async def label_one(client: httpx.AsyncClient, session: Dict[str, Any]) -> bool:
+    response = await client.post("/api/label", json=session)
+    return response.status_code == 200
+
+
+async def run_sequential(client: httpx.AsyncClient, sessions: List[Dict[str, Any]]) -> Tuple[int, int]:
+    failed = 0
+    for session in sessions:
+        failed += not await label_one(client, session)
+    return len(sessions), failed
+
+
+async def run_concurrent(client: httpx.AsyncClient, sessions: List[Dict[str, Any]], concurrency: int) -> Tuple[int, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(session: Dict[str, Any]) -> bool:
+        async with semaphore:
+            return await label_one(client, session)
+
+    results = await asyncio.gather(*(bounded(session) for session in sessions))
+    return len(sessions), results.count(False)
+
+
+async def run_batch(client: httpx.AsyncClient, sessions: List[Dict[str, Any]], batch_size: int) -> Tuple[int, int]:
+    calls = failed = 0
+    for start in range(0, len(sessions), batch_size):
+        items = [{"id": f"s{start + index}", **session} for index, session in enumerate(sessions[start : start + batch_size])]
+        response = await client.post("/api/label/batch", json={"items": items})
+        if response.status_code != 200:
+            failed += len(items)
+            continue
+        body = response.json()
+        calls += body["modelCalls"]
+        failed += sum(1 for result in body["labels"].values() if result.get("error"))
+    return calls, failed
+
+
+async def run(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    sessions = [make_label_request().model_dump(exclude_none=True) for _ in range(args.sessions)]
+    print(f"{'mode':12} {'sessions':>8} {'seconds':>8} {'sessions/s':>11} {'model calls':>12} {'failed':>7}")
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        modes = {
+            "sequential": lambda: run_sequential(client, sessions),
+            "concurrent": lambda: run_concurrent(client, sessions, args.concurrency),
+            "batch": lambda: run_batch(client, sessions, args.batch_size),
+        }
+        for name in args.modes.split(","):
+            started = time.perf_counter()
+            calls, failed = await modes[name]()
+            elapsed = time.perf_counter() - started
+            print(f"{name:12} {len(sessions):8d} {elapsed:8.2f} {len(sessions) / elapsed:11.1f} {calls:12d} {failed:7d}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch labeling against per-session label calls.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=50, help="Sessions per /api/label/batch request")
+    parser.add_argument("--concurrency", type=int, default=8, help="In-flight /api/label calls in `concurrent` mode")
+    parser.add_argument("--modes", default="sequential,concurrent,batch")
+    parser.add_argument("--seed", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Compare the verbose and compact prompt layouts for `/api/group` and `/api/label`.
+
+Builds realistic session sets, with long documentation titles, tracking query
+strings, search and video URLs, `Untitled` tabs and unlabeled sessions, and
+reports input tokens per prompt in both layouts. Tokens are counted with
+`tiktoken` (`o200k_base`, the GPT-4o encoding) when it is installed, otherwise
+estimated at four characters per token.
+
+With `--model`, each prompt is also sent through LiteLLM in both layouts and
+the completion latency is compared. Point `--api-base` at `scripts.stub_openai`
+(whose time to first token grows with uncached prompt tokens) or at a real
+provider:
+
+    python -m scripts.bench_prompt --sets 200
+    python -m scripts.bench_prompt --model openai/gpt-4o-mini --api-base http://127.0.0.1:9100/v1 --calls 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.base_agent.prompt import build_grouping_message
+from app.labeler.prompt import build_label_message
+from app.schemas import GroupingRequest, LabelRequest
+
+try:  # Exact token counts when available
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None  # type: ignore[assignment]
+
+# (url template, title template) per site; `{q}` is a topic phrase and `{n}` a number.
+SITES: Dict[str, List[Tuple[str, str]]] = {
+    "python": [
+        ("https://docs.python.org/3/library/{slug}.html#{slug}-functions", "{Q} — Python 3.12.1 documentation"),
+        ("https://stackoverflow.com/questions/{n}/how-to-{slug}-in-python", "python - How to {q} in Python? - Stack Overflow"),
+        ("https://github.com/python/cpython/issues/{n}", "{Q} regression · Issue #{n} · python/cpython · GitHub"),
+        ("https://www.google.com/search?q={slug}+python&oq={slug}&sourceid=chrome&ie=UTF-8", "{q} python - Google Search"),
+    ],
+    "travel": [
+        ("https://www.booking.com/hotel/it/{slug}.html?aid=304142&label=gen173nr-1FCAEoggI46AdIM1gEaGyIAQGYATG4ARfIAQzYAQHoAQH4AQKIAgGoAgO4AqfS&sid=9f3e{n}", "{Q} Hotel, Rome (updated prices 2025) | Booking.com"),
+        ("https://www.tripadvisor.com/Attraction_Review-g187791-d{n}-Reviews-{slug}-Rome_Lazio.html", "{Q} (Rome) - All You Need to Know BEFORE You Go (with Photos) - Tripadvisor"),
+        ("https://www.google.com/maps/place/{slug}/@41.9,12.49,15z/data=!4m6!3m5!1s0x0", "{Q} - Google Maps"),
+    ],
+    "video": [
+        ("https://www.youtube.com/watch?v=dQw4w{n}&list=PLx0sYbCqOb8TBPRdmBHs5Iftvv9TPboYG&index=3&t=42s", "{Q} explained in 10 minutes - YouTube"),
+    ],
+    "shopping": [
+        ("https://www.amazon.com/{slug}/dp/B0{n}/ref=sr_1_3?crid=2M8&keywords={slug}&qid=1700000000&sprefix={slug}%2Caps%2C180&sr=8-3", "Amazon.com: {Q} : Electronics"),
+        ("https://www.bestbuy.com/site/{slug}/{n}.p?skuId={n}&intl=nosplash", "{Q} - Best Buy"),
+    ],
+    "misc": [
+        ("https://mail.google.com/mail/u/0/#inbox/FMfcgzGxSlVbQ{n}", "Inbox (3) - someone@example.com - Gmail"),
+        ("https://docs.google.com/document/d/1xYz{n}abcDEF/edit?tab=t.0", "Untitled"),
+        ("chrome://newtab/", "New Tab"),
+    ],
+}
+PHRASES = {
+    "python": ["asyncio tasks", "dataclasses", "functools cache", "typing generics", "context managers", "subprocess pipes"],
+    "travel": ["trastevere", "colosseum tickets", "vatican museums", "pantheon", "villa borghese"],
+    "video": ["transformers", "rust ownership", "kubernetes networking", "sourdough starter"],
+    "shopping": ["noise cancelling headphones", "usb c hub", "mechanical keyboard", "4k monitor"],
+    "misc": ["inbox", "notes", "new tab"],
+}
+LABELS = {"python": "Python Async Research", "travel": "Rome Trip Planning", "video": "Tech Talks", "shopping": "Headphone Shopping", "misc": None}
+
+
+def make_tab(topic: str) -> Dict[str, Any]:
+    url_template, title_template = random.choice(SITES[topic])
+    phrase = random.choice(PHRASES[topic])
+    n = random.randint(10_000_000, 99_999_999)
+    tab: Dict[str, Any] = {
+        "url": url_template.format(slug=phrase.replace(" ", "-"), n=n),
+        "title": title_template.format(q=phrase, Q=phrase.title(), n=n),
+    }
+    if random.random() < 0.5:
+        tab["content"] = {"h1": phrase.title(), "metaDescription": f"Everything about {phrase}: guides, reviews and examples for {topic}."}
+    return tab
+
+
+def make_sessions(count: int) -> List[Dict[str, Any]]:
+    sessions = []
+    for index in range(count):
+        topic = random.choice(list(SITES))
+        label = LABELS[topic] if random.random() < 0.8 else None
+        sessions.append(
+            {
+                "id": f"{random.getrandbits(32):08x}-{random.getrandbits(16):04x}-4{random.getrandbits(12):03x}-a{random.getrandbits(12):03x}-{random.getrandbits(48):012x}",
+                "label": label,
+                "startTs": 1_700_000_000_000 + index * 60_000,
+                "tabList": [make_tab(topic) for _ in range(random.randint(1, 8))],
+            }
+        )
+    return sessions
+
+
+def make_group_request() -> GroupingRequest:
+    topic = random.choice(list(SITES))
+    return GroupingRequest.model_validate(
+        {
+            "newTab": make_tab(topic),
+            "existingSessions": make_sessions(random.randint(2, 15)),
+            "currentTabs": [make_tab(random.choice(list(SITES))) for _ in range(random.randint(0, 6))],
+        }
+    )
+
+
+def make_label_request() -> LabelRequest:
+    topic = random.choice(list(SITES))
+    return LabelRequest.model_validate({"tabList": [make_tab(topic) for _ in range(random.randint(1, 12))]})
+
+
+def token_counter() -> Callable[[str], int]:
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(encoding.encode(text))
+        except Exception:  # encoding files unavailable offline
+            pass
+    return lambda text: (len(text) + 3) // 4
+
+
+def summarize(name: str, verbose: List[int], compact: List[int], verbose_us: List[float], compact_us: List[float]) -> None:
+    saved = 1 - sum(compact) / sum(verbose)
+    print(
+        f"{name:8} {len(verbose):5d} {statistics.mean(verbose):10.0f} {statistics.mean(compact):10.0f} "
+        f"{statistics.median(verbose):8.0f} {statistics.median(compact):8.0f} {saved:8.1%} "
+        f"{statistics.median(verbose_us):9.0f} {statistics.median(compact_us):9.0f}"
+    )
+
+
+def timed(build: Callable[[], str]) -> Tuple[str, float]:
+    started = time.perf_counter()
+    text = build()
+    return text, (time.perf_counter() - started) * 1e6
+
+
+async def compare_latency(args: argparse.Namespace, prompts: List[Tuple[str, str]]) -> None:
+    import litellm
+
+    async def call(prompt: str) -> float:
+        started = time.perf_counter()
+        await litellm.acompletion(
+            model=args.model,
+            api_base=args.api_base,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=16,
+        )
+        return (time.perf_counter() - started) * 1000
+
+    latencies: Dict[str, List[float]] = {"verbose": [], "compact": []}
+    for index, (verbose, compact) in enumerate(prompts[: args.calls]):
+        # Alternate the order so neither layout benefits from warmer connections.
+        order = [("verbose", verbose), ("compact", compact)]
+        for layout, prompt in order if index % 2 == 0 else reversed(order):
+            latencies[layout].append(await call(prompt))
+    print()
+    print(f"{'layout':8} {'calls':>5} {'p50 ms':>8} {'mean ms':>8}")
+    for layout, values in latencies.items():
+        print(f"{layout:8} {len(values):5d} {statistics.median(values):8.1f} {statistics.mean(values):8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark compact against verbose prompt layouts.")
+    parser.add_argument("--sets", type=int, default=200, help="Session sets (requests) per endpoint")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--budget", type=int, default=2000, help="Compact layout token budget")
+    parser.add_argument("--model", default=None, help="LiteLLM model for the latency comparison")
+    parser.add_argument("--api-base", default=None)
+    parser.add_argument("--calls", type=int, default=20, help="Prompts per layout sent to --model")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    count = token_counter()
+    print(f"tokens counted with {'tiktoken o200k_base' if tiktoken is not None else 'a 4 chars/token estimate'}")
+    print(f"{'prompt':8} {'n':>5} {'verbose':>10} {'compact':>10} {'p50 v':>8} {'p50 c':>8} {'saved':>8} {'build v µs':>9} {'build c µs':>9}")
+
+    group_prompts: List[Tuple[str, str]] = []
+    columns: Tuple[List[int], List[int], List[float], List[float]] = ([], [], [], [])
+    for _ in range(args.sets):
+        request = make_group_request()
+        verbose, verbose_us = timed(lambda: build_grouping_message(request, compact=False))
+        compact, compact_us = timed(lambda: build_grouping_message(request, compact=True, token_budget=args.budget))
+        group_prompts.append((verbose, compact))
+        for column, value in zip(columns, (count(verbose), count(compact), verbose_us, compact_us)):
+            column.append(value)  # type: ignore[arg-type]
+    summarize("group", *columns)
+
+    columns = ([], [], [], [])
+    for _ in range(args.sets):
+        label_request = make_label_request()
+        verbose, verbose_us = timed(lambda: build_label_message(label_request.tabList, compact=False))
+        compact, compact_us = timed(lambda: build_label_message(label_request.tabList, compact=True))
+        for column, value in zip(columns, (count(verbose), count(compact), verbose_us, compact_us)):
+            column.append(value)  # type: ignore[arg-type]
+    summarize("label", *columns)
+
+    if args.model:
+        asyncio.run(compare_latency(args, group_prompts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark parse + validate cost of `GroupingRequest` payloads.
+
+Compares the previous path (stdlib `json` + eager nested `TabContent`
+validation) against the current one (orjson/MessagePack + lazily validated
+session tabs) for 100, 1,000 and 10,000 tab payloads.
+
+Usage:
+    python -m scripts.bench_wire [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Importing the `app` package builds the agents, which requires a key to be set.
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+
+from app.schemas import GroupingRequest, TabInfo
+from app.wire import loads, msgpack
+
+TABS_PER_SESSION = 10
+
+
+class EagerSession(BaseModel):
+    id: str
+    label: Optional[str] = None
+    tabList: List[TabInfo] = Field(default_factory=list)
+
+
+class EagerGroupingRequest(BaseModel):
+    newTab: TabInfo
+    existingSessions: List[EagerSession] = Field(default_factory=list)
+    currentTabs: List[TabInfo] = Field(default_factory=list)
+
+
+def make_tab(index: int) -> Dict[str, Any]:
+    return {
+        "url": f"https://docs.example{index % 50}.com/guide/section-{index}?ref=nav",
+        "title": f"Example guide section {index}",
+        "ts": 1_700_000_000_000 + index,
+        "favicon": None,
+        "content": {
+            "h1": f"Section {index} heading",
+            "h2": [f"Part {index}.{part}" for part in range(4)],
+            "metaDescription": "An example page used for wire format benchmarking. " * 3,
+        },
+    }
+
+
+def make_payload(tab_count: int) -> Dict[str, Any]:
+    sessions = []
+    for session_index in range(max(1, tab_count // TABS_PER_SESSION)):
+        start = session_index * TABS_PER_SESSION
+        sessions.append(
+            {
+                "id": f"session-{session_index:06d}-0000-0000-0000-000000000000",
+                "label": f"Research Topic {session_index}",
+                "startTs": 1_700_000_000_000,
+                "endTs": 1_700_000_100_000,
+                "tabList": [make_tab(start + offset) for offset in range(TABS_PER_SESSION)],
+            }
+        )
+    return {"newTab": make_tab(tab_count + 1), "currentTabs": [], "existingSessions": sessions}
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": statistics.median(timings), "peak_mib": peak / (1024 * 1024)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for tab_count in (100, 1_000, 10_000):
+        payload = make_payload(tab_count)
+        json_body = json.dumps(payload).encode("utf-8")
+        cases = {
+            "json+eager": lambda: EagerGroupingRequest.model_validate(json.loads(json_body)),
+            "fast-json+lazy": lambda: GroupingRequest.model_validate(loads(json_body)),
+        }
+        if msgpack is not None:
+            msgpack_body = msgpack.packb(payload, use_bin_type=True)
+            cases["msgpack+lazy"] = lambda: GroupingRequest.model_validate(msgpack.unpackb(msgpack_body, raw=False))
+
+        print(f"\n{tab_count} tabs (json {len(json_body) / 1024:.0f} KiB)")
+        for name, fn in cases.items():
+            result = measure(fn, args.repeat)
+            print(f"  {name:<16} {result['median_ms']:9.2f} ms   peak {result['peak_mib']:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Compare the WebSocket channel with the HTTP path for grouping requests.
+
+Run against a server backed by the stub model server (see `scripts.stub_openai`)
+so the agent time is cheap and stable, with `SESSION_CONTEXT_RATE_LIMIT_ENABLED=false`
+since every request comes from one client. The benchmark sends the same
+`/api/group` payloads four ways:
+
+- `http-extension`: a new connection and a CORS preflight per request, as the
+  extension's `fetch` calls behave without keep-alive reuse.
+- `http-keepalive`: one pooled connection, no preflight.
+- `ws-sequential`: one WebSocket, one request at a time.
+- `ws-multiplexed`: one WebSocket, `--concurrency` requests in flight.
+
+It reports latency percentiles, throughput and per-message protocol overhead:
+HTTP request and response headers (plus the preflight) versus WebSocket frame
+headers plus the envelope.
+
+    python -m scripts.bench_ws --url http://127.0.0.1:8000 --requests 40 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from websockets.asyncio.client import connect
+
+from scripts.loadtest import make_request
+
+ORIGIN = "chrome-extension://abcdefghijklmnopabcdefghijklmnop"
+BROWSER_HEADERS = {
+    "Origin": ORIGIN,
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "cross-site",
+    "Sec-Fetch-Dest": "empty",
+}
+
+
+def header_bytes(start_line: str, headers: httpx.Headers) -> int:
+    return len(start_line) + 2 + sum(len(key) + len(value) + 4 for key, value in headers.raw) + 2
+
+
+def request_overhead(request: httpx.Request) -> int:
+    return header_bytes(f"{request.method} {request.url.raw_path.decode()} HTTP/1.1", request.headers)
+
+
+def response_overhead(response: httpx.Response) -> int:
+    return header_bytes(f"HTTP/1.1 {response.status_code} {response.reason_phrase}", response.headers)
+
+
+def ws_frame_header(length: int, masked: bool) -> int:
+    size = 2 if length < 126 else 4 if length < 65536 else 10
+    return size + (4 if masked else 0)
+
+
+async def http_run(url: str, payloads: List[Dict[str, Any]], extension: bool) -> Tuple[List[float], List[int], int]:
+    latencies: List[float] = []
+    overheads: List[int] = []
+    errors = 0
+    pooled = None if extension else httpx.AsyncClient(base_url=url, timeout=120, headers=BROWSER_HEADERS)
+    try:
+        for payload in payloads:
+            started = time.perf_counter()
+            overhead = 0
+            if extension:
+                async with httpx.AsyncClient(base_url=url, timeout=120, headers=BROWSER_HEADERS) as client:
+                    preflight = await client.options(
+                        "/api/group",
+                        headers={"Access-Control-Request-Method": "POST", "Access-Control-Request-Headers": "content-type"},
+                    )
+                    overhead += request_overhead(preflight.request) + response_overhead(preflight)
+                    response = await client.post("/api/group", json=payload)
+            else:
+                response = await pooled.post("/api/group", json=payload)  # type: ignore[union-attr]
+            latencies.append((time.perf_counter() - started) * 1000)
+            overheads.append(overhead + request_overhead(response.request) + response_overhead(response))
+            errors += response.status_code != 200
+    finally:
+        if pooled is not None:
+            await pooled.aclose()
+    return latencies, overheads, errors
+
+
+async def ws_run(url: str, payloads: List[Dict[str, Any]], concurrency: int) -> Tuple[List[float], List[int], int]:
+    ws_url = url.replace("http://", "ws://").replace("https://", "wss://") + "/ws"
+    latencies: List[float] = []
+    overheads: List[int] = []
+    errors = 0
+    pending: Dict[str, Tuple[float, int]] = {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async with connect(ws_url, origin=ORIGIN, max_size=None) as websocket:
+
+        async def reader() -> None:
+            nonlocal errors
+            while len(latencies) < len(payloads):
+                frame = await websocket.recv()
+                reply = json.loads(frame)
+                started, sent_overhead = pending.pop(reply["id"])
+                latencies.append((time.perf_counter() - started) * 1000)
+                body = len(json.dumps(reply.get("payload"), separators=(",", ":")))
+                size = len(frame.encode("utf-8"))
+                overheads.append(sent_overhead + ws_frame_header(size, masked=False) + size - body)
+                errors += reply["type"] == "error"
+                slots.release()
+
+        reader_task = asyncio.create_task(reader())
+        for index, payload in enumerate(payloads):
+            await slots.acquire()
+            body = json.dumps(payload, separators=(",", ":"))
+            frame = json.dumps({"id": str(index), "type": "group", "payload": payload}, separators=(",", ":"))
+            size = len(frame.encode("utf-8"))
+            pending[str(index)] = (time.perf_counter(), ws_frame_header(size, masked=True) + size - len(body.encode("utf-8")))
+            await websocket.send(frame)
+        await reader_task
+    return latencies, overheads, errors
+
+
+def report(name: str, latencies: List[float], overheads: List[int], errors: int, wall_s: float) -> None:
+    ordered = sorted(latencies)
+    print(
+        f"{name:16} {len(ordered):5d} {errors:6d} {statistics.median(ordered):9.1f} {ordered[int(0.95 * (len(ordered) - 1))]:9.1f} "
+        f"{len(ordered) / wall_s:8.2f} {statistics.mean(overheads):10.0f}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"{'path':16} {'n':>5} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8} {'ovh bytes':>10}")
+    modes = [
+        ("http-extension", lambda payloads: http_run(args.url, payloads, extension=True)),
+        ("http-keepalive", lambda payloads: http_run(args.url, payloads, extension=False)),
+        ("ws-sequential", lambda payloads: ws_run(args.url, payloads, concurrency=1)),
+        ("ws-multiplexed", lambda payloads: ws_run(args.url, payloads, concurrency=args.concurrency)),
+    ]
+    for offset, (name, runner) in enumerate(modes):
+        # Fresh tabs per mode so no mode benefits from summaries cached by an earlier one.
+        random.seed(args.seed + offset)
+        payloads = [make_request("/api/group") for _ in range(args.requests)]
+        started = time.perf_counter()
+        latencies, overheads, errors = await runner(payloads)
+        report(name, latencies, overheads, errors, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the WebSocket channel against HTTP.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
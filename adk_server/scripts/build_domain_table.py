@@ -0,0 +1,72 @@
+"""
+Build or refresh the summarizer's domain knowledge table.
+
+Starts from the existing table, or from `app/summarizer/domains_seed.json` when
+there is none, and learns further sites from recorded summaries. Those come
+from a summary cache file written with `SESSION_CONTEXT_SUMMARY_CACHE_PATH`.
+It then reports coverage: the share of summarized tabs whose site the table
+knows. That is the share of tabs whose `web_search` calls are answered
+locally.
+
+    python -m scripts.build_domain_table --summaries summary_cache.json --table domain_table.bin
+
+A running server can refresh its table from its own cache with
+`POST /debug/domains/refresh`.
+"""
+
+import argparse
+import json
+import os
+from typing import List, Tuple
+
+from app.summarizer.domains import (
+    DOMAIN_MIN_SUMMARIES,
+    DOMAIN_TABLE_PATH,
+    DomainKnowledge,
+    entries_from_summaries,
+    load_seed,
+    merge_entries,
+    write_domain_table,
+)
+
+
+def read_summaries(path: str) -> List[Tuple[str, str]]:
+    """`(canonical URL, summary)` pairs from a persisted summary cache."""
+    with open(path, "r", encoding="utf-8") as handle:
+        entries = json.load(handle)
+    return [(entry[1].rsplit("#", 1)[0], entry[3]) for entry in entries if len(entry) == 5]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the domain knowledge table from the seed list and recorded summaries.")
+    parser.add_argument("--table", default=DOMAIN_TABLE_PATH, help="Table file to write")
+    parser.add_argument("--summaries", action="append", default=[], help="Summary cache file (repeatable)")
+    parser.add_argument("--min-summaries", type=int, default=DOMAIN_MIN_SUMMARIES)
+    parser.add_argument("--reseed", action="store_true", help="Start from the seed list even if the table exists")
+    args = parser.parse_args()
+
+    base = load_seed()
+    if os.path.exists(args.table) and not args.reseed:
+        existing = DomainKnowledge(args.table)
+        existing.open()
+        base = {entry.pop("domain"): entry for entry in existing.entries()} or base
+        existing.close()
+
+    pairs: List[Tuple[str, str]] = []
+    for path in args.summaries:
+        pairs.extend(read_summaries(path))
+    learned = entries_from_summaries(pairs, args.min_summaries)
+    merged = merge_entries(base, learned)
+    count = write_domain_table(args.table, merged)
+    print(f"wrote {count} domains to {args.table} ({len(base)} existing, {len(set(merged) - set(base))} learned)")
+
+    if pairs:
+        table = DomainKnowledge(args.table)
+        table.open()
+        known = sum(1 for url, _ in pairs if table.lookup(url) is not None)
+        table.close()
+        print(f"coverage: {known}/{len(pairs)} summarized tabs ({known / len(pairs):.1%}) are on known sites")
+
+
+if __name__ == "__main__":
+    main()
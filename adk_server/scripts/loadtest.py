@@ -0,0 +1,218 @@
+"""
+Open-loop load test of the ADK server against the stub OpenAI server.
+
+Starts `scripts.stub_openai`, then for each worker count starts the API under
+uvicorn pointed at the stub and drives a mixed `/api/group`, `/api/label` and
+`/agent/run` workload with Poisson arrivals at increasing rates. For every
+worker count it reports throughput, latency, queueing delay (latency above the
+unloaded service time) and error rate per rate step, plus the saturation
+throughput: the highest rate still served at >= 95% of the offered load with
+under 1% errors.
+
+    python -m scripts.loadtest --workers 1,2,4 --rates 1,2,4,8,16 --duration 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+TOPICS = {
+    "react": ("https://react.dev/learn/{slug}", "React {word} guide"),
+    "travel": ("https://www.booking.com/city/{slug}.html", "Hotels in {word}"),
+    "ml": ("https://pytorch.org/tutorials/{slug}", "PyTorch {word} tutorial"),
+    "startups": ("https://www.ycombinator.com/companies/{slug}", "{word} - Y Combinator"),
+}
+WORDS = ["hooks", "state", "paris", "rome", "training", "tensors", "fintech", "robotics", "effects", "berlin"]
+
+
+def make_tab(topic: Optional[str] = None) -> Dict[str, Any]:
+    topic = topic or random.choice(list(TOPICS))
+    url_template, title_template = TOPICS[topic]
+    word = random.choice(WORDS)
+    return {
+        "url": url_template.format(slug=f"{word}-{random.randint(1, 10_000)}"),
+        "title": title_template.format(word=word.title()),
+        "content": {"h1": title_template.format(word=word.title()), "metaDescription": f"All about {word} and {topic}."},
+    }
+
+
+def make_sessions(count: int) -> List[Dict[str, Any]]:
+    sessions = []
+    for index in range(count):
+        topic = random.choice(list(TOPICS))
+        sessions.append(
+            {
+                "id": f"session-{index:04d}",
+                "label": f"{topic.title()} Research",
+                "startTs": 1_700_000_000_000 + index,
+                "tabList": [make_tab(topic) for _ in range(random.randint(1, 6))],
+            }
+        )
+    return sessions
+
+
+def make_request(endpoint: str) -> Dict[str, Any]:
+    if endpoint == "/api/group":
+        return {"newTab": make_tab(), "existingSessions": make_sessions(random.randint(0, 12)), "currentTabs": []}
+    if endpoint == "/api/label":
+        return {"tabList": [make_tab() for _ in range(random.randint(1, 8))]}
+    return {"message": "Summarize my recent browsing about " + random.choice(list(TOPICS))}
+
+
+def parse_mix(value: str) -> List[Tuple[str, float]]:
+    names = {"group": "/api/group", "label": "/api/label", "agent": "/agent/run"}
+    mix = []
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix.append((names[name.strip()], float(weight)))
+    return mix
+
+
+async def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+async def run_step(client: httpx.AsyncClient, rate: float, duration: float, mix: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    """Fire requests with exponential inter-arrival times regardless of completions (open loop)."""
+    endpoints = [endpoint for endpoint, _ in mix]
+    weights = [weight for _, weight in mix]
+    results: List[Dict[str, Any]] = []
+    tasks = []
+
+    async def fire(endpoint: str, payload: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.post(endpoint, json=payload)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        results.append({"endpoint": endpoint, "status": status, "latency_ms": (time.perf_counter() - started) * 1000})
+
+    step_started = time.perf_counter()
+    next_arrival = 0.0
+    while next_arrival < duration:
+        delay = step_started + next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = random.choices(endpoints, weights)[0]
+        tasks.append(asyncio.create_task(fire(endpoint, make_request(endpoint))))
+        next_arrival += random.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results: List[Dict[str, Any]], wall_s: float, baseline_ms: float) -> Dict[str, float]:
+    latencies = sorted(result["latency_ms"] for result in results) or [0.0]
+    ok = sum(1 for result in results if result["status"] == 200)
+    return {
+        "offered": len(results),
+        "throughput": ok / wall_s if wall_s else 0.0,
+        "error_rate": 1 - ok / len(results) if results else 0.0,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "queue_ms": max(0.0, statistics.mean(latencies) - baseline_ms),
+    }
+
+
+async def calibrate(client: httpx.AsyncClient, mix: List[Tuple[str, float]], samples: int = 5) -> float:
+    """Mean latency of sequential requests: the unloaded service time."""
+    latencies = []
+    for endpoint, _ in mix:
+        for _ in range(samples):
+            started = time.perf_counter()
+            await client.post(endpoint, json=make_request(endpoint))
+            latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(latencies)
+
+
+def start_server(workers: int, port: int, stub_url: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "OPENAI_API_KEY": "stub-key",
+            "OPENAI_API_BASE": stub_url,
+            "OPENAI_BASE_URL": stub_url,
+            "SERPER_API_KEY": "",
+            "SESSION_CONTEXT_RATE_LIMIT_ENABLED": "false",
+        }
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    mix = parse_mix(args.mix)
+    stub_url = f"http://127.0.0.1:{args.stub_port}/v1"
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "scripts.stub_openai", "--port", str(args.stub_port), "--ttft-ms", str(args.stub_ttft_ms)]
+    )
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.stub_port}/v1/models")
+        for workers in [int(value) for value in args.workers.split(",")]:
+            server = start_server(workers, args.port, stub_url)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                await wait_ready(f"{base_url}/health")
+                limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+                async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+                    baseline_ms = await calibrate(client, mix)
+                    print(f"\nworkers={workers} (unloaded service time {baseline_ms:.0f} ms)")
+                    print(f"  {'rate':>6} {'offered':>8} {'thrpt/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'queue ms':>9} {'errors':>7}")
+                    saturation = 0.0
+                    for rate in [float(value) for value in args.rates.split(",")]:
+                        started = time.perf_counter()
+                        results = await run_step(client, rate, args.duration, mix)
+                        stats = summarize(results, time.perf_counter() - started, baseline_ms)
+                        print(
+                            f"  {rate:6.1f} {stats['offered']:8.0f} {stats['throughput']:8.2f} {stats['p50_ms']:8.0f} "
+                            f"{stats['p95_ms']:8.0f} {stats['queue_ms']:9.0f} {stats['error_rate']:7.1%}"
+                        )
+                        # Wall time includes draining the backlog, so an overloaded step falls below 95%.
+                        offered_rate = stats["offered"] / args.duration
+                        if stats["error_rate"] < 0.01 and stats["throughput"] >= 0.95 * offered_rate:
+                            saturation = max(saturation, stats["throughput"])
+                    print(f"  saturation throughput: {saturation:.2f} req/s")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the ADK server against a stub model server.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated uvicorn worker counts")
+    parser.add_argument("--rates", default="1,2,4,8,16", help="Comma-separated arrival rates (req/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per rate step")
+    parser.add_argument("--mix", default="group=0.7,label=0.2,agent=0.1", help="Endpoint weights")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--stub-ttft-ms", type=float, default=350.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Replay recorded `/api/group`, `/api/label` and `/api/label/batch` traffic against a running server.
+
+Start the server with `SESSION_CONTEXT_REPLAY_FILE` pointing at the same
+recording so that model calls are answered from the recorded responses, then:
+
+    python -m scripts.replay traffic-20260101-120000-1234.jsonl.gz --speed 4
+
+`--speed` scales request inter-arrival times (1 = original pacing, 0 = send
+everything at once); `SESSION_CONTEXT_REPLAY_SPEED` on the server scales the
+replayed model latency the same way.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List
+
+import httpx
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    # Mirrors app.recorder.read_records without importing (and building) the agents.
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def send(client: httpx.AsyncClient, record: Dict[str, Any], delay: float, results: Dict[str, List[Any]]) -> None:
+    await asyncio.sleep(delay)
+    started = time.perf_counter()
+    try:
+        response = await client.post(record["endpoint"], json=record["request"], headers={"X-Replay-Id": record["id"]})
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    results[record["endpoint"]].append((status, elapsed_ms, record.get("duration_ms")))
+
+
+async def replay(path: str, base_url: str, speed: float, timeout: float) -> None:
+    records = [record for record in read_records(path) if record.get("request")]
+    if not records:
+        print("No replayable records found")
+        return
+    records.sort(key=lambda record: record["ts"])
+    first_ts = records[0]["ts"]
+
+    results: Dict[str, List[Any]] = defaultdict(list)
+    limits = httpx.Limits(max_connections=256, max_keepalive_connections=64)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                send(client, record, (record["ts"] - first_ts) / speed if speed > 0 else 0.0, results)
+                for record in records
+            )
+        )
+        wall_s = time.perf_counter() - started
+
+    print(f"Replayed {len(records)} requests in {wall_s:.1f}s (speed x{speed})")
+    for endpoint, samples in sorted(results.items()):
+        latencies = sorted(elapsed for _, elapsed, _ in samples)
+        errors = sum(1 for status, _, _ in samples if status != 200)
+        original = [duration for _, _, duration in samples if duration is not None]
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * (len(latencies) - 1)))]
+        print(
+            f"  {endpoint:<12} n={len(samples):<5} errors={errors:<4} "
+            f"p50={statistics.median(latencies):8.1f}ms p95={p95:8.1f}ms "
+            f"(recorded p50={statistics.median(original) if original else 0:8.1f}ms)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded grouping traffic.")
+    parser.add_argument("recording", help="Recorded .jsonl or .jsonl.gz file")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Arrival-time speed-up factor (0 = no pacing)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+    asyncio.run(replay(args.recording, args.url, args.speed, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
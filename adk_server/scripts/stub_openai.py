@@ -0,0 +1,271 @@
+"""
+Stub OpenAI-compatible chat completions server for local load testing.
+
+It imitates the agents' real conversation shapes without spending provider
+quota. The coordinator calls `summarizer_agent`, then `matcher_agent`, then
+returns its decision, and the summarizer, matcher and labeler answer with
+plausible text. With `--search-rate`, the summarizer first calls `web_search`; the
+stub also serves a Serper-compatible `/search` (point `SERPER_API_URL` at it).
+Latency is modelled as time-to-first-token (scaled by the
+uncached prompt length) plus a per-token decode rate, and streamed responses
+are sent as SSE chunks. Cached prompt tokens are simulated with a prefix cache.
+
+    python -m scripts.stub_openai --port 9100 --ttft-ms 350 --tokens-per-second 90
+
+Point the server at it with `OPENAI_API_BASE=http://127.0.0.1:9100/v1`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+SESSION_ID_PATTERN = re.compile(r"ID: ([^,\s)]+)")
+# Compact prompts list sessions as `S1 "label" @site` lines (possibly JSON-escaped in tool arguments).
+SESSION_HANDLE_PATTERN = re.compile(r"(?:^|\\n)(S\d+)\b", re.MULTILINE)
+# Batch label prompts head each session with an `L1 (3 tab(s)...):` line.
+BATCH_HANDLE_PATTERN = re.compile(r"^(L\d+) \(", re.MULTILINE)
+# Batch grouping prompts head each request with an `=== R1 ===` line.
+REQUEST_BLOCK_PATTERN = re.compile(r"^=== (R\d+) ===$", re.MULTILINE)
+LABELS = ["Web Development Resources", "Travel Planning Europe", "Startup Research", "Machine Learning Tutorials"]
+PREFIX_CACHE_BLOCK = 2048  # characters (~512 tokens) per cacheable prefix block
+PREFIX_CACHE_SIZE = 50_000
+
+
+class StubConfig:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.ttft_ms = args.ttft_ms
+        self.jitter = args.jitter
+        self.prefill_ms_per_1k = args.prefill_ms_per_1k
+        self.tokens_per_second = args.tokens_per_second
+        self.error_rate = args.error_rate
+        self.merge_rate = args.merge_rate
+        self.bad_handle_rate = args.bad_handle_rate
+        self.batch_drop_rate = args.batch_drop_rate
+        self.search_rate = args.search_rate
+        self.search_ms = args.search_ms
+        self.prefix_cache: "OrderedDict[str, None]" = OrderedDict()
+
+
+def text_of(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def cached_prefix_tokens(config: StubConfig, prompt: str) -> int:
+    """Longest previously seen block-aligned prefix, in tokens."""
+    cached_chars = 0
+    for end in range(PREFIX_CACHE_BLOCK, len(prompt) + 1, PREFIX_CACHE_BLOCK):
+        digest = hashlib.sha1(prompt[:end].encode("utf-8")).hexdigest()
+        if digest in config.prefix_cache:
+            config.prefix_cache.move_to_end(digest)
+            cached_chars = end
+        else:
+            config.prefix_cache[digest] = None
+            if len(config.prefix_cache) > PREFIX_CACHE_SIZE:
+                config.prefix_cache.popitem(last=False)
+    return cached_chars // 4
+
+
+def decision(config: StubConfig, transcript: str) -> Dict[str, Any]:
+    session_ids = sorted(set(SESSION_HANDLE_PATTERN.findall(transcript))) or SESSION_ID_PATTERN.findall(transcript)
+    label = random.choice(LABELS)
+    if session_ids and random.random() < config.merge_rate:
+        session_id = random.choice(session_ids)
+        if config.bad_handle_rate and random.random() < config.bad_handle_rate:
+            session_id = f"S{len(session_ids) + 7}"
+        return {"action": "merge", "sessionId": session_id, "updatedLabel": label, "label": label, "reason": "Stub merge"}
+    return {"action": "create_new", "suggestedLabel": label, "label": label, "reason": "Stub new session"}
+
+
+def plan_reply(config: StubConfig, body: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Return (text, tool_call) for the conversation in `body`."""
+    messages = body.get("messages", [])
+    system = text_of(messages[0]) if messages and messages[0].get("role") == "system" else ""
+    transcript = "\n".join(text_of(message) for message in messages)
+    tool_names = {tool.get("function", {}).get("name") for tool in body.get("tools") or []}
+    called = {
+        call.get("function", {}).get("name")
+        for message in messages
+        if message.get("role") == "assistant"
+        for call in message.get("tool_calls") or []
+    }
+
+    if "summarizer_agent" in tool_names:
+        steps = ["summarizer_agent", "matcher_agent"]
+        if "CACHED SUMMARY:" in transcript:
+            steps = ["matcher_agent"]
+        for step in steps:
+            if step not in called:
+                return None, {"name": step, "arguments": {"request": transcript[-4000:]}}
+        result = decision(config, transcript)
+        if "set_model_response" in tool_names:
+            return None, {"name": "set_model_response", "arguments": result}
+        return json.dumps(result), None
+
+    if "summariz" in system:
+        if "web_search" in tool_names and "web_search" not in called and random.random() < config.search_rate:
+            return None, {"name": "web_search", "arguments": {"query": transcript[-200:]}}
+        return (
+            "**Main Topic/Activity:** Stub topic\n\n**Purpose/Goal:** Load testing\n\n"
+            "**Key Details:**\n- stub\n- detail\n\n**Potential Actions/Tasks:** Reading\n\n**URL:** https://example.com",
+            None,
+        )
+    if "BATCH INPUT" in system and "matching agent" in system:
+        parts = REQUEST_BLOCK_PATTERN.split(text_of(messages[-1]))
+        blocks = dict(zip(parts[1::2], parts[2::2]))
+        kept = [handle for handle in blocks if random.random() >= config.batch_drop_rate]
+        return json.dumps({handle: decision(config, blocks[handle]) for handle in kept}), None
+    if "BATCH INPUT" in system:
+        handles = BATCH_HANDLE_PATTERN.findall(text_of(messages[-1]))
+        kept = [handle for handle in handles if random.random() >= config.batch_drop_rate]
+        return json.dumps({handle: random.choice(LABELS) for handle in kept}), None
+    if "matching agent" in system:
+        return "Reasoning about the sessions.\n" + json.dumps(decision(config, transcript)), None
+    return random.choice(LABELS), None
+
+
+def completion_body(model: str, text: Optional[str], tool_call: Optional[Dict[str, Any]], usage: Dict[str, Any]) -> Dict[str, Any]:
+    message: Dict[str, Any] = {"role": "assistant", "content": text}
+    if tool_call:
+        message["tool_calls"] = [
+            {
+                "id": f"call_{uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])},
+            }
+        ]
+    return {
+        "id": f"chatcmpl-{uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+        "usage": usage,
+    }
+
+
+async def stream_chunks(
+    model: str, text: Optional[str], tool_call: Optional[Dict[str, Any]], usage: Dict[str, Any], token_delay: float
+) -> AsyncIterator[bytes]:
+    completion_id = f"chatcmpl-{uuid4().hex}"
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra: Any) -> bytes:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+    yield chunk({"role": "assistant", "content": ""})
+    if tool_call:
+        arguments = json.dumps(tool_call["arguments"])
+        yield chunk({"tool_calls": [{"index": 0, "id": f"call_{uuid4().hex[:24]}", "type": "function", "function": {"name": tool_call["name"], "arguments": ""}}]})
+        for start in range(0, len(arguments), 16):
+            await asyncio.sleep(token_delay * 4)
+            yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + 16]}}]})
+    else:
+        words = (text or "").split(" ")
+        for index, word in enumerate(words):
+            await asyncio.sleep(token_delay)
+            yield chunk({"content": word if index == 0 else " " + word})
+    yield chunk({}, finish_reason="tool_calls" if tool_call else "stop", usage=usage)
+    yield b"data: [DONE]\n\n"
+
+
+def build_app(config: StubConfig) -> Starlette:
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        model = body.get("model", "stub")
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse({"error": {"message": "stub overloaded", "type": "server_error"}}, status_code=503)
+
+        prompt = json.dumps(body.get("messages", []), ensure_ascii=False)
+        prompt_tokens = estimate_tokens(prompt)
+        cached_tokens = min(prompt_tokens, cached_prefix_tokens(config, prompt))
+        text, tool_call = plan_reply(config, body)
+        completion_tokens = estimate_tokens(text or json.dumps(tool_call))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+        jitter = random.lognormvariate(0, config.jitter) if config.jitter else 1.0
+        ttft = (config.ttft_ms + (prompt_tokens - cached_tokens) / 1000 * config.prefill_ms_per_1k) * jitter / 1000
+        token_delay = 1.0 / config.tokens_per_second
+        await asyncio.sleep(ttft)
+
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_chunks(model, text, tool_call, usage, token_delay), media_type="text/event-stream"
+            )
+        await asyncio.sleep(completion_tokens * token_delay)
+        return JSONResponse(completion_body(model, text, tool_call, usage))
+
+    async def search(request: Request) -> Response:
+        body = await request.json()
+        await asyncio.sleep(config.search_ms / 1000)
+        organic = [{"title": f"Result {index}", "link": f"https://example.com/{index}", "snippet": body.get("q", "")[:80]} for index in range(3)]
+        return JSONResponse({"organic": organic})
+
+    async def models(_: Request) -> Response:
+        return JSONResponse({"object": "list", "data": [{"id": "gpt-4o", "object": "model"}, {"id": "gpt-4o-mini", "object": "model"}]})
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/models", models),
+            Route("/search", search, methods=["POST"]),
+        ]
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttft-ms", type=float, default=350.0, help="Base time to first token")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40.0, help="Extra TTFT per 1k uncached prompt tokens")
+    parser.add_argument("--tokens-per-second", type=float, default=90.0, help="Decode speed")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Log-normal sigma applied to TTFT")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--merge-rate", type=float, default=0.6, help="Fraction of decisions that merge")
+    parser.add_argument("--bad-handle-rate", type=float, default=0.0, help="Fraction of merges naming a nonexistent session")
+    parser.add_argument("--batch-drop-rate", type=float, default=0.0, help="Fraction of sessions (or grouping requests) left out of batch replies")
+    parser.add_argument("--search-rate", type=float, default=0.0, help="Fraction of summaries that start with a web_search call")
+    parser.add_argument("--search-ms", type=float, default=600.0, help="Latency of the stub /search endpoint")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    uvicorn.run(build_app(StubConfig(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Shared test setup.
+
+`app` builds its agents on import, which needs an API key and LiteLLM's bundled
+cost map; tests never reach a provider, so placeholders are enough.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
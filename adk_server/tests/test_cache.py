@@ -0,0 +1,99 @@
+from app.cache import PartitionedCache, TTLCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used.
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    clock.now += 4
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_ttl_cache_restore_keeps_newer_entries():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("fresh", "new")
+    assert not cache.restore("fresh", "old", stored_at=clock.now - 1)
+    assert not cache.restore("stale", "old", stored_at=clock.now - 10)
+    assert cache.restore("kept", "old", stored_at=clock.now - 1)
+    assert cache.get("fresh") == "new" and cache.get("kept") == "old" and cache.get("stale") is None
+    assert [key for key, _, _ in cache.items()] == ["fresh", "kept"]
+
+
+def test_partition_quota_only_evicts_its_own_entries():
+    cache = PartitionedCache(max_entries=100, ttl_seconds=0, partition_max_entries=3)
+    cache.set("light", "x", 1)
+    for index in range(10):
+        cache.set("heavy", str(index), index)
+    assert cache.get("light", "x") == 1
+    assert [key for name, key, _, _ in cache.items() if name == "heavy"] == ["7", "8", "9"]
+    assert cache.stats()["quota_evictions"] == 7
+    assert cache.partition_stats()["heavy"]["evictions"] == 7
+
+
+def test_full_cache_evicts_from_the_largest_partition():
+    cache = PartitionedCache(max_entries=4, ttl_seconds=0, partition_max_entries=4)
+    cache.set("a", "1", 1)
+    for index in range(3):
+        cache.set("b", str(index), index)
+    cache.set("c", "1", 1)
+    assert len(cache) == 4
+    assert cache.get("a", "1") == 1 and cache.get("c", "1") == 1
+    assert cache.get("b", "0") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_weight_limits_and_on_evict():
+    evicted = []
+    cache = PartitionedCache(
+        max_entries=100,
+        ttl_seconds=0,
+        partition_max_entries=100,
+        weigh=len,
+        max_weight=10,
+        on_evict=lambda partition, key, value: evicted.append((partition, key, value)),
+    )
+    cache.set("a", "1", "aaaa")
+    cache.set("b", "1", "bbbbbb")
+    cache.set("b", "2", "bb")
+    assert evicted == [("b", "1", "bbbbbb")]
+    assert cache.stats()["weight"] == 6
+    # Explicit removal is not an eviction.
+    assert cache.pop("a", "1") == "aaaa"
+    assert len(evicted) == 1
+    assert cache.partitions() == ["b"]
+
+
+def test_partitioned_cache_expiry_and_restore():
+    clock = Clock()
+    cache = PartitionedCache(max_entries=10, ttl_seconds=5, partition_max_entries=10, clock=clock)
+    cache.set("a", "k", 1)
+    assert cache.restore("a", "old", 2, stored_at=clock.now - 1)
+    assert not cache.restore("a", "k", 3, stored_at=clock.now - 1)
+    clock.now += 6
+    assert cache.get("a", "k") is None
+    assert list(cache.items()) == []
+    assert cache.stats()["expirations"] == 1
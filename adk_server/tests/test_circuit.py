@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def make_breaker(**overrides):
+    settings = dict(
+        error_rate=0.5,
+        slow_call_ms=1000,
+        slow_rate=0.8,
+        window=4,
+        min_calls=4,
+        call_timeout=0.05,
+        probe_interval=0.01,
+    )
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def test_trips_on_error_rate_once_window_is_full():
+    breaker = make_breaker()
+    for error in (True, False, True):
+        breaker.record(10, error=error)
+    assert breaker.state == CLOSED
+    breaker.record(10, error=False)
+    assert breaker.state == OPEN
+    assert breaker.last_trip_reason == "error_rate=0.50"
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_trips_on_slow_rate():
+    breaker = make_breaker()
+    for elapsed in (10, 2000, 2000, 2000):
+        breaker.record(elapsed)
+    assert breaker.state == CLOSED  # 3 of 4 slow is below 0.8.
+    breaker.record(2000)  # The fast run leaves the window.
+    assert breaker.state == OPEN
+    assert breaker.last_trip_reason.startswith("slow_rate")
+
+
+def test_records_are_ignored_while_open():
+    breaker = make_breaker()
+    breaker.trip("manual")
+    breaker.record(10, error=False)
+    assert breaker.state == OPEN
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_disabled_breaker_never_opens():
+    breaker = make_breaker(enabled=False)
+    for _ in range(10):
+        breaker.record(10, error=True)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_probe_closes_the_breaker_after_a_failure():
+    outcomes = [RuntimeError("down"), None]
+    states = []
+
+    async def probe():
+        states.append(breaker.state)
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+
+    async def scenario():
+        breaker.set_probe(probe)
+        breaker.trip("manual")
+        for _ in range(100):
+            if breaker.state == CLOSED:
+                break
+            await asyncio.sleep(0.01)
+        await breaker.close()
+
+    breaker = make_breaker()
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+    assert states == [HALF_OPEN, HALF_OPEN]
+    assert (breaker.probes, breaker.probe_failures) == (2, 1)
+
+
+def test_call_records_outcomes_and_short_circuits():
+    async def ok():
+        return "ok"
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        assert await breaker.call(ok) == "ok"
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(hang)
+        assert breaker.stats()["window_calls"] == 3
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+
+    breaker = make_breaker()
+    asyncio.run(scenario())
+
+
+def test_cancelled_call_is_not_recorded():
+    async def hang():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        task = asyncio.create_task(breaker.call(hang, timeout=5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    breaker = make_breaker()
+    asyncio.run(scenario())
+    assert breaker.stats()["window_calls"] == 0
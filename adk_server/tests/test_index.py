@@ -0,0 +1,55 @@
+from app.index import SessionIndex, UserIndex
+from app.schemas import ExistingSession, SessionTab, TabInfo
+
+
+def session(session_id, *urls):
+    return ExistingSession(id=session_id, tabList=[SessionTab(url=url, title=url.rsplit("/", 1)[-1]) for url in urls])
+
+
+def test_sync_indexes_only_new_or_changed_sessions():
+    index = SessionIndex(max_users=10, ttl_seconds=0)
+    first = [session("s1", "https://a.example/x"), session("s2", "https://b.example/y")]
+    assert [s.id for s in index.sync("u", first)] == ["s1", "s2"]
+    assert index.sync("u", first) == []
+
+    changed = [session("s1", "https://a.example/x", "https://a.example/z")]
+    assert [s.id for s in index.sync("u", changed)] == ["s1"]
+    # s2 was closed on the client and is dropped.
+    assert index.sessions_with_url("u", "https://b.example/y") == set()
+    assert index.sessions_with_url("u", "https://a.example/z") == {"s1"}
+
+
+def test_add_tab_predicts_the_next_fingerprint():
+    index = SessionIndex(max_users=10, ttl_seconds=0)
+    existing = session("s1", "https://a.example/x")
+    index.sync("u", [existing])
+    new_tab = TabInfo(url="https://a.example/z", title="z")
+    index.add_tab("u", existing, new_tab)
+    assert index.sessions_with_url("u", new_tab.url) == {"s1"}
+    assert index.sync("u", [session("s1", "https://a.example/x", "https://a.example/z")]) == []
+
+
+def test_candidates_are_scoped_per_user():
+    index = SessionIndex(max_users=10, ttl_seconds=0)
+    index.sync("alice", [session("s1", "https://docs.python.org/3/library/asyncio.html")])
+    tab = TabInfo(url="https://docs.python.org/3/library/typing.html", title="typing")
+    assert "s1" in index.candidates("alice", tab)
+    assert index.candidates("bob", tab) == {}
+
+
+def test_user_quota_evicts_least_recently_indexed_sessions():
+    index = UserIndex(max_sessions=3)
+    for number in range(5):
+        index.add(f"s{number}", {f"d:site{number}", "d:shared"})
+    assert list(index.session_keys) == ["s2", "s3", "s4"]
+    assert index.evictions == 2
+    assert index.postings["d:shared"] == {"s2", "s3", "s4"}
+    assert "d:site0" not in index.postings
+
+    keys = UserIndex(max_keys=4)
+    keys.add("s1", {"a", "b"})
+    keys.add("s2", {"c", "d", "e"})
+    assert list(keys.session_keys) == ["s2"]
+    # A single session larger than the quota is kept rather than leaving the user with nothing.
+    keys.add("s3", {str(number) for number in range(10)})
+    assert list(keys.session_keys) == ["s3"]
@@ -0,0 +1,108 @@
+import asyncio
+import math
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import rate_limit
+from app.rate_limit import InMemoryBackend, RateLimiter, SQLiteBackend, _take, client_identity, rate_limit_key
+
+
+def make_request(host="1.2.3.4", **headers):
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/group",
+        "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        "client": (host, 50000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    }
+    return Request(scope)
+
+
+def test_take_refills_up_to_capacity():
+    assert _take(0.0, 5.0, 1.0, 100.0, 1.0) == (4.0, 0.0)
+    tokens, retry_after = _take(0.5, 5.0, 1.0, 0.0, 1.0)
+    assert tokens == 0.5
+    assert retry_after == pytest.approx(0.5)
+    assert _take(0.0, 5.0, 0.0, 10.0, 1.0)[1] == math.inf
+
+
+def test_in_memory_bucket_admits_burst_then_waits():
+    backend = InMemoryBackend(capacity=3, refill_per_second=1.0)
+    waits = [backend.acquire("addr:a", 3, 1.0) for _ in range(4)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0 < waits[3] <= 1.0
+    # Buckets are independent.
+    assert backend.acquire("addr:b", 3, 1.0) == 0.0
+    assert backend.size() == 2
+
+
+def test_identity_ignores_user_headers(monkeypatch):
+    monkeypatch.setattr(rate_limit, "API_KEY_DIGESTS", frozenset({rate_limit._key_digest("secret")}))
+    assert rate_limit_key(make_request(x_user_id="alice")) == "addr:1.2.3.4"
+    assert rate_limit_key(make_request(x_user_id="bob")) == "addr:1.2.3.4"
+    assert client_identity(make_request(x_user_id="alice")) == "addr:1.2.3.4/user:alice"
+    assert client_identity(make_request(), user_id="carol") == "addr:1.2.3.4/user:carol"
+
+    keyed = rate_limit_key(make_request(x_api_key="secret"))
+    assert keyed.startswith("key:") and len(keyed) == len("key:") + 16
+    assert rate_limit_key(make_request(authorization="Bearer secret")) == keyed
+    # Unknown keys fall back to the address instead of minting a bucket.
+    assert rate_limit_key(make_request(x_api_key="guess")) == "addr:1.2.3.4"
+
+
+def test_rotating_user_ids_share_one_bucket():
+    limiter = RateLimiter(InMemoryBackend(capacity=3, refill_per_second=0.001), capacity=3, refill_per_second=0.001)
+
+    async def admitted():
+        count = 0
+        for index in range(10):
+            try:
+                await limiter.check(make_request(x_user_id=f"user-{index}"))
+                count += 1
+            except HTTPException as exc:
+                assert exc.status_code == 429
+                assert int(exc.headers["Retry-After"]) >= 1
+        return count
+
+    assert asyncio.run(admitted()) == 3
+    assert limiter.stats()["limited"] == 7
+
+
+def test_cost_is_capped_at_burst():
+    limiter = RateLimiter(InMemoryBackend(capacity=2, refill_per_second=0.001), capacity=2, refill_per_second=0.001)
+    asyncio.run(limiter.check(make_request(), cost=10))
+    with pytest.raises(HTTPException):
+        asyncio.run(limiter.check(make_request()))
+
+
+def test_disabled_limiter_admits_everything():
+    limiter = RateLimiter(InMemoryBackend(capacity=1, refill_per_second=0.001), capacity=1, refill_per_second=0.001, enabled=False)
+    for _ in range(5):
+        asyncio.run(limiter.check(make_request()))
+
+
+def test_sqlite_backend_shares_buckets(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    assert first.acquire("addr:a", 2, 0.001) == 0.0
+    assert second.acquire("addr:a", 2, 0.001) == 0.0
+    assert first.acquire("addr:a", 2, 0.001) > 0
+
+
+def test_sqlite_prune_drops_idle_and_excess_rows(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "buckets.sqlite3"), max_buckets=5, prune_interval=3600)
+    for index in range(20):
+        backend.acquire(f"addr:{index}", 10, 1.0)
+    # Only the first acquire swept (an empty table); the next sweep is an interval away.
+    assert backend.size() == 20
+    assert backend.prune(idle_seconds=3600) == 15
+    assert backend.size() == 5
+    latest = backend._connect().execute("SELECT MAX(updated) FROM buckets").fetchone()[0]
+    assert backend.prune(idle_seconds=10, now=latest + 11) == 5
+    assert backend.size() == 0
+    assert backend.pruned == 20
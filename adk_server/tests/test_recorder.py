@@ -0,0 +1,43 @@
+import json
+
+from app.recorder import hash_text, hash_url, redact_text, scrub
+
+
+def test_urls_keep_host_and_hash_path_and_query():
+    hashed = hash_url("https://health.example/conditions/private?q=symptoms", salt="s")
+    assert hashed.startswith("https://health.example/")
+    assert "conditions" not in hashed and "symptoms" not in hashed
+    assert hash_url("https://health.example/conditions/private?q=symptoms", salt="s") == hashed
+    assert "private" not in scrub({"text": "see health.example/conditions/private and /private"})["text"]
+
+
+def test_body_text_fields_are_hashed():
+    body = {
+        "tabList": [{"url": "https://a.example/", "title": "Secret Diagnosis", "content": {"h1": "Private", "h2": ["One", "Two"]}}],
+        "mode": "fast",
+    }
+    redacted = redact_text(body)
+    tab = redacted["tabList"][0]
+    assert tab["title"] == hash_text("Secret Diagnosis")
+    assert tab["content"]["h2"] == [hash_text("One"), hash_text("Two")]
+    assert redacted["mode"] == "fast" and tab["url"] == "https://a.example/"
+
+
+def test_model_replies_keep_their_json_structure():
+    reply = 'Thinking about it.\n{"action": "merge", "sessionId": "S1", "label": "Secret Trip", "reason": "same trip"}'
+    redacted = redact_text({"content": {"parts": [{"text": reply}]}})["content"]["parts"][0]["text"]
+    prose, payload = redacted.split("\n")
+    assert prose == hash_text("Thinking about it.")
+    decision = json.loads(payload)
+    assert decision["action"] == "merge" and decision["sessionId"] == "S1"
+    assert decision["label"] == hash_text("Secret Trip") and decision["reason"] == hash_text("same trip")
+
+    batch = redact_text({"text": '{"L1": "Secret Trip", "L2": "Tax Forms"}'})["text"]
+    assert json.loads(batch) == {"L1": hash_text("Secret Trip"), "L2": hash_text("Tax Forms")}
+
+
+def test_tool_call_arguments_are_hashed():
+    call = {"function_call": {"name": "matcher_agent", "args": {"request": "Tabs: Secret Trip", "action": "create_new"}}}
+    args = redact_text(call)["function_call"]["args"]
+    assert args == {"request": hash_text("Tabs: Secret Trip"), "action": "create_new"}
+    assert redact_text(call)["function_call"]["name"] == "matcher_agent"
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from google.adk.sessions import InMemorySessionService
+
+from app.cache import TTLCache
+from app.index import SessionIndex
+from app.schemas import ExistingSession, SessionTab
+from app.snapshot import SnapshotManager, restore_session_service, session_service_records
+
+
+def cache_manager(path, cache, **kwargs):
+    manager = SnapshotManager(path=path, interval_seconds=0, max_age_seconds=kwargs.pop("max_age_seconds", 3600))
+    manager.register(
+        "cache",
+        lambda: [[key, stored_at, value] for key, stored_at, value in cache.items()],
+        lambda records: sum(cache.restore(key, value, stored_at) for key, stored_at, value in records),
+        **kwargs,
+    )
+    return manager
+
+
+async def restore(manager):
+    manager.start()
+    await manager.wait_restored()
+
+
+def test_round_trip_restores_records(tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    source = TTLCache(max_entries=10, ttl_seconds=3600)
+    for index in range(3):
+        source.set(f"k{index}", {"value": index})
+    saved = asyncio.run(cache_manager(path, source).save())
+    assert saved["records"] == {"cache": 3}
+
+    target = TTLCache(max_entries=10, ttl_seconds=3600)
+    target.set("k1", {"value": "newer"})
+    manager = cache_manager(path, target, threadsafe=True)
+    asyncio.run(restore(manager))
+    assert manager.restored
+    assert manager.restore_stats["records"] == {"cache": 2}
+    # State written since startup wins over the snapshot.
+    assert [target.get(f"k{index}") for index in range(3)] == [{"value": 0}, {"value": "newer"}, {"value": 2}]
+
+
+def test_missing_old_or_foreign_snapshots_start_cold(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    cache = TTLCache(max_entries=10, ttl_seconds=0)
+    asyncio.run(restore(cache_manager(str(path), cache)))
+    assert len(cache) == 0
+
+    source = TTLCache(max_entries=10, ttl_seconds=0)
+    source.set("k", 1)
+    asyncio.run(cache_manager(str(path), source).save())
+    lines = path.read_text().splitlines()
+    header = json.loads(lines[0])
+    header["created_at"] -= 7200
+    path.write_text("\n".join([json.dumps(header)] + lines[1:]) + "\n")
+    asyncio.run(restore(cache_manager(str(path), cache)))
+    assert len(cache) == 0
+
+    path.write_text('{"snapshot": 99}\n')
+    asyncio.run(restore(cache_manager(str(path), cache)))
+    assert len(cache) == 0
+    assert (tmp_path / "snapshot.jsonl.unusable").exists()
+
+
+def test_truncated_snapshot_restores_what_precedes_the_damage(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    source = TTLCache(max_entries=10, ttl_seconds=0)
+    source.set("a", 1)
+    source.set("b", 2)
+    asyncio.run(cache_manager(str(path), source).save())
+    path.write_text(path.read_text() + '["cache", ["c", 1')
+
+    target = TTLCache(max_entries=10, ttl_seconds=0)
+    manager = cache_manager(str(path), target)
+    asyncio.run(restore(manager))
+    assert manager.restored
+    assert target.get("a") == 1 and target.get("b") == 2 and target.get("c") is None
+
+
+def test_session_service_round_trip():
+    async def scenario():
+        source = InMemorySessionService()
+        await source.create_session(app_name="app", user_id="u", session_id="keep", state={"user:theme": "dark", "k": 1})
+        await source.create_session(app_name="app", user_id="u", session_id="grouping-temp")
+        records = json.loads(json.dumps(session_service_records(source, "app", skip_prefixes=("grouping-",))))
+
+        target = InMemorySessionService()
+        assert restore_session_service(target, "app", records) == 1
+        assert restore_session_service(target, "app", records) == 0
+        session = await target.get_session(app_name="app", user_id="u", session_id="keep")
+        assert session is not None and session.state["k"] == 1 and session.state["user:theme"] == "dark"
+        assert await target.get_session(app_name="app", user_id="u", session_id="grouping-temp") is None
+
+    asyncio.run(scenario())
+
+
+def test_session_index_round_trip():
+    sessions = [
+        ExistingSession(id="s1", tabList=[SessionTab(url="https://docs.python.org/3/library/asyncio.html", title="asyncio")]),
+        ExistingSession(id="s2", tabList=[SessionTab(url="https://doc.rust-lang.org/book/", title="The Rust Book")]),
+    ]
+    source = SessionIndex(max_users=10, ttl_seconds=3600)
+    source.sync("u", sessions)
+    records = json.loads(json.dumps(source.snapshot_records()))
+
+    target = SessionIndex(max_users=10, ttl_seconds=3600)
+    assert target.restore_records(records) == 1
+    assert target.stats()["keys"] == source.stats()["keys"]
+    assert target.sessions_with_url("u", "https://doc.rust-lang.org/book/") == {"s2"}
+    # Fingerprints survive, so unchanged sessions are not indexed again.
+    assert target.sync("u", sessions) == []